@@ -2,6 +2,12 @@ from ark_nlp.dataset.base._dataset import *
 
 from ark_nlp.dataset.base._sentence_classification_dataset import SentenceClassificationDataset
 from ark_nlp.dataset.base._sentence_classification_dataset import SentenceClassificationDataset as SCDataset
+from ark_nlp.dataset.base._sentence_classification_dataset import ChunkSentenceClassificationDataset
+from ark_nlp.dataset.base._sentence_classification_dataset import ChunkSentenceClassificationDataset as ChunkSCDataset
+from ark_nlp.dataset.base._sentence_classification_dataset import chunk_collate_fn
+from ark_nlp.dataset.base._sentence_classification_dataset import PackedSentenceClassificationDataset
+from ark_nlp.dataset.base._sentence_classification_dataset import PackedSentenceClassificationDataset as PackedSCDataset
+from ark_nlp.dataset.base._sentence_classification_dataset import packed_collate_fn
 from ark_nlp.dataset.base._sentence_classification_dataset import PairMergeSentenceClassificationDataset
 from ark_nlp.dataset.base._sentence_classification_dataset import PairMergeSentenceClassificationDataset as PMSCDataset
 from ark_nlp.dataset.base._sentence_classification_dataset import TwinTowersSentenceClassificationDataset
@@ -16,6 +16,10 @@
 # Status: Active
 
 
+import torch
+import numpy as np
+
+from torch.utils.data._utils.collate import default_collate
 from ark_nlp.dataset.base._dataset import BaseDataset
 
 
@@ -74,9 +78,11 @@ class SentenceClassificationDataset(BaseDataset):
 
     def _convert_to_vanilla_ids(self, vanilla_tokenizer):
 
+        # 所有文本一次性分词，利用词典的去重、缓存和多进程分词
+        tokens_list = vanilla_tokenizer.batch_tokenize([row_['text'] for row_ in self.dataset])
+
         features = []
-        for (index_, row_) in enumerate(self.dataset):
-            tokens = vanilla_tokenizer.tokenize(row_['text'])
+        for (index_, row_), tokens in zip(enumerate(self.dataset), tokens_list):
             length = len(tokens)
             input_ids = vanilla_tokenizer.sequence_to_ids(tokens)
 
@@ -94,6 +100,218 @@ class SentenceClassificationDataset(BaseDataset):
         return features
 
 
+def chunk_collate_fn(batch):
+    """
+    长文本分片数据的collate函数，将batch内所有文本的片段拼接成一个batch，
+    并生成每个片段所属文本在batch中位置的chunk_index
+
+    Args:
+        batch (:obj:`list`): ChunkSentenceClassificationDataset的样本列表
+    """  # noqa: ignore flake8"
+
+    chunk_cols = [col_ for col_ in batch[0] if np.ndim(batch[0][col_]) == 2]
+
+    collated = default_collate([
+        {col_: value_ for col_, value_ in feature_.items() if col_ not in chunk_cols}
+        for feature_ in batch
+    ])
+
+    for col_ in chunk_cols:
+        collated[col_] = torch.from_numpy(np.concatenate([feature_[col_] for feature_ in batch]))
+
+    collated['chunk_index'] = torch.cat([
+        torch.full((len(feature_[chunk_cols[0]]),), index_, dtype=torch.long)
+        for index_, feature_ in enumerate(batch)
+    ])
+
+    return collated
+
+
+class ChunkSentenceClassificationDataset(SentenceClassificationDataset):
+    """
+    用于长文本序列分类任务的Dataset，每个文本按token切分成多个不超过max_seq_len的片段，
+    需要配合chunk_collate_fn组成batch
+
+    Args:
+        data (:obj:`DataFrame` or :obj:`string`): 数据或者数据地址
+        categories (:obj:`list`, optional, defaults to `None`): 数据类别
+        chunk_stride (:obj:`int` or :obj:`None`, optional, defaults to None):
+            相邻片段起始位置的token间隔，默认为None，即max_seq_len-2，片段之间没有重叠
+        max_chunk_num (:obj:`int` or :obj:`None`, optional, defaults to None): 每个文本最多保留的片段数，默认为None，即不限制
+        is_retain_df (:obj:`bool`, optional, defaults to False): 是否将DataFrame格式的原始数据复制到属性retain_df中
+        is_retain_dataset (:obj:`bool`, optional, defaults to False): 是否将处理成dataset格式的原始数据复制到属性retain_dataset中
+        is_train (:obj:`bool`, optional, defaults to True): 数据集是否为训练集数据
+        is_test (:obj:`bool`, optional, defaults to False): 数据集是否为测试集数据
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        *args,
+        chunk_stride=None,
+        max_chunk_num=None,
+        **kwargs
+    ):
+        self.chunk_stride = chunk_stride
+        self.max_chunk_num = max_chunk_num
+
+        super(ChunkSentenceClassificationDataset, self).__init__(*args, **kwargs)
+
+    def _convert_to_transfomer_ids(self, bert_tokenizer):
+
+        features = []
+        for (index_, row_) in enumerate(self.dataset):
+            input_ids = bert_tokenizer.chunk_to_ids(
+                row_['text'],
+                stride=self.chunk_stride,
+                max_chunk_num=self.max_chunk_num
+            )
+
+            input_ids, input_mask, segment_ids = input_ids
+
+            feature = {
+                'input_ids': input_ids,
+                'attention_mask': input_mask,
+                'token_type_ids': segment_ids
+            }
+
+            if not self.is_test:
+                label_ids = self.cat2id[row_['label']]
+                feature['label_ids'] = label_ids
+
+            features.append(feature)
+
+        return features
+
+    @property
+    def dataset_cols(self):
+        return list(self.dataset[0].keys()) + ['chunk_index']
+
+    @property
+    def to_device_cols(self):
+        return list(self.dataset[0].keys()) + ['chunk_index']
+
+
+def packed_collate_fn(batch):
+    """
+    打包数据的collate函数，每行内样本级别的cls_index和label_ids在batch内拼接，
+    并生成每个样本所在行在batch中位置的pack_index
+
+    Args:
+        batch (:obj:`list`): PackedSentenceClassificationDataset的样本列表
+    """  # noqa: ignore flake8"
+
+    sample_cols = [col_ for col_ in ('cls_index', 'label_ids') if col_ in batch[0]]
+
+    collated = default_collate([
+        {col_: value_ for col_, value_ in feature_.items() if col_ not in sample_cols}
+        for feature_ in batch
+    ])
+
+    for col_ in sample_cols:
+        collated[col_] = torch.from_numpy(np.concatenate([feature_[col_] for feature_ in batch]))
+
+    collated['pack_index'] = torch.cat([
+        torch.full((len(feature_['cls_index']),), index_, dtype=torch.long)
+        for index_, feature_ in enumerate(batch)
+    ])
+
+    return collated
+
+
+class PackedSentenceClassificationDataset(SentenceClassificationDataset):
+    """
+    用于短文本序列分类任务的打包Dataset，将多个短文本依次拼接到同一行(长度为max_seq_len)中，
+    attention_mask中保存每个token所属样本在该行中的序号(从1开始，0为填充)，用于构造块对角的注意力掩码，
+    position_ids在每个样本内从0开始，需要配合packed_collate_fn组成batch
+
+    Args:
+        data (:obj:`DataFrame` or :obj:`string`): 数据或者数据地址
+        categories (:obj:`list`, optional, defaults to `None`): 数据类别
+        max_pack_num (:obj:`int` or :obj:`None`, optional, defaults to None): 每行最多打包的样本数，默认为None，即不限制
+        is_retain_df (:obj:`bool`, optional, defaults to False): 是否将DataFrame格式的原始数据复制到属性retain_df中
+        is_retain_dataset (:obj:`bool`, optional, defaults to False): 是否将处理成dataset格式的原始数据复制到属性retain_dataset中
+        is_train (:obj:`bool`, optional, defaults to True): 数据集是否为训练集数据
+        is_test (:obj:`bool`, optional, defaults to False): 数据集是否为测试集数据
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        *args,
+        max_pack_num=None,
+        **kwargs
+    ):
+        self.max_pack_num = max_pack_num
+
+        super(PackedSentenceClassificationDataset, self).__init__(*args, **kwargs)
+
+    def _pack_features(self, samples, max_seq_len):
+
+        features = []
+        pack = []
+        pack_len = 0
+        for sample_ in samples + [None]:
+            is_full = sample_ is None or pack_len + len(sample_[0]) > max_seq_len
+            if self.max_pack_num is not None and len(pack) >= self.max_pack_num:
+                is_full = True
+
+            if is_full and pack:
+                input_ids = np.zeros(max_seq_len, dtype='int64')
+                segment_index = np.zeros(max_seq_len, dtype='int64')
+                position_ids = np.zeros(max_seq_len, dtype='int64')
+                cls_index = []
+
+                start = 0
+                for segment_, (ids_, _) in enumerate(pack, 1):
+                    input_ids[start:start + len(ids_)] = ids_
+                    segment_index[start:start + len(ids_)] = segment_
+                    position_ids[start:start + len(ids_)] = np.arange(len(ids_))
+                    cls_index.append(start)
+                    start += len(ids_)
+
+                feature = {
+                    'input_ids': input_ids,
+                    'attention_mask': segment_index,
+                    'token_type_ids': np.zeros(max_seq_len, dtype='int64'),
+                    'position_ids': position_ids,
+                    'cls_index': np.asarray(cls_index, dtype='int64')
+                }
+
+                if not self.is_test:
+                    feature['label_ids'] = np.asarray([label_ for _, label_ in pack], dtype='int64')
+
+                features.append(feature)
+
+                pack = []
+                pack_len = 0
+
+            if sample_ is not None:
+                pack.append(sample_)
+                pack_len += len(sample_[0])
+
+        return features
+
+    def _convert_to_transfomer_ids(self, bert_tokenizer):
+
+        samples = []
+        for (index_, row_) in enumerate(self.dataset):
+            input_ids, input_mask, _ = bert_tokenizer.sequence_to_ids(row_['text'])
+            input_ids = input_ids[:input_mask.sum()]
+
+            label_ids = None if self.is_test else self.cat2id[row_['label']]
+
+            samples.append((input_ids, label_ids))
+
+        return self._pack_features(samples, bert_tokenizer.max_seq_len)
+
+    @property
+    def dataset_cols(self):
+        return list(self.dataset[0].keys()) + ['pack_index']
+
+    @property
+    def to_device_cols(self):
+        return list(self.dataset[0].keys()) + ['pack_index']
+
+
 class PairMergeSentenceClassificationDataset(BaseDataset):
     """
     用于句子对合并后进行序列分类任务的Dataset，例如BERT分类任务
@@ -183,11 +401,18 @@ class TwinTowersSentenceClassificationDataset(BaseDataset):
 
     def _convert_to_transfomer_ids(self, bert_tokenizer):
 
+        # 文本匹配数据中同一文本常出现在多个句子对中，每个文本只ID化一次
+        text2ids = {}
+
         features = []
         for (index_, row_) in enumerate(self.dataset):
 
-            input_ids_a = bert_tokenizer.sequence_to_ids(row_['text_a'])
-            input_ids_b = bert_tokenizer.sequence_to_ids(row_['text_b'])
+            for text_ in (row_['text_a'], row_['text_b']):
+                if text_ not in text2ids:
+                    text2ids[text_] = bert_tokenizer.sequence_to_ids(text_)
+
+            input_ids_a = text2ids[row_['text_a']]
+            input_ids_b = text2ids[row_['text_b']]
 
             input_ids_a, input_mask_a, segment_ids_a = input_ids_a
             input_ids_b, input_mask_b, segment_ids_b = input_ids_b
@@ -211,11 +436,19 @@ class TwinTowersSentenceClassificationDataset(BaseDataset):
 
     def _convert_to_vanilla_ids(self, vanilla_tokenizer):
 
+        texts = list(dict.fromkeys(
+            text_ for row_ in self.dataset for text_ in (row_['text_a'], row_['text_b'])
+        ))
+
+        text2ids = {}
+        for text_, tokens_ in zip(texts, vanilla_tokenizer.batch_tokenize(texts)):
+            text2ids[text_] = vanilla_tokenizer.sequence_to_ids(tokens_)
+
         features = []
         for (index_, row_) in enumerate(self.dataset):
 
-            input_ids_a = vanilla_tokenizer.sequence_to_ids(row_['text_a'])
-            input_ids_b = vanilla_tokenizer.sequence_to_ids(row_['text_b'])
+            input_ids_a = text2ids[row_['text_a']]
+            input_ids_b = text2ids[row_['text_b']]
 
             feature = {
                 'input_ids_a': input_ids_a,
@@ -1,6 +1,8 @@
 import torch
 import torch.nn as nn
 
+from ark_nlp.nn.layer.global_pointer_block import pack_span_width
+
 
 class GlobalPointerCrossEntropy(nn.Module):
     '''Multi-class Focal loss implementation'''
@@ -22,9 +24,12 @@ class GlobalPointerCrossEntropy(nn.Module):
 
     def forward(self, logits, target):
         """
-        logits: [N, C, L, L]
+        logits: [N, C, L, L]或宽度受限格式的[N, C, L, W]
+        target: [N, C, L, L]或[N, C, L, W]，logits为宽度受限格式时(L, L)的标签会被转换成相同格式
         """
         bh = logits.shape[0] * logits.shape[1]
+        if target.shape[-1] != logits.shape[-1]:
+            target = pack_span_width(target, logits.shape[-1])
         target = torch.reshape(target.to_dense(), (bh, -1))
         logits = torch.reshape(logits, (bh, -1))
         return torch.mean(GlobalPointerCrossEntropy.multilabel_categorical_crossentropy(target, logits))
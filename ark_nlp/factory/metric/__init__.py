@@ -2,6 +2,7 @@ import torch
 
 from torch import nn
 from collections import Counter
+from ark_nlp.nn.layer.global_pointer_block import pack_span_width
 
 
 def topk_accuracy(
@@ -41,11 +42,26 @@ def topk_accuracy(
 
 
 class BiaffineSpanMetrics(nn.Module):
-    def __init__(self):
+    """
+    Biaffine命名实体识别的span级别指标
+
+    Args:
+        max_span_width (:obj:`int` or :obj:`None`, optional, defaults to None):
+            模型输出为(batch_size, L, W, 标签数)的宽度受限格式时的W，此时(L, L)的标签会转换成相同格式，
+            长度超过W的实体仍计入召回的分母
+    """  # noqa: ignore flake8"
+
+    def __init__(self, max_span_width=None):
         super().__init__()
+        self.max_span_width = max_span_width
 
     def forward(self, logits, labels):
         logits = torch.argmax(logits, dim=-1)
+
+        label_num = torch.sum((labels >= 1).float())
+        if self.max_span_width is not None:
+            labels = pack_span_width(labels, self.max_span_width)
+
         batch_size, seq_len, hidden = labels.shape
         logits = logits.view(batch_size, seq_len, hidden)
 
@@ -62,7 +78,7 @@ class BiaffineSpanMetrics(nn.Module):
 
         corr = torch.eq(logits, labels).float()
         corr = torch.mul(corr, y_true)
-        recall = torch.sum(corr) / (torch.sum(y_true) + 1e-8)
+        recall = torch.sum(corr) / (label_num + 1e-8)
         precision = torch.sum(corr) / (torch.sum(y_pred) + 1e-8)
         f1 = 2 * recall * precision / (recall + precision + 1e-8)
 
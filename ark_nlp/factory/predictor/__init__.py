@@ -3,9 +3,14 @@ from ark_nlp.factory.predictor.base._token_classification import TokenClassifica
 from ark_nlp.factory.predictor.base._sequence_classification import SequenceClassificationPredictor
 
 from ark_nlp.factory.predictor.text_classification import TCPredictor
+from ark_nlp.factory.predictor.text_classification_early_exit import EarlyExitTCPredictor
+from ark_nlp.factory.predictor.text_classification_chunk import ChunkPoolingTCPredictor
 from ark_nlp.factory.predictor.text_match import TMPredictor
 from ark_nlp.factory.predictor.bio_named_entity_recognition import BIONERPredictor
 from ark_nlp.factory.predictor.crf_named_entity_recognition import CRFNERPredictor
 from ark_nlp.factory.predictor.biaffine_named_entity_recognition import BiaffineNERPredictor
 from ark_nlp.factory.predictor.span_named_entity_recognition import SpanNERPredictor
 from ark_nlp.factory.predictor.global_pointer_named_entity_recognition import GlobalPointerNERPredictor
+from ark_nlp.factory.predictor.text_match_cascade import TMCascadePredictor
+from ark_nlp.factory.predictor.micro_batch_server import MicroBatchServer
+from ark_nlp.factory.predictor.sliding_window_named_entity_recognition import SlidingWindowNERPredictor
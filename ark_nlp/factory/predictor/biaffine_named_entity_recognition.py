@@ -108,10 +108,29 @@ class BiaffineNERPredictor(object):
             inputs = self._get_module_one_sample_inputs(features)
             scores = torch.argmax(self.module(**inputs), dim=-1)[0].to(torch.device('cpu')).numpy().tolist()
 
+        return self._decode_entities(text, scores, token_mapping)
+
+    def _decode_entities(
+        self,
+        text,
+        scores,
+        token_mapping
+    ):
+        # 宽度受限格式的第w列对应结束位置start+w
+        max_span_width = getattr(self.module, 'max_span_width', None)
+
         entities = []
         for start in range(len(scores)):
-            for end in range(start, len(scores[start])):
-                if scores[start][end] > 0:
+            if max_span_width is None:
+                spans = [(end_, scores[start][end_]) for end_ in range(start, len(scores[start]))]
+            else:
+                spans = [
+                    (start + width_, scores[start][width_]) for width_ in range(max_span_width)
+                    if start + width_ < len(scores)
+                ]
+
+            for end, category in spans:
+                if category > 0:
                     if end-1 > token_mapping[-1][-1]:
                         break
                     if token_mapping[start-1][0] <= token_mapping[end-1][-1]:
@@ -119,7 +138,7 @@ class BiaffineNERPredictor(object):
                             "start_idx": token_mapping[start-1][0],
                             "end_idx": token_mapping[end-1][-1],
                             "entity": text[token_mapping[start-1][0]: token_mapping[end-1][-1]+1],
-                            "type": self.id2cat[scores[start][end]]
+                            "type": self.id2cat[category]
                         }
 
                         if entitie_['entity'] == '':
@@ -128,3 +147,29 @@ class BiaffineNERPredictor(object):
                         entities.append(entitie_)
 
         return entities
+
+    def predict_texts(
+        self,
+        texts
+    ):
+        """
+        多条文本拼成一个batch预测，返回结果与逐条调用predict_one_sample一致
+
+        Args:
+            texts (:obj:`list`): 输入文本列表
+        """  # noqa: ignore flake8"
+
+        features, token_mappings = zip(*[self._get_input_ids(text_) for text_ in texts])
+        self.module.eval()
+
+        with torch.no_grad():
+            inputs = {
+                col: torch.tensor(np.stack([feature_[col] for feature_ in features])).type(torch.long).to(self.device)
+                for col in features[0]
+            }
+            scores = torch.argmax(self.module(**inputs), dim=-1).cpu().numpy().tolist()
+
+        return [
+            self._decode_entities(text_, scores_, token_mapping_)
+            for text_, scores_, token_mapping_ in zip(texts, scores, token_mappings)
+        ]
@@ -119,7 +119,15 @@ class BIONERPredictor(object):
 
         preds = logit.detach().cpu().numpy()
         preds = np.argmax(preds, axis=2).tolist()
-        preds = preds[0][1:]
+
+        return self._decode_entities(text, preds[0])
+
+    def _decode_entities(
+        self,
+        text,
+        preds
+    ):
+        preds = preds[1:]
         preds = preds[:len(text)]
 
         # tags = [self.id2cat[x] for x in preds]
@@ -139,3 +147,28 @@ class BIONERPredictor(object):
             })
 
         return entities
+
+    def predict_texts(
+        self,
+        texts
+    ):
+        """
+        多条文本拼成一个batch预测，返回结果与逐条调用predict_one_sample一致
+
+        Args:
+            texts (:obj:`list`): 输入文本列表
+        """  # noqa: ignore flake8"
+
+        features = [self._get_input_ids(text_) for text_ in texts]
+        self.module.eval()
+
+        with torch.no_grad():
+            inputs = {
+                col: torch.tensor(np.stack([feature_[col] for feature_ in features])).type(torch.long).to(self.device)
+                for col in features[0]
+            }
+            logits = self.module(**inputs)
+
+        preds = np.argmax(logits.detach().cpu().numpy(), axis=2).tolist()
+
+        return [self._decode_entities(text_, preds_) for text_, preds_ in zip(texts, preds)]
@@ -17,8 +17,10 @@
 
 
 import torch
+import numpy as np
 
 from ark_nlp.factory.utils.conlleval import get_entities
+from ark_nlp.factory.utils.quantization import quantize
 
 
 class CRFNERPredictor(object):
@@ -29,6 +31,7 @@ class CRFNERPredictor(object):
         module: 深度学习模型
         tokernizer: 分词器
         cat2id (:obj:`dict`): 标签映射
+        is_quantized (:obj:`bool`, optional, defaults to False): 是否对编码器进行动态int8量化，量化后只能在CPU上推理
     """  # noqa: ignore flake8"
 
     def __init__(
@@ -36,10 +39,14 @@ class CRFNERPredictor(object):
         module,
         tokernizer,
         cat2id,
-        markup='bio'
+        markup='bio',
+        is_quantized=False
     ):
         self.markup = markup
 
+        if is_quantized:
+            module = quantize(module)
+
         self.module = module
         self.module.task = 'TokenLevel'
 
@@ -120,7 +127,15 @@ class CRFNERPredictor(object):
         tags = tags.squeeze(0)
 
         preds = tags.detach().cpu().numpy().tolist()
-        preds = preds[0][1:]
+
+        return self._decode_entities(text, preds[0])
+
+    def _decode_entities(
+        self,
+        text,
+        preds
+    ):
+        preds = preds[1:]
         preds = preds[:len(text)]
 
         tags = [self.id2cat[x] for x in preds]
@@ -140,3 +155,29 @@ class CRFNERPredictor(object):
             })
 
         return entities
+
+    def predict_texts(
+        self,
+        texts
+    ):
+        """
+        多条文本拼成一个batch预测，返回结果与逐条调用predict_one_sample一致
+
+        Args:
+            texts (:obj:`list`): 输入文本列表
+        """  # noqa: ignore flake8"
+
+        features = [self._get_input_ids(text_) for text_ in texts]
+        self.module.eval()
+
+        with torch.no_grad():
+            inputs = {
+                col: torch.tensor(np.stack([feature_[col] for feature_ in features])).type(torch.long).to(self.device)
+                for col in features[0]
+            }
+            logits = self.module(**inputs)
+            tags = self.module.crf.decode(logits, inputs['attention_mask']).squeeze(0)
+
+        preds = tags.detach().cpu().numpy().tolist()
+
+        return [self._decode_entities(text_, preds_) for text_, preds_ in zip(texts, preds)]
@@ -19,6 +19,8 @@
 import torch
 import numpy as np
 
+from ark_nlp.factory.utils.quantization import quantize
+
 
 class GlobalPointerNERPredictor(object):
     """
@@ -28,14 +30,19 @@ class GlobalPointerNERPredictor(object):
         module: 深度学习模型
         tokernizer: 分词器
         cat2id (:obj:`dict`): 标签映射
+        is_quantized (:obj:`bool`, optional, defaults to False): 是否对编码器进行动态int8量化，量化后只能在CPU上推理
     """  # noqa: ignore flake8"
 
     def __init__(
         self,
         module,
         tokernizer,
-        cat2id
+        cat2id,
+        is_quantized=False
     ):
+        if is_quantized:
+            module = quantize(module)
+
         self.module = module
         self.module.task = 'TokenLevel'
 
@@ -111,11 +118,32 @@ class GlobalPointerNERPredictor(object):
             inputs = self._get_module_one_sample_inputs(features)
             scores = self.module(**inputs)[0].cpu()
 
+        return self._decode_entities(text, scores, token_mapping, threshold)
+
+    def _decode_entities(
+        self,
+        text,
+        scores,
+        token_mapping,
+        threshold=0
+    ):
         scores[:, [0, -1]] -= np.inf
-        scores[:, :, [0, -1]] -= np.inf
+
+        max_span_width = getattr(self.module, 'max_span_width', None)
+        if max_span_width is None:
+            scores[:, :, [0, -1]] -= np.inf
+            spans = zip(*np.where(scores > threshold))
+        else:
+            # 宽度受限格式的第w列对应结束位置start+w，结束位置不能是[CLS]或末尾位置
+            seq_len = scores.shape[-2]
+            spans = [
+                (category_, start_, start_ + width_)
+                for category_, start_, width_ in zip(*np.where(scores > threshold))
+                if 0 < start_ + width_ < seq_len - 1
+            ]
 
         entities = []
-        for category, start, end in zip(*np.where(scores > threshold)):
+        for category, start, end in spans:
             if end-1 > token_mapping[-1][-1]:
                 break
             if token_mapping[start-1][0] <= token_mapping[end-1][-1]:
@@ -132,3 +160,31 @@ class GlobalPointerNERPredictor(object):
                 entities.append(entitie_)
 
         return entities
+
+    def predict_texts(
+        self,
+        texts,
+        threshold=0
+    ):
+        """
+        多条文本拼成一个batch预测，返回结果与逐条调用predict_one_sample一致
+
+        Args:
+            texts (:obj:`list`): 输入文本列表
+            threshold (:obj:`float`, optional, defaults to 0): 预测的阈值
+        """  # noqa: ignore flake8"
+
+        features, token_mappings = zip(*[self._get_input_ids(text_) for text_ in texts])
+        self.module.eval()
+
+        with torch.no_grad():
+            inputs = {
+                col: torch.tensor(np.stack([feature_[col] for feature_ in features])).type(torch.long).to(self.device)
+                for col in features[0]
+            }
+            scores = self.module(**inputs).cpu()
+
+        return [
+            self._decode_entities(text_, scores_, token_mapping_, threshold)
+            for text_, scores_, token_mapping_ in zip(texts, scores, token_mappings)
+        ]
@@ -0,0 +1,301 @@
+# Copyright (c) 2020 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import json
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ServerBusyError(Exception):
+    pass
+
+
+def get_batch_fn(predictor, **predict_kwargs):
+    """
+    获取预测器的batch预测函数，优先使用predict_texts，否则退化为逐条调用predict_one_sample
+
+    Args:
+        predictor: 预测器，例如TCPredictor、GlobalPointerNERPredictor
+        **predict_kwargs: 传给预测函数的其他参数，例如topk、threshold
+    """  # noqa: ignore flake8"
+
+    if hasattr(predictor, 'predict_texts'):
+        def batch_fn(texts):
+            return predictor.predict_texts(texts, **predict_kwargs)
+    else:
+        def batch_fn(texts):
+            return [predictor.predict_one_sample(text_, **predict_kwargs) for text_ in texts]
+
+    return batch_fn
+
+
+def _json_default(obj):
+    if hasattr(obj, 'item'):
+        return obj.item()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    return str(obj)
+
+
+class MicroBatchServer(object):
+    """
+    基于asyncio的微批推理服务，将逐条到达的请求在最大等待时间窗口内合并成batch，
+    通过预测器的batch路径统一前向，再把结果分发给各请求
+
+    Args:
+        predictor (:obj:`object` or :obj:`None`, optional, defaults to None): 预测器，例如TCPredictor、GlobalPointerNERPredictor
+        batch_fn (:obj:`callable` or :obj:`None`, optional, defaults to None):
+            自定义的batch预测函数，输入文本列表，返回等长的结果列表，设置后忽略predictor
+        max_batch_size (:obj:`int`, optional, defaults to 32): 合并的最大batch大小
+        max_latency (:obj:`float`, optional, defaults to 0.005): 第一个请求到达后最多等待的秒数
+        max_queue_size (:obj:`int`, optional, defaults to 1024): 最大排队请求数，超过时直接拒绝请求
+        **predict_kwargs: 传给预测器预测函数的其他参数
+
+    Example::
+
+        >>> server = MicroBatchServer(TCPredictor(module, tokenizer, cat2id), max_batch_size=32, max_latency=0.005)
+        >>> server.run(host='127.0.0.1', port=8000)
+
+        $ curl -X POST http://127.0.0.1:8000/predict -d '{"text": "今天天气不错"}'
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        predictor=None,
+        batch_fn=None,
+        max_batch_size=32,
+        max_latency=0.005,
+        max_queue_size=1024,
+        **predict_kwargs
+    ):
+        if batch_fn is None:
+            if predictor is None:
+                raise ValueError("One of predictor and batch_fn must be set")
+            batch_fn = get_batch_fn(predictor, **predict_kwargs)
+
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.max_queue_size = max_queue_size
+
+        self.queue = None
+        self.worker = None
+        self.http_server = None
+        # 模型前向在单独的线程中执行，避免阻塞事件循环接收新的请求
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        self.stats = {
+            'num_requests': 0,
+            'num_batches': 0,
+            'num_rejected': 0,
+            'max_batch_size': 0
+        }
+
+    async def start(self):
+        if self.worker is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self.worker = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def stop(self):
+        if self.http_server is not None:
+            self.http_server.close()
+            await self.http_server.wait_closed()
+            self.http_server = None
+
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+
+        # 取消仍在排队的请求
+        while self.queue is not None and not self.queue.empty():
+            _, future_ = self.queue.get_nowait()
+            if not future_.done():
+                future_.cancel()
+
+    async def predict(self, text):
+        """
+        提交单条请求并等待结果，队列已满时抛出ServerBusyError
+
+        Args:
+            text (:obj:`string`): 输入文本
+        """  # noqa: ignore flake8"
+
+        await self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((text, future))
+        except asyncio.QueueFull:
+            self.stats['num_rejected'] += 1
+            raise ServerBusyError("The request queue is full")
+
+        self.stats['num_requests'] += 1
+
+        return await future
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_latency
+
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = await self._collect_batch()
+
+            # 已经被取消的请求不再参与计算
+            batch = [(text_, future_) for text_, future_ in batch if not future_.done()]
+            if len(batch) == 0:
+                continue
+
+            texts = [text_ for text_, _ in batch]
+
+            try:
+                results = await loop.run_in_executor(self.executor, self.batch_fn, texts)
+            except Exception as e:
+                for _, future_ in batch:
+                    if not future_.done():
+                        future_.set_exception(e)
+                continue
+
+            self.stats['num_batches'] += 1
+            self.stats['max_batch_size'] = max(self.stats['max_batch_size'], len(batch))
+
+            for (_, future_), result_ in zip(batch, results):
+                if not future_.done():
+                    future_.set_result(result_)
+
+    async def _write_response(self, writer, status, body):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+        body = json.dumps(body, ensure_ascii=False, default=_json_default).encode('utf-8')
+        header = (
+            'HTTP/1.1 {} {}\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            'Content-Length: {}\r\n'
+            'Connection: close\r\n\r\n'
+        ).format(status, reasons[status], len(body))
+
+        writer.write(header.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1')
+                if line in ('\r\n', '\n', ''):
+                    break
+                key_, _, value_ = line.partition(':')
+                headers[key_.strip().lower()] = value_.strip()
+
+            if len(request_line) < 2:
+                return await self._write_response(writer, 400, {'error': 'bad request'})
+
+            method, path = request_line[0], request_line[1]
+
+            if method == 'GET' and path == '/health':
+                return await self._write_response(
+                    writer,
+                    200,
+                    dict(self.stats, queue_size=self.queue.qsize() if self.queue is not None else 0)
+                )
+
+            if method != 'POST' or path != '/predict':
+                return await self._write_response(writer, 404, {'error': 'not found'})
+
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            try:
+                data = json.loads(body.decode('utf-8'))
+            except ValueError:
+                return await self._write_response(writer, 400, {'error': 'invalid json'})
+
+            try:
+                if 'texts' in data:
+                    # 多条请求整体判断是否超出队列容量，避免部分入队
+                    await self.start()
+                    if self.queue.qsize() + len(data['texts']) > self.max_queue_size:
+                        self.stats['num_rejected'] += len(data['texts'])
+                        raise ServerBusyError("The request queue is full")
+                    result = await asyncio.gather(*[self.predict(text_) for text_ in data['texts']])
+                    return await self._write_response(writer, 200, {'results': list(result)})
+                elif 'text' in data:
+                    result = await self.predict(data['text'])
+                    return await self._write_response(writer, 200, {'result': result})
+                else:
+                    return await self._write_response(writer, 400, {'error': 'text or texts is required'})
+            except ServerBusyError as e:
+                return await self._write_response(writer, 503, {'error': str(e)})
+            except Exception as e:
+                return await self._write_response(writer, 500, {'error': repr(e)})
+        finally:
+            writer.close()
+
+    async def serve(
+        self,
+        host='127.0.0.1',
+        port=8000
+    ):
+        """
+        启动HTTP服务，提供POST /predict和GET /health两个接口
+
+        Args:
+            host (:obj:`string`, optional, defaults to "127.0.0.1"): 监听地址
+            port (:obj:`int`, optional, defaults to 8000): 监听端口，设为0时随机选择可用端口
+        """  # noqa: ignore flake8"
+
+        await self.start()
+        self.http_server = await asyncio.start_server(self._handle_connection, host, port)
+
+        return self.http_server
+
+    def run(
+        self,
+        host='127.0.0.1',
+        port=8000
+    ):
+        async def _run():
+            server = await self.serve(host, port)
+            async with server:
+                await server.serve_forever()
+
+        asyncio.run(_run())
@@ -0,0 +1,206 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+from ark_nlp.factory.predictor.micro_batch_server import get_batch_fn
+
+
+class SlidingWindowNERPredictor(object):
+    """
+    长文本命名实体识别的滑动窗口预测器，将超过max_seq_len的文本切分成有重叠的窗口，
+    多篇文本的窗口拼成batch统一预测，再把实体位置映射回原文并合并重叠区域的结果
+
+    Args:
+        predictor: 命名实体识别的预测器，例如GlobalPointerNERPredictor、CRFNERPredictor
+        window_size (:obj:`int` or :obj:`None`, optional, defaults to None):
+            每个窗口的token数，默认为None，即max_seq_len-2
+        stride (:obj:`int` or :obj:`None`, optional, defaults to None):
+            相邻窗口起始位置的token间隔，默认为None，即window_size的一半，重叠长度应大于最长的实体
+        batch_size (:obj:`int`, optional, defaults to 32): 窗口预测时的batch大小
+        conflict_strategy (:obj:`string`, optional, defaults to "center"):
+            不同窗口预测的实体发生重叠时的处理方式，可选有["center", "longest", "union"]，
+            center只保留中点落在窗口中心区域(重叠区域以中点划分)内的实体，
+            longest在重叠实体中保留最长的实体，union保留全部去重后的实体
+        **predict_kwargs: 传给预测器预测函数的其他参数，例如threshold
+
+    Example::
+
+        >>> predictor = SlidingWindowNERPredictor(GlobalPointerNERPredictor(module, tokenizer, cat2id), stride=384)
+        >>> predictor.predict_texts(long_texts)
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        predictor,
+        window_size=None,
+        stride=None,
+        batch_size=32,
+        conflict_strategy='center',
+        **predict_kwargs
+    ):
+        if conflict_strategy not in ('center', 'longest', 'union'):
+            raise ValueError("The conflict strategy does not exist")
+
+        self.predictor = predictor
+        self.tokenizer = predictor.tokenizer
+
+        if window_size is None:
+            window_size = self.tokenizer.max_seq_len - 2
+        if stride is None:
+            stride = max(window_size // 2, 1)
+
+        if stride > window_size:
+            raise ValueError("The stride must not be greater than the window size")
+
+        self.window_size = window_size
+        self.stride = stride
+        self.batch_size = batch_size
+        self.conflict_strategy = conflict_strategy
+
+        self.batch_fn = get_batch_fn(predictor, **predict_kwargs)
+
+    def _split_windows(
+        self,
+        text
+    ):
+        """
+        按token切分窗口，返回每个窗口在原文中的字符区间以及中心区域的字符区间
+        """  # noqa: ignore flake8"
+
+        tokens = self.tokenizer.tokenize(text)
+        token_mapping = self.tokenizer.get_token_mapping(text, tokens)
+
+        # 没有对应字符的token无法作为窗口边界
+        token_mapping = [mapping_ for mapping_ in token_mapping if mapping_]
+
+        if len(token_mapping) <= self.window_size:
+            return [(0, len(text), 0, len(text))]
+
+        starts = list(range(0, len(token_mapping) - self.window_size, self.stride))
+        starts.append(len(token_mapping) - self.window_size)
+
+        windows = []
+        for index_, start_ in enumerate(starts):
+            end_ = start_ + self.window_size
+
+            char_start = token_mapping[start_][0] if index_ > 0 else 0
+            char_end = token_mapping[end_ - 1][-1] + 1 if index_ < len(starts) - 1 else len(text)
+
+            # 中心区域的边界为相邻窗口重叠部分的中点
+            if index_ > 0:
+                core_start = token_mapping[(start_ + starts[index_ - 1] + self.window_size) // 2][0]
+            else:
+                core_start = 0
+
+            if index_ < len(starts) - 1:
+                core_end = token_mapping[(end_ + starts[index_ + 1]) // 2][0]
+            else:
+                core_end = len(text)
+
+            windows.append((char_start, char_end, core_start, core_end))
+
+        return windows
+
+    def _merge_entities(
+        self,
+        candidates
+    ):
+        if self.conflict_strategy == 'center':
+            entities = [
+                entity_ for entity_, (core_start_, core_end_), _ in candidates
+                if core_start_ <= (entity_['start_idx'] + entity_['end_idx']) / 2 < core_end_
+            ]
+        elif self.conflict_strategy == 'longest':
+            candidates = sorted(
+                candidates,
+                key=lambda x: x[0]['end_idx'] - x[0]['start_idx'],
+                reverse=True
+            )
+
+            entities = []
+            kept = []
+            for entity_, _, window_index_ in candidates:
+                # 同一窗口内的嵌套实体不视为冲突
+                is_conflict = any(
+                    kept_window_ != window_index_
+                    and entity_['start_idx'] <= kept_['end_idx']
+                    and kept_['start_idx'] <= entity_['end_idx']
+                    and (entity_['start_idx'], entity_['end_idx'], entity_['type'])
+                    != (kept_['start_idx'], kept_['end_idx'], kept_['type'])
+                    for kept_, kept_window_ in kept
+                )
+                if not is_conflict:
+                    kept.append((entity_, window_index_))
+                    entities.append(entity_)
+        else:
+            entities = [entity_ for entity_, _, _ in candidates]
+
+        merged = {}
+        for entity_ in entities:
+            merged.setdefault((entity_['start_idx'], entity_['end_idx'], entity_['type']), entity_)
+
+        return [merged[key_] for key_ in sorted(merged)]
+
+    def predict_texts(
+        self,
+        texts
+    ):
+        """
+        多篇长文本预测，所有文本的窗口一起按batch_size组成batch
+
+        Args:
+            texts (:obj:`list`): 输入文本列表
+        """  # noqa: ignore flake8"
+
+        windows = []
+        for text_index_, text_ in enumerate(texts):
+            for window_index_, window_ in enumerate(self._split_windows(text_)):
+                windows.append((text_index_, window_index_, window_))
+
+        window_texts = [texts[text_index_][window_[0]:window_[1]] for text_index_, _, window_ in windows]
+
+        window_entities = []
+        for start_ in range(0, len(window_texts), self.batch_size):
+            window_entities.extend(self.batch_fn(window_texts[start_:start_ + self.batch_size]))
+
+        candidates = [[] for _ in texts]
+        for (text_index_, window_index_, window_), entities_ in zip(windows, window_entities):
+            char_start, _, core_start, core_end = window_
+            text_ = texts[text_index_]
+
+            for entity_ in entities_:
+                entity_ = dict(entity_)
+                entity_['start_idx'] += char_start
+                entity_['end_idx'] += char_start
+                entity_['entity'] = text_[entity_['start_idx']: entity_['end_idx'] + 1]
+
+                candidates[text_index_].append((entity_, (core_start, core_end), window_index_))
+
+        return [self._merge_entities(candidates_) for candidates_ in candidates]
+
+    def predict_one_sample(
+        self,
+        text=''
+    ):
+        """
+        单篇长文本预测
+
+        Args:
+            text (:obj:`string`): 输入文本
+        """  # noqa: ignore flake8"
+
+        return self.predict_texts([text])[0]
@@ -17,6 +17,7 @@
 
 
 import torch
+import numpy as np
 
 
 class SpanNERPredictor(object):
@@ -103,6 +104,15 @@ class SpanNERPredictor(object):
             start_scores = torch.argmax(start_logits[0].cpu(), -1).numpy()[1:]
             end_scores = torch.argmax(end_logits[0].cpu(), -1).numpy()[1:]
 
+        return self._decode_entities(text, start_scores, end_scores, token_mapping)
+
+    def _decode_entities(
+        self,
+        text,
+        start_scores,
+        end_scores,
+        token_mapping
+    ):
         entities = []
         for index_, s_l in enumerate(start_scores):
             if s_l == 0:
@@ -127,3 +137,33 @@ class SpanNERPredictor(object):
                     break
 
         return entities
+
+    def predict_texts(
+        self,
+        texts
+    ):
+        """
+        多条文本拼成一个batch预测，返回结果与逐条调用predict_one_sample一致
+
+        Args:
+            texts (:obj:`list`): 输入文本列表
+        """  # noqa: ignore flake8"
+
+        features, token_mappings = zip(*[self._get_input_ids(text_) for text_ in texts])
+        self.module.eval()
+
+        with torch.no_grad():
+            inputs = {
+                col: torch.tensor(np.stack([feature_[col] for feature_ in features])).type(torch.long).to(self.device)
+                for col in features[0]
+            }
+            start_logits, end_logits = self.module(**inputs)
+            start_scores = torch.argmax(start_logits.cpu(), -1).numpy()[:, 1:]
+            end_scores = torch.argmax(end_logits.cpu(), -1).numpy()[:, 1:]
+
+        return [
+            self._decode_entities(text_, start_scores_, end_scores_, token_mapping_)
+            for text_, start_scores_, end_scores_, token_mapping_ in zip(
+                texts, start_scores, end_scores, token_mappings
+            )
+        ]
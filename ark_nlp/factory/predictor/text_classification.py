@@ -17,8 +17,10 @@
 
 
 import torch
+import numpy as np
 
 from torch.utils.data import DataLoader
+from ark_nlp.factory.utils.quantization import quantize
 
 
 class TCPredictor(object):
@@ -29,15 +31,20 @@ class TCPredictor(object):
         module: 深度学习模型
         tokernizer: 分词器
         cat2id (:obj:`dict`): 标签映射
+        is_quantized (:obj:`bool`, optional, defaults to False): 是否对编码器进行动态int8量化，量化后只能在CPU上推理
     """  # noqa: ignore flake8"
 
     def __init__(
         self,
         module,
         tokernizer,
-        cat2id
+        cat2id,
+        is_quantized=False
     ):
 
+        if is_quantized:
+            module = quantize(module)
+
         self.module = module
         self.module.task = 'SequenceLevel'
 
@@ -143,6 +150,50 @@ class TCPredictor(object):
 
         return preds
 
+    def predict_texts(
+        self,
+        texts,
+        topk=1,
+        return_label_name=True,
+        return_proba=False
+    ):
+        """
+        多条文本拼成一个batch预测，返回结果与逐条调用predict_one_sample一致
+
+        Args:
+            texts (:obj:`list`): 输入文本列表
+            topk (:obj:`int`, optional, defaults to 1): 返回TopK结果
+            return_label_name (:obj:`bool`, optional, defaults to True): 返回结果的标签ID转化成原始标签
+            return_proba (:obj:`bool`, optional, defaults to False): 返回结果是否带上预测的概率
+        """  # noqa: ignore flake8"
+
+        if topk is None:
+            topk = len(self.cat2id) if len(self.cat2id) > 2 else 1
+
+        features = [self._get_input_ids(text_) for text_ in texts]
+        self.module.eval()
+
+        with torch.no_grad():
+            inputs = {
+                col: torch.tensor(np.stack([feature_[col] for feature_ in features])).type(torch.long).to(self.device)
+                for col in features[0]
+            }
+            logits = self.module(**inputs)
+            logits = torch.nn.functional.softmax(logits, dim=1)
+
+        probs, indices = logits.topk(topk, dim=1, sorted=True)
+
+        results = []
+        for indices_, probs_ in zip(indices.cpu().numpy(), probs.cpu().numpy().tolist()):
+            preds = [self.id2cat[pred_] if return_label_name else pred_ for pred_ in indices_]
+
+            if return_proba:
+                results.append(list(zip(preds, probs_)))
+            else:
+                results.append(preds)
+
+        return results
+
     def _get_module_batch_inputs(
         self,
         features
@@ -0,0 +1,172 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import torch
+
+from torch.utils.data import DataLoader
+from ark_nlp.factory.predictor.text_classification import TCPredictor
+from ark_nlp.dataset.base._sentence_classification_dataset import chunk_collate_fn
+
+
+class ChunkPoolingTCPredictor(TCPredictor):
+    """
+    长文本分类模型(ChunkPoolingBert)的预测器，文本按token切分成多个片段后一起预测
+
+    Args:
+        module: 深度学习模型
+        tokernizer: 分词器
+        cat2id (:obj:`dict`): 标签映射
+        chunk_stride (:obj:`int` or :obj:`None`, optional, defaults to None):
+            相邻片段起始位置的token间隔，默认为None，即max_seq_len-2，片段之间没有重叠
+        max_chunk_num (:obj:`int` or :obj:`None`, optional, defaults to None): 每个文本最多保留的片段数，默认为None，即不限制
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        *args,
+        chunk_stride=None,
+        max_chunk_num=None,
+        **kwargs
+    ):
+        super(ChunkPoolingTCPredictor, self).__init__(*args, **kwargs)
+
+        self.chunk_stride = chunk_stride
+        self.max_chunk_num = max_chunk_num
+
+    def _convert_to_transfomer_ids(
+        self,
+        text
+    ):
+        input_ids = self.tokenizer.chunk_to_ids(
+            text,
+            stride=self.chunk_stride,
+            max_chunk_num=self.max_chunk_num
+        )
+        input_ids, input_mask, segment_ids = input_ids
+
+        features = {
+                'input_ids': input_ids,
+                'attention_mask': input_mask,
+                'token_type_ids': segment_ids
+            }
+        return features
+
+    def _get_module_one_sample_inputs(
+        self,
+        features
+    ):
+        return self._get_module_texts_inputs([features])
+
+    def _get_module_texts_inputs(
+        self,
+        features
+    ):
+        inputs = chunk_collate_fn(features)
+        return {col: inputs[col].type(torch.long).to(self.device) for col in inputs}
+
+    def predict_texts(
+        self,
+        texts,
+        topk=1,
+        return_label_name=True,
+        return_proba=False
+    ):
+        """
+        多条文本的片段拼成一个batch预测，返回结果与逐条调用predict_one_sample一致
+
+        Args:
+            texts (:obj:`list`): 输入文本列表
+            topk (:obj:`int`, optional, defaults to 1): 返回TopK结果
+            return_label_name (:obj:`bool`, optional, defaults to True): 返回结果的标签ID转化成原始标签
+            return_proba (:obj:`bool`, optional, defaults to False): 返回结果是否带上预测的概率
+        """  # noqa: ignore flake8"
+
+        if topk is None:
+            topk = len(self.cat2id) if len(self.cat2id) > 2 else 1
+
+        features = [self._get_input_ids(text_) for text_ in texts]
+        self.module.eval()
+
+        with torch.no_grad():
+            inputs = self._get_module_texts_inputs(features)
+            logits = self.module(**inputs)
+            logits = torch.nn.functional.softmax(logits, dim=1)
+
+        probs, indices = logits.topk(topk, dim=1, sorted=True)
+
+        results = []
+        for indices_, probs_ in zip(indices.cpu().numpy(), probs.cpu().numpy().tolist()):
+            preds = [self.id2cat[pred_] if return_label_name else pred_ for pred_ in indices_]
+
+            if return_proba:
+                results.append(list(zip(preds, probs_)))
+            else:
+                results.append(preds)
+
+        return results
+
+    def predict_batch(
+        self,
+        test_data,
+        batch_size=16,
+        shuffle=False,
+        return_label_name=True,
+        return_proba=False
+    ):
+        """
+        batch样本预测
+
+        Args:
+            test_data (:obj:`ark_nlp dataset`): ChunkSentenceClassificationDataset格式的输入batch文本
+            batch_size (:obj:`int`, optional, defaults to 16): batch大小，即每个batch的文本数
+            shuffle (:obj:`bool`, optional, defaults to False): 是否打扰数据集
+            return_label_name (:obj:`bool`, optional, defaults to True): 返回结果的标签ID转化成原始标签
+            return_proba (:obj:`bool`, optional, defaults to False): 返回结果是否带上预测的概率
+        """  # noqa: ignore flake8"
+
+        self.inputs_cols = test_data.dataset_cols
+
+        preds = []
+        probas = []
+
+        self.module.eval()
+        generator = DataLoader(
+            test_data,
+            batch_size=batch_size,
+            shuffle=False,
+            collate_fn=chunk_collate_fn
+        )
+
+        with torch.no_grad():
+            for step, inputs in enumerate(generator):
+                inputs = self._get_module_batch_inputs(inputs)
+
+                logits = self.module(**inputs)
+
+                preds.extend(torch.max(logits, 1)[1].cpu().numpy())
+                if return_proba:
+                    logits = torch.nn.functional.softmax(logits, dim=1)
+                    probas.extend(logits.max(dim=1).values.cpu().detach().numpy())
+
+        if return_label_name:
+            preds = [self.id2cat[pred_] for pred_ in preds]
+
+        if return_proba:
+            return list(zip(preds, probas))
+
+        return preds
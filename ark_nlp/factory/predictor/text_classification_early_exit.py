@@ -0,0 +1,152 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import time
+import torch
+
+from torch.utils.data import DataLoader
+from ark_nlp.factory.predictor.text_classification import TCPredictor
+
+
+class EarlyExitTCPredictor(TCPredictor):
+    """
+    早退文本分类模型(EarlyExitBert)的预测器，batch预测时置信度达到阈值的样本提前退出
+
+    Args:
+        module: 深度学习模型
+        tokernizer: 分词器
+        cat2id (:obj:`dict`): 标签映射
+        threshold (:obj:`float`, optional, defaults to 0.9): 退出的置信度阈值
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        *args,
+        threshold=0.9,
+        **kwargs
+    ):
+        super(EarlyExitTCPredictor, self).__init__(*args, **kwargs)
+
+        self.threshold = threshold
+        self.exit_logs = {}
+
+    def predict_batch(
+        self,
+        test_data,
+        batch_size=16,
+        shuffle=False,
+        return_label_name=True,
+        return_proba=False,
+        threshold=None
+    ):
+        """
+        batch样本预测，预测后平均使用的层数等信息记录在self.exit_logs中
+
+        Args:
+            test_data (:obj:`ark_nlp dataset`): 输入batch文本
+            batch_size (:obj:`int`, optional, defaults to 16): batch大小
+            shuffle (:obj:`bool`, optional, defaults to False): 是否打扰数据集
+            return_label_name (:obj:`bool`, optional, defaults to True): 返回结果的标签ID转化成原始标签
+            return_proba (:obj:`bool`, optional, defaults to False): 返回结果是否带上预测的概率
+            threshold (:obj:`float` or :obj:`None`, optional, defaults to None): 退出的置信度阈值，默认使用初始化时的设置
+        """  # noqa: ignore flake8"
+
+        if threshold is None:
+            threshold = self.threshold
+
+        self.inputs_cols = test_data.dataset_cols
+
+        preds = []
+        probas = []
+        exit_layers = []
+
+        self.module.eval()
+        generator = DataLoader(test_data, batch_size=batch_size, shuffle=False)
+
+        with torch.no_grad():
+            for step, inputs in enumerate(generator):
+                inputs = self._get_module_batch_inputs(inputs)
+
+                logits, exit_layers_ = self.module.early_exit_forward(**inputs, threshold=threshold)
+
+                preds.extend(torch.max(logits, 1)[1].cpu().numpy())
+                exit_layers.extend(exit_layers_.cpu().numpy().tolist())
+                if return_proba:
+                    logits = torch.nn.functional.softmax(logits, dim=1)
+                    probas.extend(logits.max(dim=1).values.cpu().detach().numpy())
+
+        num_layers = len(self.module.bert.encoder.layer)
+        self.exit_logs = {
+            'threshold': threshold,
+            'avg_layers': sum(exit_layers) / max(len(exit_layers), 1),
+            'num_layers': num_layers,
+            'exit_layers': exit_layers
+        }
+
+        if return_label_name:
+            preds = [self.id2cat[pred_] for pred_ in preds]
+
+        if return_proba:
+            return list(zip(preds, probas))
+
+        return preds
+
+    def evaluate_thresholds(
+        self,
+        test_data,
+        thresholds=(0.5, 0.7, 0.9, 0.95, 0.99),
+        batch_size=16
+    ):
+        """
+        比较不同退出阈值下的准确率、平均使用层数和相对于完整计算的吞吐提升，用于选择满足质量要求的阈值
+
+        Args:
+            test_data (:obj:`ark_nlp dataset`): 带标签的数据集
+            thresholds (:obj:`tuple`, optional, defaults to (0.5, 0.7, 0.9, 0.95, 0.99)): 需要比较的阈值
+            batch_size (:obj:`int`, optional, defaults to 16): batch大小
+
+        Returns:
+            list: 第一个元素为完整计算(不提前退出)的结果，其余依次为各个阈值的结果
+        """  # noqa: ignore flake8"
+
+        labels = [feature_['label_ids'] for feature_ in test_data.dataset]
+
+        reports = []
+        # 阈值大于1时所有样本均计算全部层，作为比较的基准
+        for threshold_ in (1.1,) + tuple(thresholds):
+            start_time = time.perf_counter()
+            preds = self.predict_batch(
+                test_data,
+                batch_size=batch_size,
+                return_label_name=False,
+                threshold=threshold_
+            )
+            cost_time = time.perf_counter() - start_time
+
+            reports.append({
+                'threshold': threshold_ if threshold_ <= 1 else None,
+                'acc': sum(int(pred_ == label_) for pred_, label_ in zip(preds, labels)) / len(labels),
+                'avg_layers': self.exit_logs['avg_layers'],
+                'time': cost_time,
+                'speedup': reports[0]['time'] / cost_time if reports else 1.0
+            })
+
+        for report_ in reports:
+            report_['acc_delta'] = report_['acc'] - reports[0]['acc']
+
+        return reports
@@ -19,6 +19,8 @@
 import torch
 from torch.utils.data import DataLoader
 
+from ark_nlp.factory.utils.quantization import quantize
+
 
 class TMPredictor(object):
     """
@@ -28,15 +30,20 @@ class TMPredictor(object):
         module: 深度学习模型
         tokernizer: 分词器
         cat2id (:obj:`dict`): 标签映射
+        is_quantized (:obj:`bool`, optional, defaults to False): 是否对编码器进行动态int8量化，量化后只能在CPU上推理
     """  # noqa: ignore flake8"
 
     def __init__(
         self,
         module,
         tokernizer,
-        cat2id
+        cat2id,
+        is_quantized=False
     ):
 
+        if is_quantized:
+            module = quantize(module)
+
         self.module = module
         self.module.task = 'SequenceLevel'
 
@@ -0,0 +1,198 @@
+# Copyright (c) 2020 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import time
+import torch
+import numpy as np
+
+
+class TMCascadePredictor(object):
+    """
+    召回-精排级联的文本匹配预测器，先用双塔句向量索引召回候选，再只对候选使用交互式的TMPredictor进行batch精排
+
+    Args:
+        retriever: 召回索引，需实现search(queries, topk)并返回(scores, ids)，例如UnsupervisedSimCSEIndex
+        reranker (:obj:`TMPredictor`): 精排使用的句子对匹配预测器
+        candidates (:obj:`list` or :obj:`None`, optional, defaults to None): 候选文本列表，默认使用retriever.texts
+        recall_topk (:obj:`int`, optional, defaults to 100): 每个查询召回的候选数
+        rerank_batch_size (:obj:`int`, optional, defaults to 64): 精排时的batch大小
+        rerank_label (:obj:`string` or :obj:`None`, optional, defaults to None):
+            精排分数所使用的标签，默认为None，即使用标签ID为1的概率
+        fusion (:obj:`string`, optional, defaults to "rerank"):
+            最终分数的融合方式，可选有["rerank", "linear", "rrf"]，
+            rerank只使用精排分数，linear为召回分数和精排分数的加权和，rrf为倒数排名融合
+        fusion_weight (:obj:`float`, optional, defaults to 0.5): linear融合时精排分数的权重
+        rrf_k (:obj:`int`, optional, defaults to 60): rrf融合的平滑常数
+
+    Example::
+
+        >>> index = UnsupervisedSimCSEIndex(simcse_module, simcse_tokenizer).build(corpus)
+        >>> cascade = TMCascadePredictor(index, TMPredictor(tm_module, tm_tokenizer, cat2id), recall_topk=50)
+        >>> results = cascade.predict(['头痛'], topk=5)
+        >>> cascade.latency
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        retriever,
+        reranker,
+        candidates=None,
+        recall_topk=100,
+        rerank_batch_size=64,
+        rerank_label=None,
+        fusion='rerank',
+        fusion_weight=0.5,
+        rrf_k=60
+    ):
+        if fusion not in ('rerank', 'linear', 'rrf'):
+            raise ValueError("The fusion method does not exist")
+
+        self.retriever = retriever
+        self.reranker = reranker
+
+        self.candidates = candidates if candidates is not None else retriever.texts
+        if self.candidates is None:
+            raise ValueError("The candidates is None, please set candidates or retain texts in retriever")
+
+        self.recall_topk = recall_topk
+        self.rerank_batch_size = rerank_batch_size
+
+        self.rerank_label_id = 1 if rerank_label is None else self.reranker.cat2id[rerank_label]
+
+        self.fusion = fusion
+        self.fusion_weight = fusion_weight
+        self.rrf_k = rrf_k
+
+        self.latency = {}
+
+    def _synchronize(self):
+        if torch.device(self.reranker.device).type == 'cuda':
+            torch.cuda.synchronize(self.reranker.device)
+
+    def rerank(
+        self,
+        text_pairs
+    ):
+        """
+        使用精排模型对句子对打分
+
+        Args:
+            text_pairs (:obj:`list`): (query, candidate)组成的列表
+
+        Returns:
+            np.ndarray: (len(text_pairs),)的精排分数
+        """  # noqa: ignore flake8"
+
+        self.reranker.module.eval()
+
+        scores = []
+        with torch.no_grad():
+            for start_ in range(0, len(text_pairs), self.rerank_batch_size):
+                features = [
+                    self.reranker._get_input_ids(text_a_, text_b_)
+                    for text_a_, text_b_ in text_pairs[start_:start_ + self.rerank_batch_size]
+                ]
+
+                inputs = {
+                    col: torch.tensor(np.stack([feature_[col] for feature_ in features]), dtype=torch.long).to(self.reranker.device)
+                    for col in features[0]
+                }
+
+                logits = self.reranker.module(**inputs)
+                probas = torch.nn.functional.softmax(logits, dim=1)[:, self.rerank_label_id]
+
+                scores.append(probas.cpu().numpy())
+
+        return np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+
+    def _fuse(self, retrieve_scores, rerank_scores):
+        if self.fusion == 'rerank':
+            return rerank_scores
+        elif self.fusion == 'linear':
+            return self.fusion_weight * rerank_scores + (1 - self.fusion_weight) * retrieve_scores
+        else:
+            retrieve_ranks = np.argsort(np.argsort(-retrieve_scores, kind='stable'), kind='stable')
+            rerank_ranks = np.argsort(np.argsort(-rerank_scores, kind='stable'), kind='stable')
+            return 1.0 / (self.rrf_k + retrieve_ranks + 1) + 1.0 / (self.rrf_k + rerank_ranks + 1)
+
+    def predict(
+        self,
+        queries,
+        topk=10,
+        recall_topk=None
+    ):
+        """
+        级联预测
+
+        Args:
+            queries (:obj:`list`): 查询文本列表
+            topk (:obj:`int`, optional, defaults to 10): 每个查询返回的结果数
+            recall_topk (:obj:`int` or :obj:`None`, optional, defaults to None): 召回的候选数，默认使用初始化时的设置
+
+        Returns:
+            list: 每个查询对应一个按分数降序排列的列表，元素为(候选文本, 候选ID, 融合分数, 召回分数, 精排分数)，
+                  各阶段耗时(秒)记录在self.latency中
+        """  # noqa: ignore flake8"
+
+        if recall_topk is None:
+            recall_topk = self.recall_topk
+
+        start_time = time.perf_counter()
+
+        retrieve_scores, retrieve_ids = self.retriever.search(queries, topk=recall_topk)
+
+        retrieve_time = time.perf_counter()
+
+        # 所有查询的候选合并后一起进行batch精排
+        text_pairs = []
+        pair_offsets = [0]
+        for query_, ids_ in zip(queries, retrieve_ids):
+            text_pairs.extend([(query_, self.candidates[id_]) for id_ in ids_ if id_ >= 0])
+            pair_offsets.append(len(text_pairs))
+
+        rerank_scores = self.rerank(text_pairs)
+        self._synchronize()
+
+        rerank_time = time.perf_counter()
+
+        results = []
+        for query_idx_, (scores_, ids_) in enumerate(zip(retrieve_scores, retrieve_ids)):
+            is_valid = ids_ >= 0
+            scores_, ids_ = scores_[is_valid], ids_[is_valid]
+            query_rerank_scores = rerank_scores[pair_offsets[query_idx_]:pair_offsets[query_idx_ + 1]]
+
+            fusion_scores = self._fuse(scores_, query_rerank_scores)
+            order = np.argsort(-fusion_scores, kind='stable')[:topk]
+
+            results.append([
+                (self.candidates[ids_[idx_]], int(ids_[idx_]), float(fusion_scores[idx_]), float(scores_[idx_]), float(query_rerank_scores[idx_]))
+                for idx_ in order
+            ])
+
+        end_time = time.perf_counter()
+
+        self.latency = {
+            'num_queries': len(queries),
+            'num_rerank_pairs': len(text_pairs),
+            'retrieve': retrieve_time - start_time,
+            'rerank': rerank_time - retrieve_time,
+            'fusion': end_time - rerank_time,
+            'total': end_time - start_time
+        }
+
+        return results
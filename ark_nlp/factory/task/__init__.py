@@ -4,8 +4,12 @@ from ark_nlp.factory.task.base._sequence_classification import SequenceClassific
 
 from ark_nlp.factory.task.text_match import TMTask
 from ark_nlp.factory.task.text_classification import TCTask
+from ark_nlp.factory.task.text_classification_early_exit import EarlyExitTCTask
+from ark_nlp.factory.task.text_classification_chunk import ChunkPoolingTCTask
+from ark_nlp.factory.task.text_classification_packed import PackedTCTask
 from ark_nlp.factory.task.named_entity_recognition import BIONERTask
 from ark_nlp.factory.task.named_entity_recognition import CRFNERTask
 from ark_nlp.factory.task.named_entity_recognition import BiaffineNERTask
 from ark_nlp.factory.task.named_entity_recognition import GlobalPointerNERTask
 from ark_nlp.factory.task.named_entity_recognition import SpanNERTask
+from ark_nlp.factory.task.text_classification_distillation import TCDistillationTask
@@ -19,6 +19,7 @@
 import torch
 
 from ark_nlp.factory.utils import conlleval
+from ark_nlp.nn.layer.global_pointer_block import pack_span_width
 from ark_nlp.factory.metric import SpanMetrics
 from ark_nlp.factory.metric import BiaffineSpanMetrics
 from ark_nlp.factory.task.base._token_classification import TokenClassificationTask
@@ -224,12 +225,21 @@ class BiaffineNERTask(TokenClassificationTask):
         **kwargs
     ):
 
-        span_label = inputs['label_ids'].view(size=(-1,))
+        span_label = inputs['label_ids']
+        span_mask = inputs['span_mask']
+
+        # 模型设置了max_span_width时，将(L, L)的标签和mask转换成与logits一致的宽度受限格式
+        max_span_width = getattr(self.module, 'max_span_width', None)
+        if max_span_width is not None:
+            span_label = pack_span_width(span_label, max_span_width)
+            span_mask = pack_span_width(span_mask, max_span_width)
+
+        span_label = span_label.reshape(-1)
         span_logits = logits.view(size=(-1, self.class_num))
 
         span_loss = self.loss_function(span_logits, span_label)
 
-        span_mask = inputs['span_mask'].view(size=(-1,))
+        span_mask = span_mask.reshape(-1)
 
         span_loss *= span_mask
         loss = torch.sum(span_loss) / inputs['span_mask'].size()[0]
@@ -262,7 +272,9 @@ class BiaffineNERTask(TokenClassificationTask):
         if id2cat is None:
             id2cat = self.id2cat
 
-        biaffine_metric = BiaffineSpanMetrics()
+        biaffine_metric = BiaffineSpanMetrics(
+            max_span_width=getattr(self.module, 'max_span_width', None)
+        )
 
         preds_ = torch.cat(self.evaluate_logs['logits'], dim=0)
         labels_ = torch.cat(self.evaluate_logs['labels'], dim=0)
@@ -296,6 +308,14 @@ class GlobalPointerNERTask(TokenClassificationTask):
         **kwargs (optional): 其他可选参数
     """  # noqa: ignore flake8"
 
+    def _get_span_label_ids(self, inputs):
+        # 模型设置了max_span_width时，将(L, L)的标签转换成与logits一致的宽度受限格式
+        max_span_width = getattr(self.module, 'max_span_width', None)
+        if max_span_width is None:
+            return inputs['label_ids']
+
+        return pack_span_width(inputs['label_ids'], max_span_width)
+
     def _compute_loss(
         self,
         inputs,
@@ -303,7 +323,7 @@ class GlobalPointerNERTask(TokenClassificationTask):
         verbose=True,
         **kwargs
     ):
-        loss = self.loss_function(logits, inputs['label_ids'])
+        loss = self.loss_function(logits, self._get_span_label_ids(inputs))
 
         return loss
 
@@ -327,10 +347,18 @@ class GlobalPointerNERTask(TokenClassificationTask):
             # compute loss
             logits, loss = self._get_evaluate_loss(inputs, outputs, **kwargs)
 
+            span_label_ids = self._get_span_label_ids(inputs).to_dense().cpu()
+
             numerate, denominator = conlleval.global_pointer_f1_score(
-                inputs['label_ids'].cpu(),
+                span_label_ids,
                 logits.cpu()
             )
+
+            if span_label_ids.shape != inputs['label_ids'].shape:
+                # 长度超过max_span_width的实体无法被预测，但仍需计入分母
+                label_ids = inputs['label_ids']
+                label_num = torch.sparse.sum(label_ids) if label_ids.is_sparse else torch.sum(label_ids)
+                denominator += label_num.item() - torch.sum(span_label_ids).item()
             self.evaluate_logs['numerate'] += numerate
             self.evaluate_logs['denominator'] += denominator
 
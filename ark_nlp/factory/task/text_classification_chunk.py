@@ -0,0 +1,39 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+from ark_nlp.factory.task.text_classification import TCTask
+from ark_nlp.dataset.base._sentence_classification_dataset import chunk_collate_fn
+
+
+class ChunkPoolingTCTask(TCTask):
+    """
+    长文本分类模型(ChunkPoolingBert)的Task，需配合ChunkSentenceClassificationDataset使用，
+    batch内所有文本的片段拼接后一次送入模型
+
+    Args:
+        module: 深度学习模型
+        optimizer: 训练模型使用的优化器名或者优化器对象
+        loss_function: 训练模型使用的损失函数名或损失函数对象
+        **kwargs (optional): 其他可选参数，与TCTask一致
+    """  # noqa: ignore flake8"
+
+    def _train_collate_fn(self, batch):
+        return chunk_collate_fn(batch)
+
+    def _evaluate_collate_fn(self, batch):
+        return chunk_collate_fn(batch)
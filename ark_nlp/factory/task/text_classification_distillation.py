@@ -0,0 +1,194 @@
+# Copyright (c) 2020 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import torch
+import numpy as np
+import torch.nn.functional as F
+
+from torch.utils.data import Dataset
+from torch.utils.data import DataLoader
+from ark_nlp.factory.task.text_classification import TCTask
+
+
+def precompute_teacher_logits(
+    teacher_module,
+    teacher_data,
+    logits_path,
+    batch_size=64,
+    device=None
+):
+    """
+    使用冻结的教师模型一次性计算训练集的logits，并保存为内存映射的.npy文件，
+    学生模型训练的每个epoch都直接读取该文件，无需再运行教师模型
+
+    Args:
+        teacher_module: 教师模型，例如Bert、NeZha、RoFormer
+        teacher_data (:obj:`ark_nlp dataset`): 使用教师模型分词器编码的训练集，样本顺序需与学生模型的训练集一致
+        logits_path (:obj:`string`): logits的保存地址
+        batch_size (:obj:`int`, optional, defaults to 64): batch大小
+        device (:obj:`torch.device` or :obj:`None`, optional, defaults to None): 运行教师模型的设备，默认为教师模型所在设备
+
+    Returns:
+        np.memmap: (样本数, 标签数)的只读logits
+    """  # noqa: ignore flake8"
+
+    if hasattr(teacher_module, 'task') is False:
+        teacher_module.task = 'SequenceLevel'
+
+    if device is None:
+        device = list(teacher_module.parameters())[0].device
+
+    teacher_module.to(device)
+    teacher_module.eval()
+
+    generator = DataLoader(teacher_data, batch_size=batch_size, shuffle=False)
+
+    teacher_logits = None
+    start = 0
+    with torch.no_grad():
+        for inputs in generator:
+            inputs = {
+                col: inputs[col].to(device) for col in teacher_data.to_device_cols
+                if type(inputs[col]) is torch.Tensor
+            }
+
+            logits = teacher_module(**inputs).float().cpu().numpy()
+
+            if teacher_logits is None:
+                teacher_logits = np.lib.format.open_memmap(
+                    logits_path,
+                    mode='w+',
+                    dtype=np.float32,
+                    shape=(len(teacher_data), logits.shape[-1])
+                )
+
+            teacher_logits[start:start + len(logits)] = logits
+            start += len(logits)
+
+    teacher_logits.flush()
+    del teacher_logits
+
+    return np.load(logits_path, mmap_mode='r')
+
+
+class _TeacherLogitsDataset(Dataset):
+
+    def __init__(self, dataset, teacher_logits):
+        self.dataset = dataset
+        self.teacher_logits = teacher_logits
+
+    def __getattr__(self, name):
+        # 反序列化或复制时实例尚未设置dataset，直接抛出AttributeError以免无限递归
+        if name == 'dataset' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.dataset, name)
+
+    @property
+    def to_device_cols(self):
+        return self.dataset.to_device_cols + ['teacher_logits']
+
+    def __getitem__(self, index):
+        feature = dict(self.dataset[index])
+        feature['teacher_logits'] = np.array(self.teacher_logits[index], dtype=np.float32)
+        return feature
+
+    def __len__(self):
+        return len(self.dataset)
+
+
+class TCDistillationTask(TCTask):
+    """
+    文本分类知识蒸馏的Task，使用教师模型预先计算好的logits训练TextCNN、RNN等学生模型，
+    损失为软标签KL散度和硬标签交叉熵的加权和
+
+    Args:
+        module: 学生模型
+        optimizer: 训练模型使用的优化器名或者优化器对象
+        loss_function: 硬标签使用的损失函数名或损失函数对象
+        teacher_logits (:obj:`string` or :obj:`np.ndarray`):
+            教师模型的logits或其.npy文件地址，可由precompute_teacher_logits生成
+        temperature (:obj:`float`, optional, defaults to 2.0): 蒸馏温度
+        alpha (:obj:`float`, optional, defaults to 0.5): KL散度损失的权重，交叉熵损失的权重为1-alpha
+        **kwargs (optional): 其他可选参数，与TCTask一致
+
+    Example::
+
+        >>> precompute_teacher_logits(bert_module, bert_train_dataset, './teacher_logits.npy')
+        >>> model = TCDistillationTask(textcnn_module, 'adam', 'ce', teacher_logits='./teacher_logits.npy')
+        >>> model.fit(vanilla_train_dataset, vanilla_dev_dataset, lr=1e-3, epochs=10, batch_size=64)
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        *args,
+        teacher_logits=None,
+        temperature=2.0,
+        alpha=0.5,
+        **kwargs
+    ):
+        super(TCDistillationTask, self).__init__(*args, **kwargs)
+
+        if isinstance(teacher_logits, str):
+            teacher_logits = np.load(teacher_logits, mmap_mode='r')
+
+        self.teacher_logits = teacher_logits
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def _on_train_begin(
+        self,
+        train_data,
+        validation_data,
+        *args,
+        **kwargs
+    ):
+        if self.teacher_logits is None:
+            raise ValueError("The teacher_logits is None")
+
+        if len(self.teacher_logits) != len(train_data):
+            raise ValueError("The teacher_logits does not match the train data")
+
+        train_data = _TeacherLogitsDataset(train_data, self.teacher_logits)
+
+        return super(TCDistillationTask, self)._on_train_begin(
+            train_data,
+            validation_data,
+            *args,
+            **kwargs
+        )
+
+    def _compute_loss(
+        self,
+        inputs,
+        logits,
+        verbose=True,
+        **kwargs
+    ):
+        loss = self.loss_function(logits, inputs['label_ids'])
+
+        # 验证阶段没有教师logits，只计算硬标签损失
+        if 'teacher_logits' in inputs:
+            kd_loss = F.kl_div(
+                F.log_softmax(logits / self.temperature, dim=-1),
+                F.softmax(inputs['teacher_logits'] / self.temperature, dim=-1),
+                reduction='batchmean'
+            ) * self.temperature ** 2
+
+            loss = self.alpha * kd_loss + (1 - self.alpha) * loss
+
+        return loss
@@ -0,0 +1,82 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+from ark_nlp.factory.task.text_classification import TCTask
+
+
+class EarlyExitTCTask(TCTask):
+    """
+    早退文本分类模型(EarlyExitBert)的Task，训练时同时计算最后一层和各个退出分类头的损失
+
+    Args:
+        module: 深度学习模型
+        optimizer: 训练模型使用的优化器名或者优化器对象
+        loss_function: 训练模型使用的损失函数名或损失函数对象
+        exit_loss_weight (:obj:`float`, optional, defaults to 1.0): 退出分类头损失的权重
+        is_exit_only (:obj:`bool`, optional, defaults to False):
+            是否只训练退出分类头，为True时冻结其他参数且只计算退出分类头的损失，
+            可用于在已经训练好的模型上追加训练退出分类头
+        **kwargs (optional): 其他可选参数，与TCTask一致
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        *args,
+        exit_loss_weight=1.0,
+        is_exit_only=False,
+        **kwargs
+    ):
+        super(EarlyExitTCTask, self).__init__(*args, **kwargs)
+
+        self.exit_loss_weight = exit_loss_weight
+        self.is_exit_only = is_exit_only
+
+        if self.is_exit_only:
+            for name_, param_ in self.module.named_parameters():
+                param_.requires_grad = 'exit_classifiers' in name_
+
+    def _get_module_inputs_on_train(
+        self,
+        inputs,
+        **kwargs
+    ):
+        inputs = super(EarlyExitTCTask, self)._get_module_inputs_on_train(inputs, **kwargs)
+        inputs['return_exit_logits'] = True
+
+        return inputs
+
+    def _get_train_loss(
+        self,
+        inputs,
+        outputs,
+        **kwargs
+    ):
+        logits, exit_logits = outputs
+
+        exit_loss = sum(
+            self.loss_function(exit_logits_, inputs['label_ids']) for exit_logits_ in exit_logits
+        ) / len(exit_logits)
+
+        if self.is_exit_only:
+            loss = exit_loss
+        else:
+            loss = self._compute_loss(inputs, logits, **kwargs) + self.exit_loss_weight * exit_loss
+
+        self._compute_loss_record(**kwargs)
+
+        return logits, loss
@@ -0,0 +1,124 @@
+import sqlite3
+import hashlib
+import numpy as np
+
+from collections import OrderedDict
+
+
+class EmbeddingCache(object):
+    """
+    以文本哈希为键的句向量缓存，可使用sqlite持久化，使重复出现的文本在多次任务之间无需重新编码
+
+    Args:
+        cache_path (:obj:`string` or :obj:`None`, optional, defaults to None): sqlite缓存文件地址，默认为None，仅缓存在内存中
+        namespace (:obj:`string`, optional, defaults to "default"): 缓存的命名空间，不同的模型或池化方式应使用不同的命名空间
+        max_size (:obj:`int`, optional, defaults to 100000): 内存中最多缓存的句向量数，超出时按LRU淘汰，持久化的结果仍保存在sqlite中
+
+    Examples::
+
+        >>> cache = EmbeddingCache('./simcse_embedding.db', namespace='simcse-cls')
+        >>> sims = predictor.predict_pairs(pairs, embedding_cache=cache)
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        cache_path=None,
+        namespace='default',
+        max_size=100000
+    ):
+        self.namespace = namespace
+        self.max_size = max_size
+        self.memory_cache = OrderedDict()
+
+        self.connection = None
+        if cache_path is not None:
+            self.connection = sqlite3.connect(cache_path)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS embeddings '
+                '(namespace TEXT, key TEXT, value BLOB, PRIMARY KEY (namespace, key))'
+            )
+            self.connection.commit()
+
+    def _remember(self, key, embedding):
+        self.memory_cache[key] = embedding
+        self.memory_cache.move_to_end(key)
+        while len(self.memory_cache) > self.max_size:
+            self.memory_cache.popitem(last=False)
+
+    @staticmethod
+    def hash_text(text):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def get(self, texts, chunk_size=500):
+        """
+        批量获取缓存的句向量
+
+        Args:
+            texts (:obj:`list`): 文本列表
+            chunk_size (:obj:`int`, optional, defaults to 500): 每次查询sqlite的键数量
+
+        Returns:
+            list: 与texts一一对应，未命中的位置为None
+        """  # noqa: ignore flake8"
+
+        keys = [self.hash_text(text_) for text_ in texts]
+
+        results = {}
+        missing_keys = []
+        for key_ in keys:
+            if key_ in self.memory_cache:
+                self.memory_cache.move_to_end(key_)
+                results[key_] = self.memory_cache[key_]
+            else:
+                missing_keys.append(key_)
+
+        if self.connection is not None and missing_keys:
+            for start_ in range(0, len(missing_keys), chunk_size):
+                chunk_keys = missing_keys[start_:start_ + chunk_size]
+                rows = self.connection.execute(
+                    'SELECT key, value FROM embeddings WHERE namespace = ? AND key IN ({})'.format(
+                        ','.join('?' * len(chunk_keys))
+                    ),
+                    [self.namespace] + chunk_keys
+                )
+                for key_, value_ in rows:
+                    results[key_] = np.frombuffer(value_, dtype=np.float32)
+                    self._remember(key_, results[key_])
+
+        return [results.get(key_) for key_ in keys]
+
+    def set(self, texts, embeddings):
+        """
+        批量写入句向量
+
+        Args:
+            texts (:obj:`list`): 文本列表
+            embeddings (:obj:`np.ndarray`): (len(texts), emb_size)的句向量
+        """  # noqa: ignore flake8"
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        keys = [self.hash_text(text_) for text_ in texts]
+
+        # 复制每一行，避免缓存的视图使整个batch的数组无法释放
+        for key_, embedding_ in zip(keys, embeddings):
+            self._remember(key_, embedding_.copy())
+
+        if self.connection is not None:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO embeddings (namespace, key, value) VALUES (?, ?, ?)',
+                [(self.namespace, key_, embedding_.tobytes()) for key_, embedding_ in zip(keys, embeddings)]
+            )
+            self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __len__(self):
+        if self.connection is not None:
+            return self.connection.execute(
+                'SELECT COUNT(*) FROM embeddings WHERE namespace = ?',
+                [self.namespace]
+            ).fetchone()[0]
+        return len(self.memory_cache)
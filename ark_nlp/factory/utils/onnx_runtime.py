@@ -0,0 +1,228 @@
+import time
+import torch
+import inspect
+import numpy as np
+
+
+class _ExportWrapper(torch.nn.Module):
+
+    def __init__(self, module, input_names):
+        super(_ExportWrapper, self).__init__()
+        self.module = module
+        self.input_names = input_names
+
+    def forward(self, *inputs):
+        return self.module(**dict(zip(self.input_names, inputs)))
+
+
+def export_onnx(
+    module,
+    onnx_path,
+    input_names=('input_ids', 'attention_mask', 'token_type_ids'),
+    opset_version=14,
+    dummy_batch_size=2,
+    dummy_seq_len=11
+):
+    """
+    将模型导出为batch和序列长度均为动态维度的ONNX模型，
+    支持Bert、NeZha、RoFormer、GlobalPointerBert和CrfBert等模块，
+    CRF的维特比解码和GlobalPointer的实体解码不参与导出，仍在后处理中完成
+
+    Args:
+        module: 深度学习模型
+        onnx_path (:obj:`string`): ONNX模型的保存地址
+        input_names (:obj:`tuple`, optional, defaults to ("input_ids", "attention_mask", "token_type_ids")): 模型输入名
+        opset_version (:obj:`int`, optional, defaults to 14): ONNX算子集版本
+        dummy_batch_size (:obj:`int`, optional, defaults to 2): 导出时使用的batch大小
+        dummy_seq_len (:obj:`int`, optional, defaults to 11): 导出时使用的序列长度，应与模型中其他维度的大小不同
+
+    Returns:
+        string: ONNX模型的保存地址
+    """  # noqa: ignore flake8"
+
+    input_names = list(input_names)
+    device = list(module.parameters())[0].device
+
+    dummy_inputs = []
+    for name_ in input_names:
+        if name_ == 'input_ids':
+            dummy_inputs.append(torch.randint(1, 100, (dummy_batch_size, dummy_seq_len), device=device))
+        elif name_ == 'attention_mask':
+            dummy_inputs.append(torch.ones(dummy_batch_size, dummy_seq_len, dtype=torch.long, device=device))
+        else:
+            dummy_inputs.append(torch.zeros(dummy_batch_size, dummy_seq_len, dtype=torch.long, device=device))
+    dummy_inputs = tuple(dummy_inputs)
+
+    wrapper = _ExportWrapper(module, input_names)
+    wrapper.eval()
+
+    with torch.no_grad():
+        dummy_output = wrapper(*dummy_inputs)
+
+    # 输出中与序列长度相同的维度均视为动态维度，例如GlobalPointer的(batch, heads, seq, seq)
+    output_axes = {0: 'batch'}
+    for dim_, size_ in enumerate(dummy_output.shape[1:], 1):
+        if size_ == dummy_seq_len:
+            output_axes[dim_] = 'sequence'
+
+    dynamic_axes = {name_: {0: 'batch', 1: 'sequence'} for name_ in input_names}
+    dynamic_axes['logits'] = output_axes
+
+    export_kwargs = {}
+    # torch>=2.5起export支持dynamo参数，使用基于TorchScript的导出以保留dynamic_axes
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        export_kwargs['dynamo'] = False
+
+    torch.onnx.export(
+        wrapper,
+        dummy_inputs,
+        onnx_path,
+        input_names=input_names,
+        output_names=['logits'],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset_version,
+        do_constant_folding=True,
+        **export_kwargs
+    )
+
+    return onnx_path
+
+
+class ONNXRuntimeModule(object):
+    """
+    ONNX Runtime推理模块，调用方式与torch模块一致，可直接替换TCPredictor、TMPredictor、
+    GlobalPointerNERPredictor和CRFNERPredictor等预测器中的module
+
+    Args:
+        onnx_path (:obj:`string`): ONNX模型地址
+        crf (:obj:`torch.nn.Module` or :obj:`None`, optional, defaults to None):
+            CrfBert的CRF层，用于在后处理中进行维特比解码
+        providers (:obj:`list` or :obj:`None`, optional, defaults to None): ONNX Runtime的执行后端，默认使用CPUExecutionProvider
+        intra_op_num_threads (:obj:`int` or :obj:`None`, optional, defaults to None): 算子内的线程数
+
+    Example::
+
+        >>> export_onnx(module, './tc.onnx')
+        >>> predictor = TCPredictor(ONNXRuntimeModule('./tc.onnx'), tokenizer, cat2id)
+        >>> ner_predictor = CRFNERPredictor(ONNXRuntimeModule('./crf.onnx', crf=crf_module.crf), tokenizer, cat2id)
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        onnx_path,
+        crf=None,
+        providers=None,
+        intra_op_num_threads=None
+    ):
+        import onnxruntime
+
+        if providers is None:
+            providers = ['CPUExecutionProvider']
+
+        session_options = onnxruntime.SessionOptions()
+        if intra_op_num_threads is not None:
+            session_options.intra_op_num_threads = intra_op_num_threads
+
+        self.session = onnxruntime.InferenceSession(
+            onnx_path,
+            sess_options=session_options,
+            providers=providers
+        )
+        self.input_names = [input_.name for input_ in self.session.get_inputs()]
+
+        self.crf = crf
+        if self.crf is not None:
+            self.crf.eval()
+
+        self.training = False
+
+    def eval(self):
+        return self
+
+    def parameters(self):
+        # 预测器通过参数获取device，ONNX Runtime的输入输出均在CPU上
+        return iter([torch.empty(0)])
+
+    def __call__(self, **inputs):
+        ort_inputs = {
+            name_: inputs[name_].cpu().numpy().astype(np.int64)
+            for name_ in self.input_names
+        }
+
+        logits = self.session.run(['logits'], ort_inputs)[0]
+
+        return torch.from_numpy(logits)
+
+
+def compare_outputs(
+    module,
+    ort_module,
+    inputs,
+    atol=1e-4
+):
+    """
+    检查ONNX Runtime模块和原始torch模块在相同输入下的输出是否一致
+
+    Args:
+        module: 原始torch模型
+        ort_module (:obj:`ONNXRuntimeModule`): ONNX Runtime推理模块
+        inputs (:obj:`dict`): 模型输入
+        atol (:obj:`float`, optional, defaults to 1e-4): 允许的最大绝对误差
+
+    Returns:
+        tuple: (是否一致, 最大绝对误差)
+    """  # noqa: ignore flake8"
+
+    module.eval()
+    with torch.no_grad():
+        torch_logits = module(**inputs).cpu()
+
+    ort_logits = ort_module(**inputs)
+
+    # GlobalPointer等输出中被mask的位置为极大的负数，只比较有效的位置
+    is_finite = torch.isfinite(torch_logits) & (torch_logits.abs() < 1e6)
+    max_diff = (torch_logits - ort_logits)[is_finite].abs().max().item()
+
+    return max_diff <= atol, max_diff
+
+
+def compare_latency(
+    module,
+    ort_module,
+    inputs,
+    n_runs=20,
+    n_warmups=3
+):
+    """
+    比较ONNX Runtime模块和原始torch模块的平均推理耗时
+
+    Args:
+        module: 原始torch模型
+        ort_module (:obj:`ONNXRuntimeModule`): ONNX Runtime推理模块
+        inputs (:obj:`dict`): 模型输入
+        n_runs (:obj:`int`, optional, defaults to 20): 计时的运行次数
+        n_warmups (:obj:`int`, optional, defaults to 3): 预热的运行次数
+
+    Returns:
+        dict: torch和onnxruntime的平均耗时(秒)以及加速比
+    """  # noqa: ignore flake8"
+
+    def _timeit(fn):
+        for _ in range(n_warmups):
+            fn(**inputs)
+        start_time = time.perf_counter()
+        for _ in range(n_runs):
+            fn(**inputs)
+        return (time.perf_counter() - start_time) / n_runs
+
+    module.eval()
+    with torch.no_grad():
+        torch_latency = _timeit(module)
+
+    ort_latency = _timeit(ort_module)
+
+    return {
+        'torch': torch_latency,
+        'onnxruntime': ort_latency,
+        'speedup': torch_latency / ort_latency
+    }
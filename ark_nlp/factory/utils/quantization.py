@@ -0,0 +1,152 @@
+import time
+import copy
+import torch
+
+from torch import nn
+from sklearn import metrics as sklearn_metrics
+from transformers import PreTrainedModel
+
+
+def get_encoder_linear_names(module):
+    """
+    获取模型中编码器(BertModel、NeZhaModel、RoFormerModel等)内部所有nn.Linear的名称，
+    分类头、CRF转移矩阵和GlobalPointer的dense层等不在编码器中的层不包含在内
+
+    Args:
+        module: 深度学习模型
+    """  # noqa: ignore flake8"
+
+    encoder_prefixes = [
+        name_ + '.' for name_, submodule_ in module.named_modules()
+        if name_ != '' and isinstance(submodule_, PreTrainedModel)
+    ]
+
+    return {
+        name_ for name_, submodule_ in module.named_modules()
+        if isinstance(submodule_, nn.Linear) and any(name_.startswith(prefix_) for prefix_ in encoder_prefixes)
+    }
+
+
+def quantize(
+    module,
+    dtype=torch.qint8,
+    is_encoder_only=True,
+    inplace=False
+):
+    """
+    对模型中的nn.Linear进行动态int8量化，量化后的模型只能在CPU上推理
+
+    Args:
+        module: 深度学习模型
+        dtype (:obj:`torch.dtype`, optional, defaults to torch.qint8): 量化的数据类型
+        is_encoder_only (:obj:`bool`, optional, defaults to True):
+            是否只量化编码器内部的nn.Linear，默认为True，任务头保持fp32
+        inplace (:obj:`bool`, optional, defaults to False): 是否直接修改原模型
+
+    Returns:
+        量化后的模型
+
+    Example::
+
+        >>> quantized_module = quantize(module)
+        >>> predictor = TCPredictor(module, tokenizer, cat2id, is_quantized=True)
+    """  # noqa: ignore flake8"
+
+    if not inplace:
+        module = copy.deepcopy(module)
+
+    module = module.cpu()
+    module.eval()
+
+    if is_encoder_only:
+        qconfig_spec = get_encoder_linear_names(module)
+    else:
+        qconfig_spec = {nn.Linear}
+
+    return torch.ao.quantization.quantize_dynamic(
+        module,
+        qconfig_spec=qconfig_spec,
+        dtype=dtype,
+        inplace=True
+    )
+
+
+def _get_evaluate_metrics(task):
+    logs = task.evaluate_logs
+
+    metrics = {'loss': logs['eval_loss'] / logs['eval_step']}
+
+    if 'eval_acc' in logs:
+        # 文本分类和文本匹配
+        labels_ = torch.cat(logs['labels'], dim=0)
+        preds_ = torch.argmax(torch.cat(logs['logits'], dim=0), -1)
+
+        metrics['acc'] = logs['eval_acc'] / logs['eval_example']
+        metrics['f1'] = sklearn_metrics.f1_score(labels_, preds_, average='macro')
+    elif 'numerate' in logs:
+        # GlobalPointer
+        metrics['f1'] = 2 * logs['numerate'] / logs['denominator'] if logs['denominator'] else 0.0
+    elif hasattr(task, 'ner_metric'):
+        eval_info, _ = task.ner_metric.result()
+        metrics['precision'] = eval_info['acc']
+        metrics['recall'] = eval_info['recall']
+        metrics['f1'] = eval_info['f1']
+
+    return metrics
+
+
+def evaluate_quantization(
+    task,
+    validation_data,
+    quantized_module=None,
+    evaluate_batch_size=16,
+    **kwargs
+):
+    """
+    使用Task的evaluate分别验证原始模型和量化模型，返回两者的指标及差值，用于判断是否接受量化模型
+
+    Args:
+        task: 已经训练好的Task对象
+        validation_data (:obj:`ark_nlp dataset`): 验证数据集
+        quantized_module (:obj:`torch.nn.Module` or :obj:`None`, optional, defaults to None):
+            量化后的模型，默认为None，即使用quantize(task.module)
+        evaluate_batch_size (:obj:`int`, optional, defaults to 16): 验证阶段batch大小
+        **kwargs (optional): 传给Task的evaluate的其他参数
+
+    Returns:
+        dict: 包含fp32、int8的指标和耗时以及int8相对于fp32的差值
+
+    Example::
+
+        >>> report = evaluate_quantization(model, dev_dataset)
+        >>> report['delta']['f1']
+    """  # noqa: ignore flake8"
+
+    kwargs.setdefault('is_evaluate_print', False)
+
+    if quantized_module is None:
+        quantized_module = quantize(task.module)
+
+    module = task.module
+    device = task.device
+
+    report = {}
+    try:
+        for name_, module_, device_ in [('fp32', module, device), ('int8', quantized_module, torch.device('cpu'))]:
+            task.module = module_
+            task.device = device_
+
+            start_time = time.perf_counter()
+            task.evaluate(validation_data, evaluate_batch_size=evaluate_batch_size, **kwargs)
+
+            report[name_] = _get_evaluate_metrics(task)
+            report[name_]['time'] = time.perf_counter() - start_time
+    finally:
+        task.module = module
+        task.device = device
+
+    report['delta'] = {
+        key_: report['int8'][key_] - report['fp32'][key_] for key_ in report['fp32']
+    }
+
+    return report
@@ -19,6 +19,7 @@
 import torch
 
 from ark_nlp.factory.metric import BiaffineSpanMetrics
+from ark_nlp.nn.layer.global_pointer_block import pack_span_width
 from ark_nlp.factory.task.base._token_classification import TokenClassificationTask
 
 
@@ -47,12 +48,21 @@ class BiaffineNERTask(TokenClassificationTask):
         **kwargs
     ):
 
-        span_label = inputs['label_ids'].view(size=(-1,))
+        span_label = inputs['label_ids']
+        span_mask = inputs['span_mask']
+
+        # 模型设置了max_span_width时，将(L, L)的标签和mask转换成与logits一致的宽度受限格式
+        max_span_width = getattr(self.module, 'max_span_width', None)
+        if max_span_width is not None:
+            span_label = pack_span_width(span_label, max_span_width)
+            span_mask = pack_span_width(span_mask, max_span_width)
+
+        span_label = span_label.reshape(-1)
         span_logits = logits.view(size=(-1, self.class_num))
 
         span_loss = self.loss_function(span_logits, span_label)
 
-        span_mask = inputs['span_mask'].view(size=(-1,))
+        span_mask = span_mask.reshape(-1)
 
         span_loss *= span_mask
         loss = torch.sum(span_loss) / inputs['span_mask'].size()[0]
@@ -85,7 +95,9 @@ class BiaffineNERTask(TokenClassificationTask):
         if id2cat is None:
             id2cat = self.id2cat
 
-        biaffine_metric = BiaffineSpanMetrics()
+        biaffine_metric = BiaffineSpanMetrics(
+            max_span_width=getattr(self.module, 'max_span_width', None)
+        )
 
         preds_ = torch.cat(self.evaluate_logs['logits'], dim=0)
         labels_ = torch.cat(self.evaluate_logs['labels'], dim=0)
@@ -10,6 +10,8 @@ class GlobalPointerBert(BertForTokenClassification):
     Args:
         config: 模型的配置对象
         bert_trained (:obj:`bool`, optional): 预训练模型的参数是否可训练
+        head_size (:obj:`int`, optional): GlobalPointer head的维度
+        max_span_width (:obj:`int` or :obj:`None`, optional): span的最大长度，设置后输出(batch_size, 标签数, L, W)的宽度受限格式
 
     Reference:
         [1] https://www.kexue.fm/archives/8373
@@ -19,7 +21,8 @@ class GlobalPointerBert(BertForTokenClassification):
         self,
         config,
         encoder_trained=True,
-        head_size=64
+        head_size=64,
+        max_span_width=None
     ):
         super(GlobalPointerBert, self).__init__(config)
 
@@ -30,10 +33,12 @@ class GlobalPointerBert(BertForTokenClassification):
         for param in self.bert.parameters():
             param.requires_grad = encoder_trained
 
+        self.max_span_width = max_span_width
         self.global_pointer = GlobalPointer(
             self.num_labels,
             head_size,
-            config.hidden_size
+            config.hidden_size,
+            max_span_width=max_span_width
         )
 
         self.init_weights()
@@ -66,6 +71,8 @@ class EfficientGlobalPointerBert(BertForTokenClassification):
     Args:
         config: 模型的配置对象
         bert_trained (:obj:`bool`, optional): 预训练模型的参数是否可训练
+        head_size (:obj:`int`, optional): GlobalPointer head的维度
+        max_span_width (:obj:`int` or :obj:`None`, optional): span的最大长度，设置后输出(batch_size, 标签数, L, W)的宽度受限格式
 
     Reference:
         [1] https://www.kexue.fm/archives/8877
@@ -76,7 +83,8 @@ class EfficientGlobalPointerBert(BertForTokenClassification):
         self,
         config,
         encoder_trained=True,
-        head_size=64
+        head_size=64,
+        max_span_width=None
     ):
         super(EfficientGlobalPointerBert, self).__init__(config)
 
@@ -87,10 +95,12 @@ class EfficientGlobalPointerBert(BertForTokenClassification):
         for param in self.bert.parameters():
             param.requires_grad = encoder_trained
 
+        self.max_span_width = max_span_width
         self.efficient_global_pointer = EfficientGlobalPointer(
             self.num_labels,
             head_size,
-            config.hidden_size
+            config.hidden_size,
+            max_span_width=max_span_width
         )
 
         self.init_weights()
@@ -19,6 +19,7 @@
 import torch
 
 from ark_nlp.factory.utils import conlleval
+from ark_nlp.nn.layer.global_pointer_block import pack_span_width
 from ark_nlp.factory.task.base._token_classification import TokenClassificationTask
 
 
@@ -39,6 +40,14 @@ class GlobalPointerNERTask(TokenClassificationTask):
         **kwargs (optional): 其他可选参数
     """  # noqa: ignore flake8"
 
+    def _get_span_label_ids(self, inputs):
+        # 模型设置了max_span_width时，将(L, L)的标签转换成与logits一致的宽度受限格式
+        max_span_width = getattr(self.module, 'max_span_width', None)
+        if max_span_width is None:
+            return inputs['label_ids']
+
+        return pack_span_width(inputs['label_ids'], max_span_width)
+
     def _compute_loss(
         self,
         inputs,
@@ -46,7 +55,7 @@ class GlobalPointerNERTask(TokenClassificationTask):
         verbose=True,
         **kwargs
     ):
-        loss = self.loss_function(logits, inputs['label_ids'])
+        loss = self.loss_function(logits, self._get_span_label_ids(inputs))
 
         return loss
 
@@ -70,10 +79,18 @@ class GlobalPointerNERTask(TokenClassificationTask):
             # compute loss
             logits, loss = self._get_evaluate_loss(inputs, outputs, **kwargs)
 
+            span_label_ids = self._get_span_label_ids(inputs).to_dense().cpu()
+
             numerate, denominator = conlleval.global_pointer_f1_score(
-                inputs['label_ids'].to_dense().cpu(),
+                span_label_ids,
                 logits.cpu()
             )
+
+            if span_label_ids.shape != inputs['label_ids'].shape:
+                # 长度超过max_span_width的实体无法被预测，但仍需计入分母
+                label_ids = inputs['label_ids']
+                label_num = torch.sparse.sum(label_ids) if label_ids.is_sparse else torch.sum(label_ids)
+                denominator += label_num.item() - torch.sum(span_label_ids).item()
             self.evaluate_logs['numerate'] += numerate
             self.evaluate_logs['denominator'] += denominator
 
@@ -16,9 +16,7 @@
 # Status: Active
 
 
-import copy
 import random
-import numpy as np
 
 from ark_nlp.dataset.base._dataset import BaseDataset
 
@@ -60,75 +58,113 @@ class CasRelREDataset(BaseDataset):
 
         Args:
             tokenizer: 编码器
-
-        ToDo: 将__getitem__部分ID化代码迁移到这部分
         """  # noqa: ignore flake8"
 
         self.tokenizer = tokenizer
 
-        if self.is_retain_dataset:
-            self.retain_dataset = copy.deepcopy(self.dataset)
+        super(CasRelREDataset, self).convert_to_ids(tokenizer)
 
-    def __getitem__(self, idx):
-        ins_json_data = self.dataset[idx]
-        text = ins_json_data['text']
+    def _convert_to_transfomer_ids(self, bert_tokenizer):
+
+        features = []
+        for (index_, row_) in enumerate(self.dataset):
+            text = row_['text']
+
+            if len(text) > bert_tokenizer.max_seq_len - 2:
+                text = text[:bert_tokenizer.max_seq_len - 2]
+
+            tokens = bert_tokenizer.tokenize(text)
+            token_mapping = bert_tokenizer.get_token_mapping(text, tokens, is_mapping_index=False)
+
+            token_ids, masks, segment_ids = bert_tokenizer.sequence_to_ids(tokens)
+
+            feature = {
+                'input_ids': token_ids,
+                'attention_mask': masks,
+                'input_lengths': len(token_ids),
+                'tokens': tokens,
+                'token_mapping': token_mapping
+            }
+
+            if not self.is_test:
+                feature['label'] = row_['label']
+
+            if self.is_train:
+                feature['s2ro_map'] = self._get_s2ro_map(
+                    text,
+                    tokens,
+                    row_['label'],
+                    bert_tokenizer
+                )
 
-        if len(text) > self.tokenizer.max_seq_len - 2:
-            text = text[:self.tokenizer.max_seq_len - 2]
+            features.append(feature)
 
-        tokens = self.tokenizer.tokenize(text)
-        token_mapping = self.tokenizer.get_token_mapping(text, tokens, is_mapping_index=False)
-        index_token_mapping = self.tokenizer.get_token_mapping(text, tokens)
+        return features
+
+    def _get_s2ro_map(self, text, tokens, triples, bert_tokenizer):
+        """
+        获取subject到(object起始位置, object结束位置, 关系id)的映射，位置均已偏移[CLS]
+
+        Args:
+            text (:obj:`string`): 截断后的文本
+            tokens (:obj:`list`): 分词后的token序列
+            triples (:obj:`list`): 原始三元组标注
+            bert_tokenizer: 编码器
+        """  # noqa: ignore flake8"
+
+        index_token_mapping = bert_tokenizer.get_token_mapping(text, tokens)
 
         start_mapping = {j[0]: i for i, j in enumerate(index_token_mapping) if j}
         end_mapping = {j[-1]: i for i, j in enumerate(index_token_mapping) if j}
 
+        s2ro_map = {}
+        for triple in triples:
+            sub_head_idx = triple[1]
+            sub_end_idx = triple[2]
+            obj_head_idx = triple[5]
+            obj_end_idx = triple[6]
+
+            if sub_head_idx in start_mapping and obj_head_idx in start_mapping and sub_end_idx in end_mapping and obj_end_idx in end_mapping:
+                sub = (start_mapping[sub_head_idx]+1, end_mapping[sub_end_idx]+1)
+
+                if sub not in s2ro_map:
+                    s2ro_map[sub] = []
+
+                s2ro_map[sub].append((start_mapping[obj_head_idx]+1, end_mapping[obj_end_idx]+1, self.cat2id[triple[3]]))
+
+        return s2ro_map
+
+    def __getitem__(self, idx):
+        """
+        返回的位置标签均为索引列表，由CasRelRETask.casrel_collate_fn构建稠密的训练目标
+        """  # noqa: ignore flake8"
+
+        feature = self.dataset[idx]
+
+        token_ids = feature['input_ids']
+        masks = feature['attention_mask']
+        text_len = feature['input_lengths']
+        tokens = feature['tokens']
+        token_mapping = feature['token_mapping']
+
+        if self.is_test:
+            return token_ids, masks, text_len, tokens
+
         if not self.is_train:
-            token_ids, masks, segment_ids = self.tokenizer.sequence_to_ids(text)
-            text_len = len(token_ids)
-            sub_heads, sub_tails = np.zeros(text_len), np.zeros(text_len)
-            sub_head, sub_tail = np.zeros(text_len), np.zeros(text_len)
-            obj_heads, obj_tails = np.zeros((text_len, self.class_num)), np.zeros((text_len, self.class_num))
-            if self.is_test:
-                return token_ids, masks, text_len, tokens
-            else:
-                return token_ids, masks, text_len, sub_heads, sub_tails, sub_head, sub_tail, obj_heads, obj_tails, ins_json_data['label'], tokens, token_mapping
-        else:
-            s2ro_map = {}
-            for triple in ins_json_data['label']:
-                sub_head_idx = triple[1]
-                sub_end_idx = triple[2]
-                obj_head_idx = triple[5]
-                obj_end_idx = triple[6]
-
-                triple = (self.tokenizer.tokenize(triple[0]), triple[3], self.tokenizer.tokenize(triple[4]))
-
-                if sub_head_idx in start_mapping and obj_head_idx in start_mapping and sub_end_idx in end_mapping and obj_end_idx in end_mapping:
-                    sub_head_idx = start_mapping[sub_head_idx]
-                    obj_head_idx = start_mapping[obj_head_idx]
-
-                    sub = (sub_head_idx+1, end_mapping[sub_end_idx]+1)
-
-                    if sub not in s2ro_map:
-                        s2ro_map[sub] = []
-
-                    s2ro_map[sub].append((obj_head_idx+1, end_mapping[obj_end_idx]+1, self.cat2id[triple[1]]))
-
-            if s2ro_map:
-                token_ids, masks, segment_ids = self.tokenizer.sequence_to_ids(text)
-                text_len = len(token_ids)
-                sub_heads, sub_tails = np.zeros(text_len), np.zeros(text_len)
-                for s in s2ro_map:
-                    sub_heads[s[0]] = 1
-                    sub_tails[s[1]] = 1
-                sub_head_idx, sub_tail_idx = random.choice(list(s2ro_map.keys()))
-                sub_head, sub_tail = np.zeros(text_len), np.zeros(text_len)
-                sub_head[sub_head_idx] = 1
-                sub_tail[sub_tail_idx] = 1
-                obj_heads, obj_tails = np.zeros((text_len, self.class_num)), np.zeros((text_len, self.class_num))
-                for ro in s2ro_map.get((sub_head_idx, sub_tail_idx), []):
-                    obj_heads[ro[0]][ro[2]] = 1
-                    obj_tails[ro[1]][ro[2]] = 1
-                return token_ids, masks, text_len, sub_heads, sub_tails, sub_head, sub_tail, obj_heads, obj_tails, ins_json_data['label'], tokens, token_mapping
-            else:
-                return None
+            return token_ids, masks, text_len, [], [], [], [], [], [], feature['label'], tokens, token_mapping
+
+        s2ro_map = feature['s2ro_map']
+
+        if not s2ro_map:
+            return None
+
+        sub_heads = [s[0] for s in s2ro_map]
+        sub_tails = [s[1] for s in s2ro_map]
+
+        # 每个epoch仅重新随机选择subject
+        sub_head_idx, sub_tail_idx = random.choice(list(s2ro_map.keys()))
+
+        obj_heads = [(ro[0], ro[2]) for ro in s2ro_map[(sub_head_idx, sub_tail_idx)]]
+        obj_tails = [(ro[1], ro[2]) for ro in s2ro_map[(sub_head_idx, sub_tail_idx)]]
+
+        return token_ids, masks, text_len, sub_heads, sub_tails, [sub_head_idx], [sub_tail_idx], obj_heads, obj_tails, feature['label'], tokens, token_mapping
@@ -96,12 +96,19 @@ class CasRelRETask(SequenceClassificationTask):
         for i in range(cur_batch):
             batch_token_ids[i, :text_len[i]].copy_(torch.from_numpy(token_ids[i]))
             batch_masks[i, :text_len[i]].copy_(torch.from_numpy(masks[i]))
-            batch_sub_heads[i, :text_len[i]].copy_(torch.from_numpy(sub_heads[i]))
-            batch_sub_tails[i, :text_len[i]].copy_(torch.from_numpy(sub_tails[i]))
-            batch_sub_head[i, :text_len[i]].copy_(torch.from_numpy(sub_head[i]))
-            batch_sub_tail[i, :text_len[i]].copy_(torch.from_numpy(sub_tail[i]))
-            batch_obj_heads[i, :text_len[i], :].copy_(torch.from_numpy(obj_heads[i]))
-            batch_obj_tails[i, :text_len[i], :].copy_(torch.from_numpy(obj_tails[i]))
+
+            # 数据集中仅保存位置索引，此处构建稠密的训练目标
+            batch_sub_heads[i, sub_heads[i]] = 1
+            batch_sub_tails[i, sub_tails[i]] = 1
+            batch_sub_head[i, sub_head[i]] = 1
+            batch_sub_tail[i, sub_tail[i]] = 1
+
+            if obj_heads[i]:
+                obj_head_positions, obj_head_relations = zip(*obj_heads[i])
+                batch_obj_heads[i, list(obj_head_positions), list(obj_head_relations)] = 1
+            if obj_tails[i]:
+                obj_tail_positions, obj_tail_relations = zip(*obj_tails[i])
+                batch_obj_tails[i, list(obj_tail_positions), list(obj_tail_relations)] = 1
 
         return {'input_ids': batch_token_ids,
                 'attention_mask': batch_masks,
@@ -1,9 +1,11 @@
 import torch
+import inspect
+import torch.nn.functional as F
 
 from torch import nn
+from torch.utils.checkpoint import checkpoint
 from transformers import BertModel
 from transformers import BertPreTrainedModel
-from collections import Counter
 
 
 class MultiNonLinearClassifier(nn.Module):
@@ -22,6 +24,61 @@ class MultiNonLinearClassifier(nn.Module):
         return features_output
 
 
+# torch>=1.11的checkpoint支持use_reentrant参数，旧版本只有可重入的实现
+_checkpoint_kwargs = {}
+if 'use_reentrant' in inspect.signature(checkpoint).parameters:
+    _checkpoint_kwargs['use_reentrant'] = False
+
+
+class GlobalCorresClassifier(MultiNonLinearClassifier):
+    """
+    global correspondence分类器，参数与MultiNonLinearClassifier(hidden_size * 2, 1)完全一致，可直接加载原有权重
+
+    拼接向量经过线性层等价于主体向量与客体向量分别投影后相加，
+    因此先对每个token做一次O(L·H)的投影，再广播相加，避免构造(bs, seq_len, seq_len, 2*hidden)的拼接张量。
+    不分块时仍会保留相加、ReLU和dropout的(bs, seq_len, seq_len, hidden/2)张量，激活显存约为拼接实现的60%；
+    按主体位置分块并使用checkpoint后，峰值只包含一个块的中间张量，seq_len为256、块大小为32时约为拼接实现的1/12
+    """  # noqa: ignore flake8"
+
+    def _pairwise_forward(self, sub_features, obj_features):
+        # (bs, chunk_size, seq_len, hidden/2)
+        features_tmp = sub_features.unsqueeze(2) + obj_features.unsqueeze(1)
+        features_tmp = nn.ReLU()(features_tmp)
+        features_tmp = self.dropout(features_tmp)
+        # (bs, chunk_size, seq_len)
+        return self.hidden2tag(features_tmp).squeeze(-1)
+
+    def pairwise_forward(self, input_features, chunk_size=None):
+        """
+        Args:
+            input_features: (bs, seq_len, hidden)
+            chunk_size (:obj:`int` or :obj:`None`, optional, defaults to None):
+                按主体位置分块计算的块大小，训练时每块使用checkpoint重计算，None则一次性计算
+        """  # noqa: ignore flake8"
+
+        hidden_size = input_features.size(-1)
+        sub_weight, obj_weight = self.linear.weight.split(hidden_size, dim=-1)
+
+        # (bs, seq_len, hidden/2)
+        sub_features = F.linear(input_features, sub_weight, self.linear.bias)
+        obj_features = F.linear(input_features, obj_weight)
+
+        if chunk_size is None:
+            return self._pairwise_forward(sub_features, obj_features)
+
+        corres_pred = []
+        for start_ in range(0, sub_features.size(1), chunk_size):
+            sub_chunk = sub_features[:, start_:start_ + chunk_size]
+            if torch.is_grad_enabled():
+                corres_pred.append(
+                    checkpoint(self._pairwise_forward, sub_chunk, obj_features, **_checkpoint_kwargs)
+                )
+            else:
+                corres_pred.append(self._pairwise_forward(sub_chunk, obj_features))
+
+        return torch.cat(corres_pred, dim=1)
+
+
 class SequenceLabelForSO(nn.Module):
     def __init__(self, hidden_size, tag_size, dropout_rate):
         super(SequenceLabelForSO, self).__init__()
@@ -51,8 +108,12 @@ class PRGCBert(BertPreTrainedModel):
         emb_fusion (:obj:`string`, optional, defaults to `concat`): 关系嵌入与bert输出向量的融合方式，concat是拼接，sum是加和
         corres_mode (:obj:`string` or :obj:`string`, optional, defaults to None): 生成global correspondence矩阵的方式，
                                                                                   biaffine是使用biaffine交叉主体和客体向量进行生成，比较节约显存，
-                                                                                  None则是原论文方式，通过拼接向量再使用全连接层生成
+                                                                                  None则是原论文方式的等价分解实现，主体和客体向量分别投影后广播相加，
+                                                                                  concat则是原论文方式，通过拼接向量再使用全连接层生成
         biaffine_hidden_size (:obj:`int`, optional, defaults to 128): 若使用biaffine生成global correspondence矩阵时，biaffine的隐层size
+        corres_chunk_size (:obj:`int` or :obj:`None`, optional, defaults to 32): corres_mode为None时，按主体位置分块计算global correspondence矩阵的块大小，
+                                                                                训练时每块使用checkpoint重计算，以多一次该分类头的前向计算为代价，
+                                                                                seq_len为256时激活显存约为拼接实现的1/12，None则不分块，激活显存约为拼接实现的60%
 
     Reference:
         [1] PRGC: Potential Relation and Global Correspondence Based Joint Relational Triple Extraction
@@ -67,6 +128,7 @@ class PRGCBert(BertPreTrainedModel):
         emb_fusion='concat',
         corres_mode=None,
         biaffine_hidden_size=128,
+        corres_chunk_size=32
     ):
         super().__init__(config)
         self.seq_tag_size = seq_tag_size
@@ -100,6 +162,7 @@ class PRGCBert(BertPreTrainedModel):
         self.rel_embedding = nn.Embedding(self.rel_num, config.hidden_size)
 
         self.corres_mode = corres_mode
+        self.corres_chunk_size = corres_chunk_size
         if self.corres_mode == 'biaffine':
             self.U = torch.nn.Parameter(
                 torch.randn(
@@ -120,7 +183,7 @@ class PRGCBert(BertPreTrainedModel):
             )
         else:
             # global correspondence
-            self.global_corres = MultiNonLinearClassifier(
+            self.global_corres = GlobalCorresClassifier(
                 config.hidden_size * 2,
                 1,
                 drop_prob
@@ -141,6 +204,8 @@ class PRGCBert(BertPreTrainedModel):
         seq_tags=None,
         potential_rels=None,
         rel_threshold=0.1,
+        max_potential_rels=None,
+        rel_sample_index=None,
         **kwargs
 
     ):
@@ -150,6 +215,10 @@ class PRGCBert(BertPreTrainedModel):
             attention_mask: (batch_size, seq_len)
             rel_tags: (bs, rel_num)
             potential_rels: (bs,), only in train stage.
+            rel_threshold: threshold of potential relations, only in inference stage.
+            max_potential_rels: max number of potential relations per sample, only in inference stage.
+            rel_sample_index: (sum(x_i),), sentence index of each potential relation, only in train stage
+                              when every sentence is encoded once and shared by its relations.
             seq_tags: (bs, 2, seq_len)
             corres_tags: (bs, seq_len, seq_len)
             ex_params: experiment parameters
@@ -175,50 +244,51 @@ class PRGCBert(BertPreTrainedModel):
             obj_extend = self.end_encoder(sequence_output)
 
             corres_pred = torch.einsum('bxi,ioj,byj->bxyo', sub_extend, self.U, obj_extend).squeeze(-1)
-        else:
+        elif self.corres_mode == 'concat':
             sub_extend = sequence_output.unsqueeze(2).expand(-1, -1, seq_len, -1)  # (bs, s, s, h)
             obj_extend = sequence_output.unsqueeze(1).expand(-1, seq_len, -1, -1)  # (bs, s, s, h)
             # batch x seq_len x seq_len x 2*hidden
             corres_pred = torch.cat([sub_extend, obj_extend], 3)
             # (bs, seq_len, seq_len)
             corres_pred = self.global_corres(corres_pred).squeeze(-1)
+        else:
+            # (bs, seq_len, seq_len)
+            corres_pred = self.global_corres.pairwise_forward(
+                sequence_output,
+                chunk_size=self.corres_chunk_size
+            )
 
         # relation predict and data construction in inference stage
         xi, pred_rels = None, None
         if seq_tags is None:
             # (bs, rel_num)
-            rel_pred_onehot = torch.where(torch.sigmoid(rel_pred) > rel_threshold,
-                                          torch.ones(rel_pred.size(), device=rel_pred.device),
-                                          torch.zeros(rel_pred.size(), device=rel_pred.device))
-
-            # if potential relation is null
-            for idx, sample in enumerate(rel_pred_onehot):
-                if 1 not in sample:
-                    # (rel_num,)
-                    max_index = torch.argmax(rel_pred[idx])
-                    sample[max_index] = 1
-                    rel_pred_onehot[idx] = sample
+            rel_pred_onehot = torch.sigmoid(rel_pred) > rel_threshold
+
+            # if potential relation is null, use the relation with max score
+            rel_pred_argmax = F.one_hot(torch.argmax(rel_pred, dim=-1), self.rel_num).bool()
+            rel_pred_empty = ~rel_pred_onehot.any(dim=-1, keepdim=True)
+            rel_pred_onehot = rel_pred_onehot | (rel_pred_argmax & rel_pred_empty)
+
+            # keep at most max_potential_rels relations with the highest scores per sample
+            if max_potential_rels is not None and max_potential_rels < self.rel_num:
+                topk_index = torch.topk(rel_pred, max_potential_rels, dim=-1)[1]
+                rel_pred_topk = torch.zeros_like(rel_pred_onehot).scatter_(-1, topk_index, True)
+                rel_pred_onehot = rel_pred_onehot & rel_pred_topk
 
             # 2*(sum(x_i),)
             bs_idxs, pred_rels = torch.nonzero(rel_pred_onehot, as_tuple=True)
             # get x_i
-            xi_dict = Counter(bs_idxs.tolist())
-            xi = [xi_dict[idx] for idx in range(bs)]
-
-            pos_seq_output = []
-            pos_potential_rel = []
-            pos_attention_mask = []
-            for bs_idx, rel_idx in zip(bs_idxs, pred_rels):
-                # (seq_len, h)
-                pos_seq_output.append(sequence_output[bs_idx])
-                pos_attention_mask.append(attention_mask[bs_idx])
-                pos_potential_rel.append(rel_idx)
+            xi = torch.bincount(bs_idxs, minlength=bs).tolist()
+
             # (sum(x_i), seq_len, h)
-            sequence_output = torch.stack(pos_seq_output, dim=0)
+            sequence_output = sequence_output.index_select(0, bs_idxs)
             # (sum(x_i), seq_len)
-            attention_mask = torch.stack(pos_attention_mask, dim=0)
+            attention_mask = attention_mask.index_select(0, bs_idxs)
             # (sum(x_i),)
-            potential_rels = torch.stack(pos_potential_rel, dim=0)
+            potential_rels = pred_rels
+        elif rel_sample_index is not None:
+            # (sum(x_i), seq_len, h)
+            sequence_output = sequence_output.index_select(0, rel_sample_index)
 
         # (bs/sum(x_i), h)
         rel_emb = self.rel_embedding(potential_rels)
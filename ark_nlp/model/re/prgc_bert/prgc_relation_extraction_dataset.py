@@ -17,7 +17,6 @@
 
 
 import copy
-import numpy as np
 
 from collections import defaultdict
 from ark_nlp.dataset.base._dataset import BaseDataset
@@ -34,9 +33,13 @@ class PRGCREDataset(BaseDataset):
         is_retain_dataset (:obj:`bool`, optional, defaults to False): 是否将处理成dataset格式的原始数据复制到属性retain_dataset中
         is_train (:obj:`bool`, optional, defaults to True): 数据集是否为训练集数据
         is_test (:obj:`bool`, optional, defaults to False): 数据集是否为测试集数据
+        is_share_encoding (:obj:`bool`, optional, defaults to False):
+            训练集是否按句子生成特征，若为True则每个句子只经过一次编码器，再在模型内部扩展到该句子的各个关系，
+            否则与原论文一致，每个(句子, 关系)生成一条特征
     """  # noqa: ignore flake8"
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, is_share_encoding=False, **kwargs):
+        self.is_share_encoding = is_share_encoding
         super(PRGCREDataset, self).__init__(*args, **kwargs)
         self.sublabel2id = {"B-H": 1, "I-H": 2, "O": 0}
         self.oblabel2id = {"B-T": 1, "I-T": 2, "O": 0}
@@ -112,10 +115,8 @@ class PRGCREDataset(BaseDataset):
                 features.append(feature)
 
             else:
-                corres_tag = np.zeros((
-                    self.tokenizer.max_seq_len,
-                    self.tokenizer.max_seq_len
-                ))
+                # 仅记录(主体头部位置, 客体头部位置)，稠密的corres_tags在设备上构建
+                corres_tag = set()
 
                 rel_tag = len(self.cat2id) * [0]
                 rel_entities = defaultdict(set)
@@ -133,9 +134,13 @@ class PRGCREDataset(BaseDataset):
                         sub_head_idx = start_mapping[sub_head_idx]
                         obj_head_idx = start_mapping[obj_head_idx]
 
-                        corres_tag[sub_head_idx+1][obj_head_idx+1] = 1
+                        corres_tag.add((sub_head_idx+1, obj_head_idx+1))
                         rel_entities[self.cat2id[triple[3]]].add((sub_head_idx, end_mapping[sub_end_idx], obj_head_idx, end_mapping[obj_end_idx]))
 
+                corres_tag = sorted(corres_tag)
+
+                seq_tags = []
+                potential_rels = []
                 for rel, en_ll in rel_entities.items():
                     # init
                     tags_sub = self.tokenizer.max_seq_len * [self.sublabel2id['O']]
@@ -151,25 +156,42 @@ class PRGCREDataset(BaseDataset):
                         tags_obj[obj_head_idx + 1] = self.oblabel2id['B-T']
                         tags_obj[obj_head_idx + 1 + 1: obj_end_idx + 1 + 1] = (obj_end_idx - obj_head_idx) * [self.oblabel2id['I-T']]
 
-                    seq_tag = [tags_sub, tags_obj]
-
-                    feature = {
-                        'input_ids': input_ids,
-                        'attention_mask': input_mask,
-                        'corres_tags': corres_tag,
-                        'seq_tags': seq_tag,
-                        'potential_rels': rel,
-                        'rel_tags': rel_tag,
-                        'token_mapping': token_mapping
-                    }
-
-                    features.append(feature)
+                    seq_tags.append([tags_sub, tags_obj])
+                    potential_rels.append(rel)
+
+                if self.is_share_encoding:
+                    if potential_rels:
+                        features.append({
+                            'input_ids': input_ids,
+                            'attention_mask': input_mask,
+                            'corres_tags': corres_tag,
+                            'seq_tags': seq_tags,
+                            'potential_rels': potential_rels,
+                            'rel_tags': rel_tag,
+                            'token_mapping': token_mapping
+                        })
+                else:
+                    for seq_tag, rel in zip(seq_tags, potential_rels):
+
+                        feature = {
+                            'input_ids': input_ids,
+                            'attention_mask': input_mask,
+                            'corres_tags': corres_tag,
+                            'seq_tags': seq_tag,
+                            'potential_rels': rel,
+                            'rel_tags': rel_tag,
+                            'token_mapping': token_mapping
+                        }
+
+                        features.append(feature)
 
         return features
 
     @property
     def to_device_cols(self):
-        if self.is_train:
+        if self.is_train and self.is_share_encoding:
+            return ['input_ids', 'attention_mask', 'corres_tags', 'seq_tags', 'potential_rels', 'rel_tags', 'rel_sample_index']
+        elif self.is_train:
             return ['input_ids', 'attention_mask', 'corres_tags', 'seq_tags', 'potential_rels', 'rel_tags']
         else:
             return ['input_ids', 'attention_mask']
@@ -114,6 +114,83 @@ def tag_mapping_corres(predict_tags, pre_corres, pre_rels=None, label2idx_sub=No
     return pre_triples
 
 
+def get_batch_chunks(tags, begin_id, inside_id):
+    """
+    get_chunks的向量化实现，一次性抽取所有序列中的实体片段
+
+    Args:
+        tags: torch.LongTensor, (num_seq, seq_len)
+        begin_id: id of B tag
+        inside_id: id of I tag
+    Returns:
+        tuple of torch.LongTensor: (seq_idxs, chunk_starts, chunk_ends)
+    """
+    num_seq, seq_len = tags.size()
+    positions = torch.arange(seq_len, device=tags.device).unsqueeze(0).expand(num_seq, -1)
+
+    # 与get_chunks一致，B或者不跟在B、I之后的I都开始一个新的片段
+    prev_tags = torch.cat([torch.full_like(tags[:, :1], -1), tags[:, :-1]], dim=1)
+    is_start = (tags == begin_id) | ((tags == inside_id) & (prev_tags != begin_id) & (prev_tags != inside_id))
+
+    # 片段在之后第一个非I的位置结束
+    break_positions = torch.where(tags != inside_id, positions, torch.full_like(positions, seq_len))
+    break_positions = torch.cat([break_positions[:, 1:], torch.full_like(break_positions[:, :1], seq_len)], dim=1)
+    next_break_positions = torch.flip(torch.cummin(torch.flip(break_positions, [1]), dim=1)[0], [1])
+
+    seq_idxs, chunk_starts = torch.nonzero(is_start, as_tuple=True)
+    chunk_ends = next_break_positions[seq_idxs, chunk_starts]
+
+    return seq_idxs, chunk_starts, chunk_ends
+
+
+def batch_tag_mapping_corres(
+    predict_tags,
+    pre_corres,
+    pre_rels,
+    rel_sample_index,
+    label2idx_sub,
+    label2idx_obj
+):
+    """
+    tag_mapping_corres的向量化实现
+
+    Args:
+        predict_tags: torch.LongTensor, (sum(x_i), 2, seq_len)
+        pre_corres: torch.BoolTensor, (bs, seq_len, seq_len)
+        pre_rels: (sum(x_i),)
+        rel_sample_index: (sum(x_i),), sample index of each relation
+    Returns:
+        torch.LongTensor: (num_triples, 6), (sample_idx, sub_start, sub_end, obj_start, obj_end, rel)
+    """
+    head_rows, head_starts, head_ends = get_batch_chunks(
+        predict_tags[:, 0],
+        label2idx_sub['B-H'],
+        label2idx_sub['I-H']
+    )
+    tail_rows, tail_starts, tail_ends = get_batch_chunks(
+        predict_tags[:, 1],
+        label2idx_obj['B-T'],
+        label2idx_obj['I-T']
+    )
+
+    head_samples = rel_sample_index[head_rows]
+
+    # (num_heads, num_tails)
+    is_retain = (head_rows.unsqueeze(1) == tail_rows.unsqueeze(0)) & \
+        pre_corres[head_samples.unsqueeze(1), head_starts.unsqueeze(1), tail_starts.unsqueeze(0)]
+
+    head_idxs, tail_idxs = torch.nonzero(is_retain, as_tuple=True)
+
+    return torch.stack([
+        head_samples[head_idxs],
+        head_starts[head_idxs],
+        head_ends[head_idxs],
+        tail_starts[tail_idxs],
+        tail_ends[tail_idxs],
+        pre_rels[head_rows[head_idxs]]
+    ], dim=1)
+
+
 class PRGCREPredictor(object):
     """
     CasRel bert模型的联合关系抽取任务的预测器
@@ -251,3 +328,80 @@ class PRGCREPredictor(object):
                 triple_set.add((sub, rel, obj))
 
         return list(triple_set)
+
+    def _get_module_batch_inputs(
+        self,
+        features
+    ):
+        return {
+            col: torch.tensor(np.stack([feature_[col] for feature_ in features]), dtype=torch.long).to(self.device)
+            for col in ['input_ids', 'attention_mask']
+        }
+
+    def predict_batch(
+        self,
+        test_data,
+        batch_size=16,
+        max_potential_rels=None
+    ):
+        """
+        batch样本预测
+
+        Args:
+            test_data (:obj:`list`): 输入文本列表
+            batch_size (:obj:`int`, optional, defaults to 16): batch大小
+            max_potential_rels (:obj:`int` or :obj:`None`, optional, defaults to None): 每个样本最多保留的潜在关系数
+
+        Returns:
+            与test_data顺序一致的三元组列表，每个元素与predict_one_sample的返回结果一致
+        """  # noqa: ignore flake8"
+
+        self.module.eval()
+
+        preds = []
+        with torch.no_grad():
+            for start_ in range(0, len(test_data), batch_size):
+                features = [self._get_input_ids(text_) for text_ in test_data[start_:start_ + batch_size]]
+
+                inputs = self._get_module_batch_inputs(features)
+
+                output_sub, output_obj, corres_pred, pred_rels, xi = self.module(
+                    **inputs,
+                    max_potential_rels=max_potential_rels
+                )
+
+                # (sum(x_i), 2, seq_len)
+                pred_seqs = torch.stack([
+                    torch.argmax(output_sub, dim=-1),
+                    torch.argmax(output_obj, dim=-1)
+                ], dim=1)
+
+                corres_mask = inputs['attention_mask'].unsqueeze(-1) * inputs['attention_mask'].unsqueeze(1)
+                pre_corres = (torch.sigmoid(corres_pred) * corres_mask) > self.corres_threshold
+
+                rel_sample_index = torch.repeat_interleave(
+                    torch.arange(len(features), device=pred_rels.device),
+                    torch.tensor(xi, device=pred_rels.device)
+                )
+
+                pre_triples = batch_tag_mapping_corres(
+                    pred_seqs,
+                    pre_corres,
+                    pred_rels,
+                    rel_sample_index,
+                    self.sublabel2id,
+                    self.oblabel2id
+                ).cpu().tolist()
+
+                triple_sets = [set() for _ in features]
+                for sample_idx, sub_start, sub_end, obj_start, obj_end, rel in pre_triples:
+                    token_mapping = features[sample_idx]['token_mapping']
+
+                    sub = ''.join([token_mapping[index_] for index_ in range(sub_start-1, sub_end-1) if index_ < len(token_mapping)])
+                    obj = ''.join([token_mapping[index_] for index_ in range(obj_start-1, obj_end-1) if index_ < len(token_mapping)])
+
+                    triple_sets[sample_idx].add((sub, self.id2cat[rel], obj))
+
+                preds.extend([list(triple_set_) for triple_set_ in triple_sets])
+
+        return preds
@@ -160,22 +160,35 @@ class PRGCRETask(SequenceClassificationTask):
 
         input_ids = torch.tensor([f['input_ids'] for f in batch], dtype=torch.long)
         attention_mask = torch.tensor([f['attention_mask'] for f in batch], dtype=torch.long)
-        seq_tags = torch.tensor([f['seq_tags'] for f in batch], dtype=torch.long)
-        poten_relations = torch.tensor([f['potential_rels'] for f in batch], dtype=torch.long)
-        corres_tags = torch.tensor([f['corres_tags'] for f in batch], dtype=torch.long)
         rel_tags = torch.tensor([f['rel_tags'] for f in batch], dtype=torch.long)
         token_mapping = [f['token_mapping'] for f in batch]
 
+        # (num_pairs, 3)，每行为(样本序号, 主体头部位置, 客体头部位置)
+        corres_tags = torch.tensor(
+            [(idx_, sub_, obj_) for idx_, f in enumerate(batch) for sub_, obj_ in f['corres_tags']],
+            dtype=torch.long
+        ).view(-1, 3)
+
         tensors = {
             'input_ids': input_ids,
             'attention_mask': attention_mask,
-            'seq_tags': seq_tags,
-            'potential_rels': poten_relations,
             'corres_tags': corres_tags,
             'rel_tags': rel_tags,
             'token_mapping': token_mapping
         }
 
+        if isinstance(batch[0]['potential_rels'], list):
+            # 每个句子仅编码一次，由rel_sample_index在模型内部扩展到各个关系
+            tensors['seq_tags'] = torch.tensor([tag_ for f in batch for tag_ in f['seq_tags']], dtype=torch.long)
+            tensors['potential_rels'] = torch.tensor([rel_ for f in batch for rel_ in f['potential_rels']], dtype=torch.long)
+            tensors['rel_sample_index'] = torch.tensor(
+                [idx_ for idx_, f in enumerate(batch) for _ in f['potential_rels']],
+                dtype=torch.long
+            )
+        else:
+            tensors['seq_tags'] = torch.tensor([f['seq_tags'] for f in batch], dtype=torch.long)
+            tensors['potential_rels'] = torch.tensor([f['potential_rels'] for f in batch], dtype=torch.long)
+
         return tensors
 
     def _evaluate_collate_fn(self, features):
@@ -222,7 +235,10 @@ class PRGCRETask(SequenceClassificationTask):
         mask_tmp2 = inputs['attention_mask'].unsqueeze(1)
         corres_mask = mask_tmp1 * mask_tmp2
 
-        attention_mask = inputs['attention_mask'].view(-1)
+        if 'rel_sample_index' in inputs:
+            attention_mask = inputs['attention_mask'].index_select(0, inputs['rel_sample_index']).view(-1)
+        else:
+            attention_mask = inputs['attention_mask'].view(-1)
         # sequence label loss
         loss_func = nn.CrossEntropyLoss(reduction='none')
         loss_seq_sub = (loss_func(output_sub.view(-1, self.module.seq_tag_size),
@@ -233,14 +249,19 @@ class PRGCRETask(SequenceClassificationTask):
         # init
         loss_matrix, loss_rel = torch.tensor(0), torch.tensor(0)
 
+        # 根据索引在设备上构建稠密的corres_tags
+        corres_tags = torch.zeros_like(corres_pred)
+        corres_index = inputs['corres_tags']
+        corres_tags[corres_index[:, 0], corres_index[:, 1], corres_index[:, 2]] = 1
+
         corres_pred = corres_pred.view(batch_size, -1)
         corres_mask = corres_mask.view(batch_size, -1)
-        corres_tags = inputs['corres_tags'].view(batch_size, -1)
+        corres_tags = corres_tags.view(batch_size, -1)
 
         loss_func = nn.BCEWithLogitsLoss(reduction='none')
 
         loss_matrix = (loss_func(corres_pred,
-                                 corres_tags.float()) * corres_mask).sum() / corres_mask.sum()
+                                 corres_tags) * corres_mask).sum() / corres_mask.sum()
 
         loss_func = nn.BCEWithLogitsLoss(reduction='mean')
         loss_rel = loss_func(rel_pred, inputs['rel_tags'].float())
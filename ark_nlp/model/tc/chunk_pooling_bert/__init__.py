@@ -0,0 +1,20 @@
+from ark_nlp.dataset import ChunkSentenceClassificationDataset as Dataset
+from ark_nlp.dataset import ChunkSentenceClassificationDataset as ChunkPoolingBertTCDataset
+
+from ark_nlp.processor.tokenizer.transfomer import SentenceTokenizer as Tokenizer
+from ark_nlp.processor.tokenizer.transfomer import SentenceTokenizer as ChunkPoolingBertTCTokenizer
+
+from ark_nlp.nn import BertConfig
+from ark_nlp.nn import BertConfig as ModuleConfig
+
+from ark_nlp.nn import ChunkPoolingBert
+from ark_nlp.nn import ChunkPoolingBert as Module
+
+from ark_nlp.factory.optimizer import get_default_bert_optimizer as get_default_model_optimizer
+from ark_nlp.factory.optimizer import get_default_bert_optimizer as get_default_chunk_pooling_bert_optimizer
+
+from ark_nlp.factory.task import ChunkPoolingTCTask as Task
+from ark_nlp.factory.task import ChunkPoolingTCTask as ChunkPoolingBertTCTask
+
+from ark_nlp.factory.predictor import ChunkPoolingTCPredictor as Predictor
+from ark_nlp.factory.predictor import ChunkPoolingTCPredictor as ChunkPoolingBertTCPredictor
@@ -0,0 +1,20 @@
+from ark_nlp.dataset import SentenceClassificationDataset as Dataset
+from ark_nlp.dataset import SentenceClassificationDataset as EarlyExitBertTCDataset
+
+from ark_nlp.processor.tokenizer.transfomer import SentenceTokenizer as Tokenizer
+from ark_nlp.processor.tokenizer.transfomer import SentenceTokenizer as EarlyExitBertTCTokenizer
+
+from ark_nlp.nn import BertConfig
+from ark_nlp.nn import BertConfig as ModuleConfig
+
+from ark_nlp.nn import EarlyExitBert
+from ark_nlp.nn import EarlyExitBert as Module
+
+from ark_nlp.factory.optimizer import get_default_bert_optimizer as get_default_model_optimizer
+from ark_nlp.factory.optimizer import get_default_bert_optimizer as get_default_early_exit_bert_optimizer
+
+from ark_nlp.factory.task import EarlyExitTCTask as Task
+from ark_nlp.factory.task import EarlyExitTCTask as EarlyExitBertTCTask
+
+from ark_nlp.factory.predictor import EarlyExitTCPredictor as Predictor
+from ark_nlp.factory.predictor import EarlyExitTCPredictor as EarlyExitBertTCPredictor
@@ -25,3 +25,7 @@ from ark_nlp.model.tm.unsupervised_simcse.unsupervised_simcse_task import Unsupe
 from ark_nlp.model.tm.unsupervised_simcse.unsupervised_simcse_predictor import UnsupervisedSimCSEPredictor
 from ark_nlp.model.tm.unsupervised_simcse.unsupervised_simcse_predictor import UnsupervisedSimCSEPredictor as Predictor
 from ark_nlp.model.tm.unsupervised_simcse.unsupervised_simcse_predictor import UnsupervisedSimCSEPredictor as UnsupSimCSEPredictor
+
+from ark_nlp.model.tm.unsupervised_simcse.unsupervised_simcse_index import UnsupervisedSimCSEIndex
+from ark_nlp.model.tm.unsupervised_simcse.unsupervised_simcse_index import UnsupervisedSimCSEIndex as Index
+from ark_nlp.model.tm.unsupervised_simcse.unsupervised_simcse_index import UnsupervisedSimCSEIndex as UnsupSimCSEIndex
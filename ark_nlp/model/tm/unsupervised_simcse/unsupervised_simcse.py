@@ -122,6 +122,43 @@ class SimCSE(Bert):
 
         return out
 
+    def get_unique_pooled_embedding(
+        self,
+        input_ids,
+        token_type_ids=None,
+        attention_mask=None,
+        pooling='cls'
+    ):
+        """
+        对batch内重复的输入只编码一次，再将句向量映射回原位置
+
+        Args:
+            input_ids: (bs, seq_len)
+            token_type_ids: (bs, seq_len)
+            attention_mask: (bs, seq_len)
+        """  # noqa: ignore flake8"
+
+        features = [input_ids, token_type_ids, attention_mask]
+        is_exist = [feature_ is not None for feature_ in features]
+
+        unique_features, inverse = torch.unique(
+            torch.cat([feature_ for feature_ in features if feature_ is not None], dim=-1),
+            dim=0,
+            return_inverse=True
+        )
+        unique_features = iter(unique_features.split(input_ids.size(-1), dim=-1))
+        input_ids, token_type_ids, attention_mask = [next(unique_features) if is_exist_ else None for is_exist_ in is_exist]
+
+        embedding = self.get_pooled_embedding(
+            input_ids,
+            token_type_ids,
+            None,
+            attention_mask,
+            pooling=pooling
+        )
+
+        return embedding[inverse]
+
     def cosine_sim(
         self,
         input_ids_a,
@@ -136,21 +173,42 @@ class SimCSE(Bert):
         **kwargs
     ):
 
-        query_cls_embedding = self.get_pooled_embedding(
-            input_ids_a,
-            token_type_ids_a,
-            position_ids_ids_a,
-            attention_mask_a,
-            pooling=pooling
+        is_dedup = (
+            not self.training
+            and position_ids_ids_a is None
+            and position_ids_b is None
+            and input_ids_a.shape == input_ids_b.shape
+            and (token_type_ids_a is None) == (token_type_ids_b is None)
+            and (attention_mask_a is None) == (attention_mask_b is None)
         )
 
-        title_cls_embedding = self.get_pooled_embedding(
-            input_ids_b,
-            token_type_ids_b,
-            position_ids_b,
-            attention_mask_b,
-            pooling=pooling
-        )
+        if is_dedup:
+            # text_a和text_b合并去重后统一编码，预测时dropout不生效，结果与分别编码一致
+            batch_size = input_ids_a.size(0)
+            embedding = self.get_unique_pooled_embedding(
+                torch.cat([input_ids_a, input_ids_b]),
+                torch.cat([token_type_ids_a, token_type_ids_b]) if token_type_ids_a is not None else None,
+                torch.cat([attention_mask_a, attention_mask_b]) if attention_mask_a is not None else None,
+                pooling=pooling
+            )
+            query_cls_embedding = embedding[:batch_size]
+            title_cls_embedding = embedding[batch_size:]
+        else:
+            query_cls_embedding = self.get_pooled_embedding(
+                input_ids_a,
+                token_type_ids_a,
+                position_ids_ids_a,
+                attention_mask_a,
+                pooling=pooling
+            )
+
+            title_cls_embedding = self.get_pooled_embedding(
+                input_ids_b,
+                token_type_ids_b,
+                position_ids_b,
+                attention_mask_b,
+                pooling=pooling
+            )
 
         cosine_sim = torch.sum(
             query_cls_embedding * title_cls_embedding,
@@ -186,6 +244,21 @@ class SimCSE(Bert):
             attention_mask_b
         )
 
+        return self.contrastive_loss(cls_embedding_a, cls_embedding_b)
+
+    def contrastive_loss(
+        self,
+        cls_embedding_a,
+        cls_embedding_b
+    ):
+        """
+        计算batch内负样本的对比损失
+
+        Args:
+            cls_embedding_a: (bs, emb_size)
+            cls_embedding_b: (bs, emb_size)
+        """  # noqa: ignore flake8"
+
         cosine_sim = torch.matmul(cls_embedding_a, cls_embedding_b.T)
 
         cosine_sim = cosine_sim - torch.eye(cls_embedding_a.shape[0], device=cls_embedding_a.device) * self.margin
@@ -196,6 +269,6 @@ class SimCSE(Bert):
         labels = torch.arange(0, cls_embedding_a.shape[0])
         labels = torch.reshape(labels, shape=[-1, 1]).squeeze(1)
 
-        loss = F.cross_entropy(cosine_sim, labels.to(input_ids_a.device))
+        loss = F.cross_entropy(cosine_sim, labels.to(cls_embedding_a.device))
 
         return cosine_sim, loss
@@ -40,11 +40,18 @@ class UnsupervisedSimCSEDataset(TwinTowersSentenceClassificationDataset):
 
     def _convert_to_transfomer_ids(self, bert_tokenizer):
 
+        # 每个文本只ID化一次
+        text2ids = {}
+
         features = []
         for (_index, _row) in enumerate(self.dataset):
 
-            input_ids_a = bert_tokenizer.sequence_to_ids(_row['text_a'])
-            input_ids_b = bert_tokenizer.sequence_to_ids(_row['text_b'])
+            for _text in (_row['text_a'], _row['text_b']):
+                if _text not in text2ids:
+                    text2ids[_text] = bert_tokenizer.sequence_to_ids(_text)
+
+            input_ids_a = text2ids[_row['text_a']]
+            input_ids_b = text2ids[_row['text_b']]
 
             input_ids_a, input_mask_a, segment_ids_a = input_ids_a
             input_ids_b, input_mask_b, segment_ids_b = input_ids_b
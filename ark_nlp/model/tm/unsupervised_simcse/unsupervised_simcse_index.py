@@ -0,0 +1,415 @@
+# Copyright (c) 2020 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import os
+import json
+import codecs
+import torch
+import numpy as np
+
+
+class UnsupervisedSimCSEIndex(object):
+    """
+    基于UnsupervisedSimCSE句向量的检索索引，文本只需编码一次，之后通过矩阵乘法进行top-k检索
+
+    Args:
+        module: 深度学习模型
+        tokernizer: 分词器
+        pooling (:obj:`str`, optional, defaults to "cls"): 句向量的池化方式，与cosine_sim保持一致
+        dtype (:obj:`str`, optional, defaults to "float16"):
+            句向量的存储类型，可选有["float32", "float16", "int8"]
+        index_type (:obj:`str`, optional, defaults to "flat"):
+            检索方式，flat为分块矩阵乘法的精确检索，ivf为基于倒排聚类的近似检索，适用于大规模语料
+        n_clusters (:obj:`int` or :obj:`None`, optional, defaults to None):
+            ivf的聚类中心个数，默认为4 * sqrt(语料数)
+        n_probe (:obj:`int`, optional, defaults to 8): ivf检索时查找的聚类中心个数
+
+    Example::
+
+        >>> index = UnsupervisedSimCSEIndex(module, tokenizer)
+        >>> index.build(corpus, index_path='./simcse_index')
+        >>> scores, ids = index.search(['头痛'], topk=10)
+        >>> index = UnsupervisedSimCSEIndex.load('./simcse_index', module, tokenizer)
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        module,
+        tokernizer,
+        pooling='cls',
+        dtype='float16',
+        index_type='flat',
+        n_clusters=None,
+        n_probe=8
+    ):
+        if dtype not in ('float32', 'float16', 'int8'):
+            raise ValueError("The dtype does not exist")
+
+        if index_type not in ('flat', 'ivf'):
+            raise ValueError("The index type does not exist")
+
+        self.module = module
+        if hasattr(self.module, 'task') is False:
+            self.module.task = 'SequenceLevel'
+
+        self.tokenizer = tokernizer
+        self.device = list(self.module.parameters())[0].device
+
+        self.pooling = pooling
+        self.dtype = dtype
+        self.index_type = index_type
+        self.n_clusters = n_clusters
+        self.n_probe = n_probe
+
+        self.embeddings = None
+        self.texts = None
+
+        self.centroids = None
+        self.list_offsets = None
+        self.list_ids = None
+
+    def _get_module_batch_inputs(
+        self,
+        texts
+    ):
+        features = [self.tokenizer.sequence_to_ids(text_) for text_ in texts]
+        input_ids, attention_mask, token_type_ids = [np.stack(col_) for col_ in zip(*features)]
+
+        return {
+            'input_ids': torch.tensor(input_ids, dtype=torch.long).to(self.device),
+            'attention_mask': torch.tensor(attention_mask, dtype=torch.long).to(self.device),
+            'token_type_ids': torch.tensor(token_type_ids, dtype=torch.long).to(self.device)
+        }
+
+    def encode(
+        self,
+        texts,
+        batch_size=64
+    ):
+        """
+        将文本编码为归一化后的句向量
+
+        Args:
+            texts (:obj:`list`): 文本列表
+            batch_size (:obj:`int`, optional, defaults to 64): 编码时的batch大小
+
+        Returns:
+            np.ndarray: (len(texts), emb_size)的float32矩阵
+        """  # noqa: ignore flake8"
+
+        self.module.eval()
+
+        embeddings = []
+        with torch.no_grad():
+            for start_ in range(0, len(texts), batch_size):
+                inputs = self._get_module_batch_inputs(texts[start_:start_ + batch_size])
+
+                embedding = self.module.get_pooled_embedding(
+                    inputs['input_ids'],
+                    token_type_ids=inputs['token_type_ids'],
+                    attention_mask=inputs['attention_mask'],
+                    pooling=self.pooling
+                )
+
+                embeddings.append(embedding.float().cpu().numpy())
+
+        return np.concatenate(embeddings, axis=0)
+
+    def _quantize(self, embeddings):
+        if self.dtype == 'int8':
+            return np.clip(np.rint(embeddings * 127), -127, 127).astype(np.int8)
+        return embeddings.astype(self.dtype)
+
+    def _dequantize(self, embeddings):
+        if self.dtype == 'int8':
+            return embeddings.astype(np.float32) / 127
+        return embeddings.astype(np.float32)
+
+    def build(
+        self,
+        texts,
+        index_path=None,
+        batch_size=64,
+        is_retain_texts=True
+    ):
+        """
+        编码语料并构建索引
+
+        Args:
+            texts (:obj:`list`): 语料文本列表
+            index_path (:obj:`string` or :obj:`None`, optional, defaults to None):
+                索引保存的目录，若设置则句向量直接写入内存映射文件，否则保存在内存中
+            batch_size (:obj:`int`, optional, defaults to 64): 编码时的batch大小
+            is_retain_texts (:obj:`bool`, optional, defaults to True): 是否在索引中保存语料文本
+        """  # noqa: ignore flake8"
+
+        for start_ in range(0, len(texts), batch_size):
+            embedding = self._quantize(self.encode(texts[start_:start_ + batch_size], batch_size))
+
+            if self.embeddings is None:
+                shape = (len(texts), embedding.shape[1])
+                if index_path is None:
+                    self.embeddings = np.empty(shape, dtype=embedding.dtype)
+                else:
+                    os.makedirs(index_path, exist_ok=True)
+                    self.embeddings = np.lib.format.open_memmap(
+                        os.path.join(index_path, 'embeddings.npy'),
+                        mode='w+',
+                        dtype=embedding.dtype,
+                        shape=shape
+                    )
+
+            self.embeddings[start_:start_ + batch_size] = embedding
+
+        self.texts = list(texts) if is_retain_texts else None
+
+        if self.index_type == 'ivf':
+            self._train_ivf()
+
+        if index_path is not None:
+            self.save(index_path)
+
+        return self
+
+    def _iter_blocks(self, ids=None, block_size=65536):
+        num = len(self.embeddings) if ids is None else len(ids)
+        for start_ in range(0, num, block_size):
+            if ids is None:
+                yield start_, self._dequantize(self.embeddings[start_:start_ + block_size])
+            else:
+                yield start_, self._dequantize(self.embeddings[ids[start_:start_ + block_size]])
+
+    def _train_ivf(
+        self,
+        n_iter=10,
+        sample_size_per_cluster=64,
+        block_size=65536,
+        seed=42
+    ):
+        """
+        使用球面k-means训练聚类中心，并构建倒排列表
+        """  # noqa: ignore flake8"
+
+        num = len(self.embeddings)
+        n_clusters = self.n_clusters if self.n_clusters is not None else int(4 * np.sqrt(num))
+        n_clusters = max(1, min(n_clusters, num))
+
+        rng = np.random.RandomState(seed)
+        sample_ids = np.sort(rng.choice(num, min(num, n_clusters * sample_size_per_cluster), replace=False))
+        samples = self._dequantize(self.embeddings[sample_ids])
+
+        centroids = samples[rng.choice(len(samples), n_clusters, replace=False)]
+        for _ in range(n_iter):
+            assign = np.argmax(samples @ centroids.T, axis=1)
+
+            new_centroids = np.zeros_like(centroids)
+            np.add.at(new_centroids, assign, samples)
+
+            # 空的聚类重新随机选取样本作为中心
+            empty = np.bincount(assign, minlength=n_clusters) == 0
+            new_centroids[empty] = samples[rng.choice(len(samples), int(empty.sum()))]
+
+            centroids = new_centroids / np.linalg.norm(new_centroids, axis=1, keepdims=True).clip(1e-12)
+
+        assign = np.concatenate([
+            np.argmax(block_ @ centroids.T, axis=1) for _, block_ in self._iter_blocks(block_size=block_size)
+        ])
+
+        self.centroids = centroids.astype(np.float32)
+        self.list_ids = np.argsort(assign, kind='stable').astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_clusters))]).astype(np.int64)
+
+    @staticmethod
+    def _merge_topk(scores, ids, topk):
+        if scores.shape[1] > topk:
+            top_ = np.argpartition(-scores, topk - 1, axis=1)[:, :topk]
+            scores = np.take_along_axis(scores, top_, axis=1)
+            ids = np.take_along_axis(ids, top_, axis=1)
+        return scores, ids
+
+    def _flat_search(self, query_embeddings, topk, block_size):
+
+        best_scores = np.full((len(query_embeddings), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(query_embeddings), 0), dtype=np.int64)
+
+        for start_, block_ in self._iter_blocks(block_size=block_size):
+            scores = query_embeddings @ block_.T
+            ids = np.broadcast_to(np.arange(start_, start_ + len(block_)), scores.shape)
+
+            best_scores, best_ids = self._merge_topk(
+                np.concatenate([best_scores, scores], axis=1),
+                np.concatenate([best_ids, ids], axis=1),
+                topk
+            )
+
+        return best_scores, best_ids
+
+    def _ivf_search(self, query_embeddings, topk, block_size):
+
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(query_embeddings @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        best_scores = np.full((len(query_embeddings), topk), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(query_embeddings), topk), -1, dtype=np.int64)
+
+        for query_idx_, (query_, probe_) in enumerate(zip(query_embeddings, probes)):
+            candidate_ids = np.sort(np.concatenate([
+                self.list_ids[self.list_offsets[cluster_]:self.list_offsets[cluster_ + 1]] for cluster_ in probe_
+            ]))
+
+            scores = np.concatenate([
+                block_ @ query_ for _, block_ in self._iter_blocks(candidate_ids, block_size)
+            ])
+
+            scores, ids = self._merge_topk(scores[None, :], candidate_ids[None, :], topk)
+            best_scores[query_idx_, :scores.shape[1]] = scores[0]
+            best_ids[query_idx_, :ids.shape[1]] = ids[0]
+
+        return best_scores, best_ids
+
+    def search_by_embeddings(
+        self,
+        query_embeddings,
+        topk=10,
+        block_size=65536
+    ):
+        """
+        使用句向量检索
+
+        Args:
+            query_embeddings (:obj:`np.ndarray`): (num_query, emb_size)的归一化句向量
+            topk (:obj:`int`, optional, defaults to 10): 返回TopK结果
+            block_size (:obj:`int`, optional, defaults to 65536): 分块矩阵乘法的块大小
+
+        Returns:
+            tuple: 按分数降序排列的(scores, ids)，形状均为(num_query, topk)，ivf召回不足topk时以-1填充id
+        """  # noqa: ignore flake8"
+
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        topk = min(topk, len(self.embeddings))
+
+        if self.index_type == 'ivf':
+            scores, ids = self._ivf_search(query_embeddings, topk, block_size)
+        else:
+            scores, ids = self._flat_search(query_embeddings, topk, block_size)
+
+        order = np.argsort(-scores, axis=1, kind='stable')
+
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+    def search(
+        self,
+        queries,
+        topk=10,
+        batch_size=64,
+        block_size=65536
+    ):
+        """
+        使用文本检索
+
+        Args:
+            queries (:obj:`list`): 查询文本列表
+            topk (:obj:`int`, optional, defaults to 10): 返回TopK结果
+            batch_size (:obj:`int`, optional, defaults to 64): 编码时的batch大小
+            block_size (:obj:`int`, optional, defaults to 65536): 分块矩阵乘法的块大小
+        """  # noqa: ignore flake8"
+
+        return self.search_by_embeddings(
+            self.encode(queries, batch_size),
+            topk=topk,
+            block_size=block_size
+        )
+
+    def save(self, index_path):
+        """
+        保存索引，句向量以.npy格式保存，加载时使用内存映射
+
+        Args:
+            index_path (:obj:`string`): 索引保存的目录
+        """  # noqa: ignore flake8"
+
+        os.makedirs(index_path, exist_ok=True)
+
+        embedding_path = os.path.join(index_path, 'embeddings.npy')
+        if isinstance(self.embeddings, np.memmap) and os.path.abspath(self.embeddings.filename) == os.path.abspath(embedding_path):
+            self.embeddings.flush()
+        else:
+            np.save(embedding_path, self.embeddings)
+
+        config = {
+            'pooling': self.pooling,
+            'dtype': self.dtype,
+            'index_type': self.index_type,
+            'n_clusters': self.n_clusters,
+            'n_probe': self.n_probe
+        }
+        with codecs.open(os.path.join(index_path, 'config.json'), mode='w', encoding='utf8') as f:
+            json.dump(config, f)
+
+        if self.index_type == 'ivf':
+            np.savez(
+                os.path.join(index_path, 'ivf.npz'),
+                centroids=self.centroids,
+                list_ids=self.list_ids,
+                list_offsets=self.list_offsets
+            )
+
+        if self.texts is not None:
+            with codecs.open(os.path.join(index_path, 'texts.json'), mode='w', encoding='utf8') as f:
+                json.dump(self.texts, f, ensure_ascii=False)
+
+    @classmethod
+    def load(
+        cls,
+        index_path,
+        module,
+        tokernizer,
+        **kwargs
+    ):
+        """
+        加载索引
+
+        Args:
+            index_path (:obj:`string`): 索引保存的目录
+            module: 深度学习模型
+            tokernizer: 分词器
+            **kwargs (optional): 覆盖保存时的配置，例如n_probe
+        """  # noqa: ignore flake8"
+
+        with codecs.open(os.path.join(index_path, 'config.json'), mode='r', encoding='utf8') as f:
+            config = json.load(f)
+        config.update(kwargs)
+
+        index = cls(module, tokernizer, **config)
+        index.embeddings = np.load(os.path.join(index_path, 'embeddings.npy'), mmap_mode='r')
+
+        if index.index_type == 'ivf':
+            ivf = np.load(os.path.join(index_path, 'ivf.npz'))
+            index.centroids = ivf['centroids']
+            index.list_ids = ivf['list_ids']
+            index.list_offsets = ivf['list_offsets']
+
+        texts_path = os.path.join(index_path, 'texts.json')
+        if os.path.exists(texts_path):
+            with codecs.open(texts_path, mode='r', encoding='utf8') as f:
+                index.texts = json.load(f)
+
+        return index
+
+    def __len__(self):
+        return 0 if self.embeddings is None else len(self.embeddings)
@@ -17,6 +17,7 @@
 
 
 import torch
+import numpy as np
 
 from torch.utils.data import DataLoader
 from ark_nlp.factory.predictor import SequenceClassificationPredictor
@@ -108,6 +109,15 @@ class UnsupervisedSimCSEPredictor(SequenceClassificationPredictor):
         batch_size=16,
         shuffle=False
     ):
+        """
+        batch样本预测，batch内重复的文本只编码一次
+
+        Args:
+            test_data (:obj:`ark_nlp dataset`): 输入batch文本
+            batch_size (:obj:`int`, optional, defaults to 16): batch大小
+            shuffle (:obj:`bool`, optional, defaults to False): 是否打扰数据集
+        """  # noqa: ignore flake8"
+
         self.inputs_cols = test_data.dataset_cols
 
         preds = []
@@ -124,3 +134,99 @@ class UnsupervisedSimCSEPredictor(SequenceClassificationPredictor):
                 preds.extend(logits)
 
         return preds
+
+    def get_embeddings(
+        self,
+        texts,
+        batch_size=64,
+        pooling='cls',
+        embedding_cache=None
+    ):
+        """
+        获取文本的句向量，重复的文本只编码一次
+
+        Args:
+            texts (:obj:`list`): 文本列表
+            batch_size (:obj:`int`, optional, defaults to 64): 编码时的batch大小
+            pooling (:obj:`str`, optional, defaults to "cls"): 句向量的池化方式
+            embedding_cache (:obj:`EmbeddingCache` or :obj:`None`, optional, defaults to None):
+                以文本哈希为键的句向量缓存，命中的文本直接跳过编码
+
+        Returns:
+            np.ndarray: (len(texts), emb_size)的float32矩阵
+        """  # noqa: ignore flake8"
+
+        unique_texts = list(dict.fromkeys(texts))
+
+        if embedding_cache is not None:
+            unique_embeddings = embedding_cache.get(unique_texts)
+        else:
+            unique_embeddings = [None] * len(unique_texts)
+
+        missing_texts = [text_ for text_, embedding_ in zip(unique_texts, unique_embeddings) if embedding_ is None]
+
+        self.module.eval()
+
+        missing_embeddings = []
+        with torch.no_grad():
+            for start_ in range(0, len(missing_texts), batch_size):
+                features = [self.tokenizer.sequence_to_ids(text_) for text_ in missing_texts[start_:start_ + batch_size]]
+                input_ids, attention_mask, token_type_ids = [
+                    torch.tensor(np.stack(col_), dtype=torch.long).to(self.device) for col_ in zip(*features)
+                ]
+
+                embedding = self.module.get_pooled_embedding(
+                    input_ids,
+                    token_type_ids=token_type_ids,
+                    attention_mask=attention_mask,
+                    pooling=pooling
+                )
+
+                missing_embeddings.append(embedding.float().cpu().numpy())
+
+        if missing_texts:
+            missing_embeddings = np.concatenate(missing_embeddings, axis=0)
+
+            if embedding_cache is not None:
+                embedding_cache.set(missing_texts, missing_embeddings)
+
+            missing_embeddings = iter(missing_embeddings)
+            unique_embeddings = [
+                next(missing_embeddings) if embedding_ is None else embedding_ for embedding_ in unique_embeddings
+            ]
+
+        text2index = {text_: index_ for index_, text_ in enumerate(unique_texts)}
+        unique_embeddings = np.stack(unique_embeddings) if unique_embeddings else np.zeros((0, 0), dtype=np.float32)
+
+        return unique_embeddings[[text2index[text_] for text_ in texts]]
+
+    def predict_pairs(
+        self,
+        text_pairs,
+        batch_size=64,
+        pooling='cls',
+        embedding_cache=None
+    ):
+        """
+        句子对的余弦相似度预测，所有句子对中的文本去重后只编码一次
+
+        Args:
+            text_pairs (:obj:`list`): (text_a, text_b)组成的列表
+            batch_size (:obj:`int`, optional, defaults to 64): 编码时的batch大小
+            pooling (:obj:`str`, optional, defaults to "cls"): 句向量的池化方式
+            embedding_cache (:obj:`EmbeddingCache` or :obj:`None`, optional, defaults to None): 句向量缓存
+
+        Returns:
+            np.ndarray: (len(text_pairs),)的余弦相似度
+        """  # noqa: ignore flake8"
+
+        text_a, text_b = zip(*text_pairs)
+
+        embeddings = self.get_embeddings(
+            list(text_a) + list(text_b),
+            batch_size=batch_size,
+            pooling=pooling,
+            embedding_cache=embedding_cache
+        )
+
+        return np.sum(embeddings[:len(text_pairs)] * embeddings[len(text_pairs):], axis=-1)
@@ -18,6 +18,8 @@
 
 import torch
 import numpy as np
+
+from tqdm import tqdm
 from scipy import stats
 
 from ark_nlp.factory.task.base._sequence_classification import SequenceClassificationTask
@@ -44,6 +46,166 @@ class UnsupervisedSimCSETask(SequenceClassificationTask):
 
         super(UnsupervisedSimCSETask, self).__init__(*args, **kwargs)
 
+    def fit(
+        self,
+        train_data,
+        validation_data=None,
+        lr=False,
+        params=None,
+        batch_size=32,
+        epochs=1,
+        gradient_accumulation_steps=1,
+        grad_cache_chunk_size=None,
+        **kwargs
+    ):
+        """
+        训练方法
+
+        Args:
+            train_data (:obj:`ark_nlp dataset`): 训练的batch文本
+            validation_data (:obj:`ark_nlp dataset`): 验证的batch文本
+            lr (:obj:`float` or :obj:`bool`, optional, defaults to False): 学习率
+            params (:obj:`str` or :obj:`torch.optim.Optimizer` or :obj:`list` or :obj:`None`, optional, defaults to None): 优化器，可能是名称、对象、参数列表
+            batch_size (:obj:`int`, optional, defaults to 32): batch大小，使用梯度缓存时为对比学习的逻辑batch大小
+            epochs (:obj:`int`, optional, defaults to 1): 训练轮数
+            gradient_accumulation_steps (:obj:`int`, optional, defaults to 1): 梯度累计数
+            grad_cache_chunk_size (:obj:`int` or :obj:`None`, optional, defaults to None):
+                梯度缓存(Gradient Cache)模式下每次前向的样本数，显存占用只与该值相关，
+                batch内负样本数量仍为batch_size，None则不使用梯度缓存
+            **kwargs (optional): 其他可选参数
+        """  # noqa: ignore flake8"
+
+        if grad_cache_chunk_size is None:
+            return super(UnsupervisedSimCSETask, self).fit(
+                train_data,
+                validation_data=validation_data,
+                lr=lr,
+                params=params,
+                batch_size=batch_size,
+                epochs=epochs,
+                gradient_accumulation_steps=gradient_accumulation_steps,
+                **kwargs
+            )
+
+        self.logs = dict()
+
+        train_generator = self._on_train_begin(
+            train_data,
+            validation_data,
+            batch_size,
+            lr,
+            params,
+            shuffle=True,
+            **kwargs
+        )
+
+        for epoch in range(epochs):
+
+            self._on_epoch_begin(**kwargs)
+
+            for step, inputs in enumerate(tqdm(train_generator)):
+
+                self._on_step_begin(epoch, step, inputs, **kwargs)
+
+                # input处理和设备转移
+                inputs = self._get_module_inputs_on_train(inputs, **kwargs)
+
+                # 分块前向、计算损失并反向传播
+                logits, loss = self._grad_cache_backward(
+                    inputs,
+                    grad_cache_chunk_size,
+                    gradient_accumulation_steps=gradient_accumulation_steps,
+                    **kwargs
+                )
+
+                if (step + 1) % gradient_accumulation_steps == 0:
+
+                    # optimize
+                    self._on_optimize(inputs, logits, logits, loss, **kwargs)
+
+                # setp evaluate
+                self._on_step_end(step, inputs, logits, logits, loss, **kwargs)
+
+            self._on_epoch_end(epoch, **kwargs)
+
+            if validation_data is not None:
+                self.evaluate(validation_data, **kwargs)
+
+        self._on_train_end(**kwargs)
+
+    def _get_rng_state(self):
+        rng_state = {'cpu': torch.get_rng_state()}
+        if torch.cuda.is_available() and torch.device(self.device).type == 'cuda':
+            rng_state['cuda'] = torch.cuda.get_rng_state(self.device)
+        return rng_state
+
+    def _set_rng_state(self, rng_state):
+        torch.set_rng_state(rng_state['cpu'])
+        if 'cuda' in rng_state:
+            torch.cuda.set_rng_state(rng_state['cuda'], self.device)
+
+    def _get_chunk_pooled_embedding(self, inputs, suffix, start, end):
+        return self.module.get_pooled_embedding(
+            inputs['input_ids_' + suffix][start:end],
+            inputs['token_type_ids_' + suffix][start:end] if 'token_type_ids_' + suffix in inputs else None,
+            None,
+            inputs['attention_mask_' + suffix][start:end] if 'attention_mask_' + suffix in inputs else None
+        )
+
+    def _grad_cache_backward(
+        self,
+        inputs,
+        grad_cache_chunk_size,
+        gradient_accumulation_steps=1,
+        **kwargs
+    ):
+        """
+        梯度缓存：先不保存计算图分块计算整个batch的句向量，基于完整batch计算对比损失和句向量的梯度，
+        再逐块重新前向（恢复dropout的随机状态），用缓存的句向量梯度反向传播到模型参数
+
+        Reference:
+            [1] Scaling Deep Contrastive Learning Batch Size under Memory Limited Setup
+        """  # noqa: ignore flake8"
+
+        batch_size = inputs['input_ids_a'].size(0)
+        chunks = [(start_, min(start_ + grad_cache_chunk_size, batch_size))
+                  for start_ in range(0, batch_size, grad_cache_chunk_size)]
+
+        # 第一次前向：不保存计算图，记录每块的随机状态以便重放时得到相同的dropout
+        rng_states = {}
+        embeddings = {}
+        with torch.no_grad():
+            for suffix in ('a', 'b'):
+                rng_states[suffix] = []
+                embeddings[suffix] = []
+                for start_, end_ in chunks:
+                    rng_states[suffix].append(self._get_rng_state())
+                    embeddings[suffix].append(self._get_chunk_pooled_embedding(inputs, suffix, start_, end_))
+
+        embedding_a = torch.cat(embeddings['a']).requires_grad_()
+        embedding_b = torch.cat(embeddings['b']).requires_grad_()
+
+        logits, loss = self.module.contrastive_loss(embedding_a, embedding_b)
+
+        # 如果使用了梯度累积，除以累积的轮数
+        if gradient_accumulation_steps > 1:
+            loss = loss / gradient_accumulation_steps
+
+        loss.backward()
+
+        self._on_backward_record(loss, **kwargs)
+
+        # 第二次前向：逐块重建计算图，使用缓存的句向量梯度反向传播
+        rng_state = self._get_rng_state()
+        for suffix, embedding in (('a', embedding_a), ('b', embedding_b)):
+            for (start_, end_), chunk_rng_state in zip(chunks, rng_states[suffix]):
+                self._set_rng_state(chunk_rng_state)
+                chunk_embedding = self._get_chunk_pooled_embedding(inputs, suffix, start_, end_)
+                chunk_embedding.backward(embedding.grad[start_:end_])
+        self._set_rng_state(rng_state)
+
+        return logits.detach(), loss.detach()
+
     def _on_evaluate_begin_record(self, **kwargs):
 
         self.evaluate_logs['eval_loss'] = 0
@@ -12,6 +12,8 @@ from ark_nlp.nn.biaffine_bert import BiaffineBert
 from ark_nlp.nn.span_bert import SpanBert
 from ark_nlp.nn.global_pointer_bert import GlobalPointerBert
 from ark_nlp.nn.crf_bert import CrfBert
+from ark_nlp.nn.early_exit_bert import EarlyExitBert
+from ark_nlp.nn.chunk_pooling_bert import ChunkPoolingBert
 
 from transformers import BertConfig
 from ark_nlp.nn.configuration import ErnieConfig
@@ -105,14 +105,69 @@ class Bert(BertPreTrainedModel):
         else:
             return encoder_output[-1][:, 0, :]
 
+    def get_packed_encoder_feature(
+        self,
+        encoder_output,
+        segment_index,
+        pack_index,
+        cls_index,
+        pooling=None
+    ):
+        """
+        从打包的序列中取出每个样本自身的池化特征
+
+        Args:
+            encoder_output: BertModel的输出
+            segment_index (:obj:`torch.LongTensor`): (batch_size, seq_len)的每个token所属样本在行内的序号，0为填充
+            pack_index (:obj:`torch.LongTensor`): (样本数,)的每个样本所在行在batch中的位置
+            cls_index (:obj:`torch.LongTensor`): (样本数,)的每个样本[CLS]在行内的位置
+            pooling (:obj:`str` or :obj:`None`, optional, defaults to None): 池化方式，默认使用初始化时的设置
+
+        Returns:
+            torch.Tensor: (样本数, hidden_size)
+        """  # noqa: ignore flake8"
+
+        if pooling is None:
+            pooling = self.pooling
+
+        hidden_states = encoder_output.hidden_states
+
+        if pooling in ('cls', 'cls_with_pooler'):
+            cls_feature = hidden_states[-1][pack_index, cls_index]
+            if pooling == 'cls_with_pooler':
+                cls_feature = self.bert.pooler(cls_feature.unsqueeze(1))
+            return cls_feature
+
+        if pooling == 'first_last_avg':
+            sequence_feature = hidden_states[-1] + hidden_states[1]
+        elif pooling == 'last_avg':
+            sequence_feature = hidden_states[-1]
+        elif pooling == 'last_2_avg':
+            sequence_feature = hidden_states[-1] + hidden_states[-2]
+        else:
+            raise Exception("unknown pooling {}".format(pooling))
+
+        segment_index = segment_index[pack_index]
+        sample_mask = segment_index == segment_index.gather(1, cls_index.unsqueeze(-1))
+
+        return self.mask_pooling(sequence_feature[pack_index], sample_mask.to(sequence_feature.dtype))
+
     def forward(
         self,
         input_ids=None,
         attention_mask=None,
         token_type_ids=None,
         position_ids=None,
+        pack_index=None,
+        cls_index=None,
         **kwargs
     ):
+        # 打包输入的attention_mask为每个token所属样本的序号，只允许同一样本内的token相互注意
+        if pack_index is not None:
+            segment_index = attention_mask
+            attention_mask = (segment_index.unsqueeze(1) == segment_index.unsqueeze(2)) & (segment_index > 0).unsqueeze(1)
+            attention_mask = attention_mask.long()
+
         outputs = self.bert(
             input_ids,
             attention_mask=attention_mask,
@@ -122,7 +177,10 @@ class Bert(BertPreTrainedModel):
             output_hidden_states=True
         )
 
-        encoder_feature = self.get_encoder_feature(outputs, attention_mask)
+        if pack_index is not None:
+            encoder_feature = self.get_packed_encoder_feature(outputs, segment_index, pack_index, cls_index)
+        else:
+            encoder_feature = self.get_encoder_feature(outputs, attention_mask)
 
         encoder_feature = self.dropout(encoder_feature)
         out = self.classifier(encoder_feature)
@@ -38,6 +38,11 @@ class BiaffineBert(BertForTokenClassification):
             lstm的dropout rate
         select_bert_layer (:obj:`int`, optional, defaults to -1): 
             获取哪一层的bert embedding
+        biaffine_rank (:obj:`int` or :obj:`None`, optional, defaults to None):
+            biaffine低秩分解的秩，默认为None，即不分解
+        max_span_width (:obj:`int` or :obj:`None`, optional, defaults to None):
+            span的最大长度，默认为None，即计算全部(L, L)的span，
+            设置后只计算长度不超过max_span_width的span，输出(batch_size, L, W, 标签数)的宽度受限格式
 
     Reference:
         [1] Named Entity Recognition as Dependency Parsing
@@ -50,7 +55,9 @@ class BiaffineBert(BertForTokenClassification):
         encoder_trained=True,
         biaffine_size=128,
         lstm_dropout=0.4,
-        select_bert_layer=-1
+        select_bert_layer=-1,
+        biaffine_rank=None,
+        max_span_width=None
     ):
         super(BiaffineBert, self).__init__(config)
 
@@ -85,7 +92,13 @@ class BiaffineBert(BertForTokenClassification):
             torch.nn.ReLU()
         )
 
-        self.biaffne = Biaffine(biaffine_size, self.num_labels)
+        self.max_span_width = max_span_width
+        self.biaffne = Biaffine(
+            biaffine_size,
+            self.num_labels,
+            rank=biaffine_rank,
+            max_span_width=max_span_width
+        )
 
         self.reset_params()
 
@@ -0,0 +1,136 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import torch
+
+from torch import nn
+from ark_nlp.nn.base.bert import Bert
+
+
+class ChunkPoolingBert(Bert):
+    """
+    长文本分类的BERT模型，文本切分成的多个片段在同一个batch中一次编码，
+    再将同一文本所有片段的特征池化成文本特征进行分类，计算量随文本长度线性增长
+
+    Args:
+        config:
+            模型的配置对象
+        encoder_trained (:obj:`bool`, optional, defaults to True):
+            bert参数是否可训练，默认可训练
+        pooling (:obj:`str`, optional, defaults to "cls_with_pooler"):
+            每个片段的池化方式，默认为"cls_with_pooler"，
+            可选有["cls", "cls_with_pooler", "first_last_avg", "last_avg", "last_2_avg"]
+        chunk_pooling (:obj:`str`, optional, defaults to "mean"):
+            同一文本的片段特征的池化方式，默认为"mean"，可选有["mean", "max", "attention"]
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        config,
+        encoder_trained=True,
+        pooling='cls_with_pooler',
+        chunk_pooling='mean'
+    ):
+        super(ChunkPoolingBert, self).__init__(config, encoder_trained, pooling)
+
+        if chunk_pooling not in ('mean', 'max', 'attention'):
+            raise ValueError("The chunk pooling does not exist")
+
+        self.chunk_pooling = chunk_pooling
+
+        if self.chunk_pooling == 'attention':
+            self.chunk_attention = nn.Linear(config.hidden_size, 1)
+
+        self.init_weights()
+
+    def pool_chunks(self, chunk_feature, chunk_index):
+        """
+        将片段特征按所属文本池化
+
+        Args:
+            chunk_feature (:obj:`torch.Tensor`): (片段数, hidden_size)的片段特征
+            chunk_index (:obj:`torch.LongTensor`): (片段数,)的每个片段所属文本在batch中的位置
+
+        Returns:
+            torch.Tensor: (batch_size, hidden_size)
+        """  # noqa: ignore flake8"
+
+        batch_size = int(chunk_index.max()) + 1
+
+        if self.chunk_pooling == 'mean':
+            norm = chunk_feature.new_zeros(batch_size).index_add(
+                0,
+                chunk_index,
+                chunk_feature.new_ones(chunk_index.size(0))
+            )
+            pooled = chunk_feature.new_zeros(batch_size, chunk_feature.size(-1)).index_add(0, chunk_index, chunk_feature)
+            return pooled / norm.unsqueeze(-1)
+
+        # 片段在所属文本中的序号，用于将片段特征排列成(batch_size, 最大片段数, hidden_size)
+        is_document = chunk_index.unsqueeze(-1) == torch.arange(batch_size, device=chunk_index.device)
+        chunk_position = (is_document.long().cumsum(0) - 1).gather(1, chunk_index.unsqueeze(-1)).squeeze(-1)
+        max_chunk_num = int(chunk_position.max()) + 1
+
+        chunk_mask = chunk_feature.new_zeros(batch_size, max_chunk_num, dtype=torch.bool)
+        chunk_mask[chunk_index, chunk_position] = True
+
+        if self.chunk_pooling == 'max':
+            padded_feature = chunk_feature.new_full(
+                (batch_size, max_chunk_num, chunk_feature.size(-1)),
+                float('-inf')
+            )
+            padded_feature[chunk_index, chunk_position] = chunk_feature
+            return padded_feature.max(1)[0]
+
+        padded_feature = chunk_feature.new_zeros(batch_size, max_chunk_num, chunk_feature.size(-1))
+        padded_feature[chunk_index, chunk_position] = chunk_feature
+
+        score = self.chunk_attention(padded_feature).squeeze(-1)
+        score = score.masked_fill(~chunk_mask, float('-inf'))
+        weight = torch.softmax(score, dim=-1)
+
+        return (padded_feature * weight.unsqueeze(-1)).sum(1)
+
+    def forward(
+        self,
+        input_ids=None,
+        attention_mask=None,
+        token_type_ids=None,
+        position_ids=None,
+        chunk_index=None,
+        **kwargs
+    ):
+        outputs = self.bert(
+            input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+            position_ids=position_ids,
+            return_dict=True,
+            output_hidden_states=True
+        )
+
+        encoder_feature = self.get_encoder_feature(outputs, attention_mask)
+
+        # 没有chunk_index时每个片段视为一个独立文本
+        if chunk_index is not None:
+            encoder_feature = self.pool_chunks(encoder_feature, chunk_index)
+
+        encoder_feature = self.dropout(encoder_feature)
+        out = self.classifier(encoder_feature)
+
+        return out
@@ -52,6 +52,15 @@ class NeZhaConfig(PretrainedConfig):
                 The epsilon used by the layer normalization layers.
             classifier_dropout_prob (:obj:`float`, optional, defaults to 0.1):
                 The dropout ratio for attached classifiers.
+            attention_backend (:obj:`str`, optional, defaults to "eager"):
+                The implementation of self-attention. "eager" is the original implementation, "fused_qkv" uses a
+                fused QKV projection and folds the relative position key term into an additive bias. The relative
+                position value term needs the attention probabilities, so NeZha cannot use
+                `torch.nn.functional.scaled_dot_product_attention`; "sdpa" is accepted as an alias of "fused_qkv".
+            unpad_input (:obj:`bool`, optional, defaults to False):
+                Whether to drop the padding tokens inside the encoder. Projections, FFN and LayerNorm then run on the
+                (total_tokens, hidden_size) non-pad tokens only, and the padded layout is restored just around the
+                attention computation. The hidden states of padding tokens are returned as zeros.
 
         Example::
 
@@ -103,6 +112,8 @@ class NeZhaConfig(PretrainedConfig):
         pad_token_id=0,
         bos_token_id=2,
         eos_token_id=3,
+        attention_backend="eager",
+        unpad_input=False,
         **kwargs
     ):
         super().__init__(pad_token_id=pad_token_id, bos_token_id=bos_token_id, eos_token_id=eos_token_id, **kwargs)
@@ -125,3 +136,5 @@ class NeZhaConfig(PretrainedConfig):
         self.layer_norm_eps = layer_norm_eps
         self.use_relative_position = use_relative_position
         self.classifier_dropout_prob = classifier_dropout_prob
+        self.attention_backend = attention_backend
+        self.unpad_input = unpad_input
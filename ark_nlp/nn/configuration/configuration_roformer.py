@@ -52,6 +52,13 @@ class RoFormerConfig(PretrainedConfig):
                 The epsilon used by the layer normalization layers.
             classifier_dropout_prob (:obj:`float`, optional, defaults to 0.1):
                 The dropout ratio for attached classifiers.
+            attention_backend (:obj:`str`, optional, defaults to "eager"):
+                The implementation of self-attention. "eager" is the original implementation, "sdpa" uses a fused
+                QKV projection and `torch.nn.functional.scaled_dot_product_attention`.
+            unpad_input (:obj:`bool`, optional, defaults to False):
+                Whether to drop the padding tokens inside the encoder. Projections, FFN and LayerNorm then run on the
+                (total_tokens, hidden_size) non-pad tokens only, and the padded layout is restored just around the
+                attention computation. The hidden states of padding tokens are returned as zeros.
 
         Example::
 
@@ -95,6 +102,8 @@ class RoFormerConfig(PretrainedConfig):
                  initializer_range=0.02,
                  layer_norm_eps=1e-12,
                  pad_token_id=0,
+                 attention_backend="eager",
+                 unpad_input=False,
                  **kwargs):
         super().__init__(pad_token_id=pad_token_id, **kwargs)
 
@@ -113,3 +122,5 @@ class RoFormerConfig(PretrainedConfig):
         self.type_vocab_size = type_vocab_size
         self.initializer_range = initializer_range
         self.layer_norm_eps = layer_norm_eps
+        self.attention_backend = attention_backend
+        self.unpad_input = unpad_input
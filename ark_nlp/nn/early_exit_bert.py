@@ -0,0 +1,200 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import torch
+
+from torch import nn
+from ark_nlp.nn.base.bert import Bert
+
+
+class EarlyExitBert(Bert):
+    """
+    带有中间层退出分类头的BERT文本分类模型，推理时置信度足够高的样本可以提前退出，不再计算后续层
+
+    Args:
+        config:
+            模型的配置对象
+        encoder_trained (:obj:`bool`, optional, defaults to True):
+            bert参数是否可训练，默认可训练
+        pooling (:obj:`str`, optional, defaults to "cls_with_pooler"):
+            最后一层分类器使用的池化方式，默认为"cls_with_pooler"，
+            可选有["cls", "cls_with_pooler", "first_last_avg", "last_avg", "last_2_avg"]
+        exit_layers (:obj:`list` or :obj:`None`, optional, defaults to None):
+            设置退出分类头的层号(从1开始)，默认为None，即除最后一层外的每一层都设置退出分类头
+
+    Reference:
+        [1] DeeBERT: Dynamic Early Exiting for Accelerating BERT Inference
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        config,
+        encoder_trained=True,
+        pooling='cls_with_pooler',
+        exit_layers=None
+    ):
+        super(EarlyExitBert, self).__init__(config, encoder_trained, pooling)
+
+        if exit_layers is None:
+            exit_layers = list(range(1, config.num_hidden_layers))
+
+        self.exit_layers = sorted(
+            layer_ for layer_ in set(exit_layers) if 0 < layer_ < config.num_hidden_layers
+        )
+
+        if len(self.exit_layers) == 0:
+            raise ValueError("At least one exit layer is required")
+
+        self.exit_classifiers = nn.ModuleList([
+            nn.Linear(config.hidden_size, self.num_labels) for _ in self.exit_layers
+        ])
+
+        self.init_weights()
+
+    def get_exit_logits(self, hidden_states):
+        """
+        计算各个退出分类头的logits
+
+        Args:
+            hidden_states (:obj:`tuple`): BertModel输出的各层隐向量
+
+        Returns:
+            torch.Tensor: (退出分类头数, batch_size, num_labels)
+        """  # noqa: ignore flake8"
+
+        return torch.stack([
+            classifier_(self.dropout(hidden_states[layer_][:, 0, :]))
+            for layer_, classifier_ in zip(self.exit_layers, self.exit_classifiers)
+        ])
+
+    def forward(
+        self,
+        input_ids=None,
+        attention_mask=None,
+        token_type_ids=None,
+        position_ids=None,
+        return_exit_logits=False,
+        **kwargs
+    ):
+        outputs = self.bert(
+            input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+            position_ids=position_ids,
+            return_dict=True,
+            output_hidden_states=True
+        )
+
+        encoder_feature = self.get_encoder_feature(outputs, attention_mask)
+
+        encoder_feature = self.dropout(encoder_feature)
+        out = self.classifier(encoder_feature)
+
+        if return_exit_logits:
+            return out, self.get_exit_logits(outputs.hidden_states)
+
+        return out
+
+    def _final_classify(self, states, attention_mask):
+        if self.pooling == 'cls_with_pooler':
+            encoder_feature = self.bert.pooler(states['last'])
+        elif self.pooling == 'cls':
+            encoder_feature = states['last'][:, 0, :]
+        elif self.pooling == 'last_avg':
+            encoder_feature = self.mask_pooling(states['last'], attention_mask)
+        elif self.pooling == 'first_last_avg':
+            encoder_feature = self.mask_pooling(states['last'] + states['first'], attention_mask)
+        elif self.pooling == 'last_2_avg':
+            encoder_feature = self.mask_pooling(states['last'] + states['prev'], attention_mask)
+        else:
+            raise Exception("unknown pooling {}".format(self.pooling))
+
+        return self.classifier(self.dropout(encoder_feature))
+
+    def early_exit_forward(
+        self,
+        input_ids=None,
+        attention_mask=None,
+        token_type_ids=None,
+        threshold=0.9,
+        **kwargs
+    ):
+        """
+        逐层计算，每个退出分类头处置信度(最大类别概率)不低于threshold的样本直接输出结果并从batch中移除，
+        只有剩余样本继续计算后续层
+
+        Args:
+            input_ids (:obj:`torch.LongTensor`): 输入的id
+            attention_mask (:obj:`torch.LongTensor`): attention mask
+            token_type_ids (:obj:`torch.LongTensor`): token type ids
+            threshold (:obj:`float`, optional, defaults to 0.9): 退出的置信度阈值，大于1时不会提前退出
+
+        Returns:
+            tuple: (batch_size, num_labels)的logits和(batch_size,)的每个样本实际使用的层数
+        """  # noqa: ignore flake8"
+
+        batch_size = input_ids.size(0)
+        num_layers = len(self.bert.encoder.layer)
+
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+
+        hidden_states = self.bert.embeddings(input_ids=input_ids, token_type_ids=token_type_ids)
+        extended_attention_mask = self.bert.get_extended_attention_mask(attention_mask, input_ids.size())
+        extended_attention_mask = extended_attention_mask.to(hidden_states.dtype)
+
+        logits = hidden_states.new_zeros(batch_size, self.num_labels)
+        exit_layers = torch.full((batch_size,), num_layers, dtype=torch.long, device=input_ids.device)
+
+        # 尚未退出的样本在原batch中的位置
+        active_index = torch.arange(batch_size, device=input_ids.device)
+        exit_classifiers = dict(zip(self.exit_layers, self.exit_classifiers))
+
+        states = {}
+        for layer_idx_, layer_ in enumerate(self.bert.encoder.layer, 1):
+            hidden_states = layer_(hidden_states, attention_mask=extended_attention_mask)[0]
+
+            if layer_idx_ == 1:
+                states['first'] = hidden_states
+            if layer_idx_ == num_layers - 1:
+                states['prev'] = hidden_states
+
+            if layer_idx_ not in exit_classifiers:
+                continue
+
+            exit_logits = exit_classifiers[layer_idx_](self.dropout(hidden_states[:, 0, :]))
+            is_exit = torch.softmax(exit_logits, dim=-1).max(dim=-1).values >= threshold
+
+            if is_exit.any():
+                logits[active_index[is_exit]] = exit_logits[is_exit].to(logits.dtype)
+                exit_layers[active_index[is_exit]] = layer_idx_
+
+                is_active = ~is_exit
+                active_index = active_index[is_active]
+                hidden_states = hidden_states[is_active]
+                extended_attention_mask = extended_attention_mask[is_active]
+                attention_mask = attention_mask[is_active]
+                states = {key_: value_[is_active] for key_, value_ in states.items()}
+
+                if len(active_index) == 0:
+                    return logits, exit_layers
+
+        states['last'] = hidden_states
+        logits[active_index] = self._final_classify(states, attention_mask).to(logits.dtype)
+
+        return logits, exit_layers
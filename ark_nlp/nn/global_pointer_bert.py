@@ -32,6 +32,9 @@ class GlobalPointerBert(BertForTokenClassification):
             bert参数是否可训练，默认可训练
         head_size (:obj:`int`, optional, defaults to 64):
             GlobalPointer head个数
+        max_span_width (:obj:`int` or :obj:`None`, optional, defaults to None):
+            span的最大长度，默认为None，即计算全部(L, L)的span，
+            设置后只计算长度不超过max_span_width的span，输出(batch_size, 标签数, L, W)的宽度受限格式
 
     Reference:
         [1] https://www.kexue.fm/archives/8373
@@ -42,7 +45,8 @@ class GlobalPointerBert(BertForTokenClassification):
         self,
         config,
         encoder_trained=True,
-        head_size=64
+        head_size=64,
+        max_span_width=None
     ):
         super(GlobalPointerBert, self).__init__(config)
 
@@ -53,10 +57,12 @@ class GlobalPointerBert(BertForTokenClassification):
         for param in self.bert.parameters():
             param.requires_grad = encoder_trained
 
+        self.max_span_width = max_span_width
         self.global_pointer = GlobalPointer(
             self.num_labels,
             head_size,
-            config.hidden_size
+            config.hidden_size,
+            max_span_width=max_span_width
         )
 
         self.init_weights()
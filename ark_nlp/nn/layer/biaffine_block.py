@@ -21,14 +21,47 @@ from torch import nn
 
 
 class Biaffine(nn.Module):
-    def __init__(self, in_size, out_size, bias_x=True, bias_y=True):
+    """
+    Biaffine打分模块，输出每个(start, end)的各类别得分
+
+    Args:
+        in_size (:obj:`int`): 输入的维度
+        out_size (:obj:`int`): 类别数
+        bias_x (:obj:`bool`, optional, defaults to True): start表示是否拼接偏置项
+        bias_y (:obj:`bool`, optional, defaults to True): end表示是否拼接偏置项
+        rank (:obj:`int` or :obj:`None`, optional, defaults to None):
+            低秩分解的秩，默认为None，即使用完整的(in_size+1, out_size, in_size+1)参数U，
+            设置后U分解为三个因子矩阵，参数量和计算量与类别数的乘积从in_size^2降为rank
+        max_span_width (:obj:`int` or :obj:`None`, optional, defaults to None):
+            span的最大长度W，默认为None，即输出(batch_size, L, L, out_size)，
+            设置后只计算长度不超过W的span，输出(batch_size, L, W, out_size)，第w列对应span(i, i+w)
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        in_size,
+        out_size,
+        bias_x=True,
+        bias_y=True,
+        rank=None,
+        max_span_width=None
+    ):
         super().__init__()
         self.bias_x = bias_x
         self.bias_y = bias_y
         self.out_size = out_size
-        self.U = torch.nn.Parameter(
-            torch.randn(in_size + int(bias_x), out_size, in_size + int(bias_y))
-        )
+        self.rank = rank
+        self.max_span_width = max_span_width
+
+        if self.rank is None:
+            self.U = torch.nn.Parameter(
+                torch.randn(in_size + int(bias_x), out_size, in_size + int(bias_y))
+            )
+        else:
+            # U[i, o, j] = sum_r U_x[i, r] * U_o[o, r] * U_y[j, r]
+            self.U_x = torch.nn.Parameter(torch.randn(in_size + int(bias_x), rank) / rank ** 0.5)
+            self.U_o = torch.nn.Parameter(torch.randn(out_size, rank))
+            self.U_y = torch.nn.Parameter(torch.randn(in_size + int(bias_y), rank) / rank ** 0.5)
 
     def forward(self, x, y):
         if self.bias_x:
@@ -36,6 +69,14 @@ class Biaffine(nn.Module):
         if self.bias_y:
             y = torch.cat((y, torch.ones_like(y[..., :1])), dim=-1)
 
+        if self.max_span_width is not None:
+            return self._band_forward(x, y)
+
+        if self.rank is not None:
+            x = torch.matmul(x, self.U_x)
+            y = torch.matmul(y, self.U_y)
+            return torch.einsum('bxr,or,byr->bxyo', x, self.U_o, y)
+
         # batch_size,seq_len,hidden=x.shape
         # bilinar_mapping=torch.matmul(x,self.U)
         # bilinar_mapping=bilinar_mapping.view(size=(batch_size,seq_len*self.out_size,hidden))
@@ -46,3 +87,30 @@ class Biaffine(nn.Module):
 
         bilinar_mapping = torch.einsum('bxi,ioj,byj->bxyo', x, self.U, y)
         return bilinar_mapping
+
+    def _band_forward(self, x, y):
+        batch_size, seq_len = x.shape[:2]
+
+        if self.rank is not None:
+            x = torch.matmul(x, self.U_x)
+            y = torch.matmul(y, self.U_y)
+        else:
+            x = torch.einsum('bxi,ioj->bxoj', x, self.U)
+
+        bilinar_mapping = x.new_zeros(batch_size, seq_len, self.max_span_width, self.out_size)
+
+        # 逐个宽度计算span(i, i+w)的得分，超出序列长度的位置保持为0
+        for width_ in range(min(self.max_span_width, seq_len)):
+            if self.rank is not None:
+                bilinar_mapping[:, :seq_len - width_, width_] = torch.matmul(
+                    x[:, :seq_len - width_] * y[:, width_:],
+                    self.U_o.t()
+                )
+            else:
+                bilinar_mapping[:, :seq_len - width_, width_] = torch.einsum(
+                    'bxoj,bxj->bxo',
+                    x[:, :seq_len - width_],
+                    y[:, width_:]
+                )
+
+        return bilinar_mapping
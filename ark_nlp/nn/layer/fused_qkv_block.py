@@ -0,0 +1,62 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import torch
+
+from torch import nn
+
+
+def fused_qkv_projection(attention, hidden_states):
+    """
+    将self-attention的query、key、value三个线性层合并成一次矩阵乘法，
+    保留独立的参数以兼容预训练权重和剪枝
+
+    不需要计算梯度时，拼接后的参数缓存在attention模块上，只在参数被修改(load_state_dict、优化器更新、移动设备)后重新拼接；
+    需要计算梯度时每次重新拼接，使梯度能回传到原有的参数
+
+    Args:
+        attention (:obj:`torch.nn.Module`): 含有query、key、value线性层的self-attention模块
+        hidden_states (:obj:`torch.Tensor`): 输入特征
+
+    Returns:
+        torch.Tensor: 在最后一维拼接的query、key、value投影结果
+    """  # noqa: ignore flake8"
+
+    linears = (attention.query, attention.key, attention.value)
+
+    # 量化后的线性层没有可拼接的weight，退回到分别投影
+    if not all(isinstance(linear_, nn.Linear) for linear_ in linears):
+        return torch.cat([linear_(hidden_states) for linear_ in linears], dim=-1)
+
+    parameters = [linear_.weight for linear_ in linears] + [linear_.bias for linear_ in linears]
+
+    if torch.is_grad_enabled() and any(parameter_.requires_grad for parameter_ in parameters):
+        weight = torch.cat(parameters[:3], dim=0)
+        bias = torch.cat(parameters[3:], dim=0)
+        return nn.functional.linear(hidden_states, weight, bias)
+
+    # 参数的存储地址和版本号在原地修改或移动设备后都会变化，作为缓存是否失效的依据
+    version = tuple((parameter_.data_ptr(), parameter_._version) for parameter_ in parameters)
+
+    cache = getattr(attention, '_fused_qkv_cache', None)
+    if cache is None or cache[0] != version:
+        with torch.no_grad():
+            cache = (version, torch.cat(parameters[:3], dim=0), torch.cat(parameters[3:], dim=0))
+        attention._fused_qkv_cache = cache
+
+    return nn.functional.linear(hidden_states, cache[1], cache[2])
@@ -50,16 +50,118 @@ def add_mask_tril(logits, mask):
     return logits
 
 
+def get_span_end_index(seq_len, max_span_width, device=None):
+    """
+    宽度受限格式中每个位置对应的span结束位置，第i行第w列为以i开始、长度为w+1的span的结束位置i+w
+
+    Args:
+        seq_len (:obj:`int`): 序列长度
+        max_span_width (:obj:`int`): span的最大长度
+        device (:obj:`torch.device` or :obj:`None`, optional, defaults to None): 设备
+    """  # noqa: ignore flake8"
+    start = torch.arange(seq_len, device=device)[:, None]
+    width = torch.arange(max_span_width, device=device)[None, :]
+    return start + width
+
+
+def pack_span_width(x, max_span_width, value=0):
+    """
+    将(..., L, L)的span得分或标签转换为(..., L, W)的宽度受限格式，超出序列长度的位置填充value，
+    长度大于max_span_width的span被丢弃
+
+    Args:
+        x (:obj:`torch.Tensor`): (..., L, L)的稠密或稀疏张量
+        max_span_width (:obj:`int`): span的最大长度W
+        value (:obj:`float`, optional, defaults to 0): 无效位置的填充值
+    """  # noqa: ignore flake8"
+    seq_len = x.shape[-1]
+
+    if x.is_sparse:
+        # 稀疏标签直接变换坐标，避免先还原成(..., L, L)的稠密张量
+        x = x.coalesce()
+        indices = x.indices()
+        width = indices[-1] - indices[-2]
+        is_kept = (width >= 0) & (width < max_span_width)
+        indices = torch.cat([indices[:-1, is_kept], width[None, is_kept]], dim=0)
+        packed = torch.sparse_coo_tensor(
+            indices,
+            x.values()[is_kept],
+            x.shape[:-1] + (max_span_width,)
+        ).to_dense()
+        if value != 0:
+            is_valid = get_span_end_index(seq_len, max_span_width, x.device) < seq_len
+            packed = packed.masked_fill(~is_valid, value)
+        return packed
+
+    end_index = get_span_end_index(seq_len, max_span_width, x.device)
+    is_valid = end_index < seq_len
+    end_index = end_index.clamp(max=seq_len - 1).expand(x.shape[:-2] + end_index.shape)
+
+    return x.gather(-1, end_index).masked_fill(~is_valid, value)
+
+
+def add_mask_band(logits, mask):
+    """
+    对(..., L, W)的宽度受限格式的得分排除padding和超出序列长度的span
+
+    Args:
+        logits (:obj:`torch.Tensor`): (batch_size, heads, L, W)的得分
+        mask (:obj:`torch.Tensor`): (batch_size, L)的attention mask
+    """  # noqa: ignore flake8"
+    seq_len, max_span_width = logits.shape[-2:]
+
+    if mask is None:
+        mask = logits.new_ones(logits.shape[0], seq_len)
+    mask = mask.type(logits.dtype)
+
+    # 结束位置的mask，超出序列长度的位置补0
+    end_mask = nn.functional.pad(mask, (0, max_span_width - 1)).unfold(1, max_span_width, 1)
+    band_mask = (mask[:, :, None] * end_mask)[:, None]
+
+    return logits * band_mask - 1e12 * (1 - band_mask)
+
+
+def band_einsum(qw, kw, max_span_width):
+    """
+    只计算结束位置与开始位置之差小于max_span_width的内积，结果为(batch_size, heads, L, W)
+
+    Args:
+        qw (:obj:`torch.Tensor`): (batch_size, L, heads, head_size)或(batch_size, L, head_size)
+        kw (:obj:`torch.Tensor`): 与qw形状相同
+        max_span_width (:obj:`int`): span的最大长度W
+    """  # noqa: ignore flake8"
+    if qw.ndim == 3:
+        qw = qw[:, :, None]
+        kw = kw[:, :, None]
+
+    batch_size, seq_len, heads = qw.shape[:3]
+    logits = qw.new_zeros(batch_size, heads, seq_len, max_span_width)
+
+    # 逐个宽度计算对角线上的内积，计算量和显存均为O(L*W)
+    for width_ in range(min(max_span_width, seq_len)):
+        logits[..., :seq_len - width_, width_] = torch.einsum(
+            'bmhd , bmhd -> bhm',
+            qw[:, :seq_len - width_],
+            kw[:, width_:]
+        )
+
+    return logits
+
+
 class GlobalPointer(Module):
     """全局指针模块
     将序列的每个(start, end)作为整体来进行判断
     """
-    def __init__(self, heads, head_size, hidden_size, RoPE=True):
+    def __init__(self, heads, head_size, hidden_size, RoPE=True, max_span_width=None):
         super(GlobalPointer, self).__init__()
         self.heads = heads
         self.head_size = head_size
         self.RoPE = RoPE
+        # 设置后只计算长度不超过max_span_width的span，输出(batch_size, heads, L, W)的宽度受限格式
+        self.max_span_width = max_span_width
         self.dense = nn.Linear(hidden_size, self.head_size * self.heads * 2)
+        if self.RoPE:
+            self.position_embedding = SinusoidalPositionEmbedding(self.head_size, 'zero')
 
 #     def reset_params(self):
 #         nn.init.xavier_uniform_(self.dense.weight)
@@ -74,7 +176,7 @@ class GlobalPointer(Module):
         # 分出qw和kw
         # RoPE编码
         if self.RoPE:
-            pos = SinusoidalPositionEmbedding(self.head_size, 'zero')(inputs)
+            pos = self.position_embedding(inputs)
             cos_pos = pos[..., None, 1::2].repeat(1, 1, 1, 2)
             sin_pos = pos[..., None, ::2].repeat(1, 1, 1, 2)
             qw2 = torch.stack([-qw[..., 1::2], qw[..., ::2]], 4)
@@ -83,6 +185,11 @@ class GlobalPointer(Module):
             kw2 = torch.stack([-kw[..., 1::2], kw[..., ::2]], 4)
             kw2 = torch.reshape(kw2, kw.shape)
             kw = kw * cos_pos + kw2 * sin_pos
+        if self.max_span_width is not None:
+            logits = band_einsum(qw, kw, self.max_span_width)
+            logits = add_mask_band(logits, mask)
+            return logits / self.head_size ** 0.5
+
         # 计算内积
         logits = torch.einsum('bmhd , bnhd -> bhmn', qw, kw)
         # 排除padding 排除下三角
@@ -96,13 +203,17 @@ class EfficientGlobalPointer(Module):
     """全局指针模块
     将序列的每个(start, end)作为整体来进行判断
     """
-    def __init__(self, heads, head_size, hidden_size, RoPE=True):
+    def __init__(self, heads, head_size, hidden_size, RoPE=True, max_span_width=None):
         super(EfficientGlobalPointer, self).__init__()
         self.heads = heads
         self.head_size = head_size
         self.RoPE = RoPE
+        # 设置后只计算长度不超过max_span_width的span，输出(batch_size, heads, L, W)的宽度受限格式
+        self.max_span_width = max_span_width
         self.dense_1 = nn.Linear(hidden_size, self.head_size * 2)
         self.dense_2 = nn.Linear(self.head_size * 2, self.heads * 2)
+        if self.RoPE:
+            self.position_embedding = SinusoidalPositionEmbedding(self.head_size, 'zero')
 
     def forward(self, inputs, mask=None):
         inputs = self.dense_1(inputs)  # batch,
@@ -111,7 +222,7 @@ class EfficientGlobalPointer(Module):
         # 分出qw和kw
         # RoPE编码
         if self.RoPE:
-            pos = SinusoidalPositionEmbedding(self.head_size, 'zero')(inputs)
+            pos = self.position_embedding(inputs)
             cos_pos = pos[..., 1::2].repeat(1, 1, 2)
             sin_pos = pos[..., ::2].repeat(1, 1, 2)
             qw2 = torch.stack([-qw[..., 1::2], qw[..., ::2]], 3)
@@ -120,6 +231,16 @@ class EfficientGlobalPointer(Module):
             kw2 = torch.stack([-kw[..., 1::2], kw[..., ::2]], 3)
             kw2 = torch.reshape(kw2, kw.shape)
             kw = kw * cos_pos + kw2 * sin_pos
+        if self.max_span_width is not None:
+            logits = band_einsum(qw, kw, self.max_span_width) / self.head_size ** 0.5
+            bias = torch.einsum('bnh -> bhn', self.dense_2(inputs)) / 2
+            end_bias = nn.functional.pad(
+                bias[:, :self.heads],
+                (0, self.max_span_width - 1)
+            ).unfold(-1, self.max_span_width, 1)
+            logits = logits + end_bias + bias[:, self.heads:, :, None]
+            return add_mask_band(logits, mask)
+
         # 计算内积
         logits = torch.einsum('bmd , bnd -> bmn', qw, kw) / self.head_size ** 0.5
         bias = torch.einsum('bnh -> bhn', self.dense_2(inputs)) / 2
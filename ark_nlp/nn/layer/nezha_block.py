@@ -25,6 +25,9 @@ import torch
 from torch import nn
 
 from ark_nlp.nn.configuration.configuration_nezha import NeZhaConfig
+from ark_nlp.nn.layer.fused_qkv_block import fused_qkv_projection
+from ark_nlp.nn.layer.position_embedding_block import get_cached_position_table
+from ark_nlp.nn.layer.unpad_block import get_unpad_indices, unpad_input, pad_input
 from transformers.modeling_utils import PreTrainedModel, prune_linear_layer
 try:
     from transformers.modeling_bert import (
@@ -211,15 +214,106 @@ class NeZhaSelfAttention(nn.Module):
         self.value = nn.Linear(config.hidden_size, self.all_head_size)
         self.dropout = nn.Dropout(config.attention_probs_dropout_prob)
 
-        self.relative_positions_encoding = relative_position_encoding(max_length=config.max_position_embeddings,
-                                                                     depth=self.attention_head_size,
-                                                                     max_relative_position=config.max_relative_position)
+        self.max_position_embeddings = config.max_position_embeddings
+        self.max_relative_position = config.max_relative_position
+        # 相对位置编码表作为非持久化的buffer，首次使用时从共享缓存中获取，各层共用同一份
+        self.register_buffer('relative_positions_encoding', None, persistent=False)
+
+        # "eager"为原始实现，"fused_qkv"使用融合的QKV投影并将相对位置的key项作为加性偏置，
+        # 相对位置的value项需要用到注意力概率，无法使用scaled_dot_product_attention，"sdpa"仅作为"fused_qkv"的别名保留
+        self.attention_backend = getattr(config, 'attention_backend', 'eager')
+        if self.attention_backend == 'sdpa':
+            self.attention_backend = 'fused_qkv'
+
+    def get_relative_positions_encoding(self, seq_length, device, dtype):
+        table = self.relative_positions_encoding
+        if table is None or table.device != device or table.dtype != dtype:
+            table = get_cached_position_table(
+                'relative_{}'.format(self.max_relative_position),
+                self.max_position_embeddings,
+                self.attention_head_size,
+                device,
+                dtype,
+                lambda length_, dim_, device_: relative_position_encoding(
+                    depth=dim_,
+                    max_length=length_,
+                    max_relative_position=self.max_relative_position
+                ).to(device_)
+            )
+            self.relative_positions_encoding = table
+
+        return table[:seq_length, :seq_length, :]
 
     def transpose_for_scores(self, x):
         new_x_shape = x.size()[:-1] + (self.num_attention_heads, self.attention_head_size)
         x = x.view(*new_x_shape)
         return x.permute(0, 2, 1, 3)
 
+    def train(self, mode=True):
+        # 切换模式时释放推理时缓存的拼接参数
+        self._fused_qkv_cache = None
+        return super().train(mode)
+
+    def qkv_projection(self, hidden_states):
+        return fused_qkv_projection(self, hidden_states)
+
+    def split_qkv(self, mixed_layer):
+        batch_size, seq_length = mixed_layer.size()[:2]
+        mixed_layer = mixed_layer.view(batch_size, seq_length, 3, self.num_attention_heads, self.attention_head_size)
+
+        return mixed_layer.permute(2, 0, 3, 1, 4).unbind(0)
+
+    def fused_qkv(self, hidden_states):
+        return self.split_qkv(self.qkv_projection(hidden_states))
+
+    def fused_forward(self, hidden_states, attention_mask=None):
+        query_layer, key_layer, value_layer = self.fused_qkv(hidden_states)
+
+        return (self.attention_context(query_layer, key_layer, value_layer, attention_mask),)
+
+    def unpadded_forward(self, hidden_states, indices, batch_size, seq_length, attention_mask=None):
+        """
+        去除填充后的self-attention，QKV投影只计算非填充token，仅在注意力计算时还原成带填充的形状
+
+        Args:
+            hidden_states (:obj:`torch.Tensor`): (total_tokens, hidden_size)
+            indices (:obj:`torch.LongTensor`): 非填充token在展平的(batch_size * seq_len)中的位置
+            batch_size (:obj:`int`): batch大小
+            seq_length (:obj:`int`): 序列长度
+            attention_mask (:obj:`torch.Tensor`, optional, defaults to None): 扩展后的attention mask
+        """  # noqa: ignore flake8"
+
+        mixed_layer = pad_input(self.qkv_projection(hidden_states), indices, batch_size, seq_length)
+        query_layer, key_layer, value_layer = self.split_qkv(mixed_layer)
+
+        context_layer = self.attention_context(query_layer, key_layer, value_layer, attention_mask)
+
+        return (unpad_input(context_layer, indices),)
+
+    def attention_context(self, query_layer, key_layer, value_layer, attention_mask=None):
+        batch_size, _, seq_length, _ = query_layer.size()
+        relations_keys = self.get_relative_positions_encoding(seq_length, query_layer.device, query_layer.dtype)
+
+        # 相对位置的key项折叠为加性偏置，避免原实现中的转置和拷贝
+        attention_bias = torch.einsum('bhid,ijd->bhij', query_layer, relations_keys)
+        attention_scores = torch.baddbmm(
+            attention_bias.flatten(0, 1),
+            query_layer.flatten(0, 1),
+            key_layer.flatten(0, 1).transpose(-1, -2)
+        ).view_as(attention_bias)
+
+        attention_scores = attention_scores / math.sqrt(self.attention_head_size)
+        if attention_mask is not None:
+            attention_scores = attention_scores + attention_mask
+
+        # 相对位置的value项需要用到注意力概率，因此softmax无法交给scaled_dot_product_attention的融合kernel
+        attention_probs = self.dropout(attention_scores.softmax(dim=-1))
+
+        context_layer = torch.matmul(attention_probs, value_layer)
+        context_layer = context_layer + torch.einsum('bhij,ijd->bhid', attention_probs, relations_keys)
+
+        return context_layer.transpose(1, 2).reshape(batch_size, seq_length, self.all_head_size)
+
     def forward(
             self,
             hidden_states,
@@ -228,6 +322,14 @@ class NeZhaSelfAttention(nn.Module):
             encoder_hidden_states=None,
             encoder_attention_mask=None,
     ):
+        if (
+            self.attention_backend == 'fused_qkv'
+            and head_mask is None
+            and encoder_hidden_states is None
+            and not self.output_attentions
+        ):
+            return self.fused_forward(hidden_states, attention_mask)
+
         mixed_query_layer = self.query(hidden_states)
 
         # If this is instantiated as a cross-attention module, the keys
@@ -250,7 +352,7 @@ class NeZhaSelfAttention(nn.Module):
 
         batch_size, num_attention_heads, from_seq_length, to_seq_length = attention_scores.size()
 
-        relations_keys = self.relative_positions_encoding[:to_seq_length, :to_seq_length, :].to(hidden_states.device)
+        relations_keys = self.get_relative_positions_encoding(to_seq_length, hidden_states.device, query_layer.dtype)
         query_layer_t = query_layer.permute(2, 0, 1, 3)
 
         query_layer_r = query_layer_t.contiguous().view(from_seq_length, batch_size * num_attention_heads,
@@ -279,7 +381,7 @@ class NeZhaSelfAttention(nn.Module):
 
         context_layer = torch.matmul(attention_probs, value_layer)
 
-        relations_values = self.relative_positions_encoding[:to_seq_length, :to_seq_length, :].to(hidden_states.device)
+        relations_values = relations_keys
         attention_probs_t = attention_probs.permute(2, 0, 1, 3)
         attentions_probs_r = attention_probs_t.contiguous().view(from_seq_length, batch_size * num_attention_heads,
                                                                  to_seq_length)
@@ -340,6 +442,11 @@ class NeZhaAttention(nn.Module):
         outputs = (attention_output,) + self_outputs[1:]  # add attentions if we output them
         return outputs
 
+    def unpadded_forward(self, hidden_states, indices, batch_size, seq_length, attention_mask=None):
+        self_outputs = self.self.unpadded_forward(hidden_states, indices, batch_size, seq_length, attention_mask)
+        attention_output = self.output(self_outputs[0], hidden_states)
+        return (attention_output,)
+
 
 class NeZhaLayer(nn.Module):
     def __init__(self, config):
@@ -375,14 +482,44 @@ class NeZhaLayer(nn.Module):
         outputs = (layer_output,) + outputs
         return outputs
 
+    def unpadded_forward(self, hidden_states, indices, batch_size, seq_length, attention_mask=None):
+        # 除注意力计算外，投影、FFN和LayerNorm均只作用于(total_tokens, hidden_size)的非填充token
+        attention_output = self.attention.unpadded_forward(
+            hidden_states, indices, batch_size, seq_length, attention_mask
+        )[0]
+        intermediate_output = self.intermediate(attention_output)
+        layer_output = self.output(intermediate_output, attention_output)
+        return (layer_output,)
+
 
 class NeZhaEncoder(nn.Module):
     def __init__(self, config):
         super().__init__()
         self.output_attentions = config.output_attentions
         self.output_hidden_states = config.output_hidden_states
+        self.unpad_input = getattr(config, 'unpad_input', False)
         self.layer = nn.ModuleList([NeZhaLayer(config) for _ in range(config.num_hidden_layers)])
 
+    def unpadded_forward(self, hidden_states, indices, attention_mask=None):
+        batch_size, seq_length = hidden_states.size()[:2]
+        hidden_states = unpad_input(hidden_states, indices)
+
+        all_hidden_states = ()
+        for layer_module in self.layer:
+            if self.output_hidden_states:
+                all_hidden_states = all_hidden_states + (pad_input(hidden_states, indices, batch_size, seq_length),)
+            hidden_states = layer_module.unpadded_forward(
+                hidden_states, indices, batch_size, seq_length, attention_mask
+            )[0]
+
+        # 填充位置的输出为0
+        hidden_states = pad_input(hidden_states, indices, batch_size, seq_length)
+
+        outputs = (hidden_states,)
+        if self.output_hidden_states:
+            outputs = outputs + (all_hidden_states + (hidden_states,),)
+        return outputs
+
     def forward(
             self,
             hidden_states,
@@ -391,6 +528,16 @@ class NeZhaEncoder(nn.Module):
             encoder_hidden_states=None,
             encoder_attention_mask=None,
     ):
+        if (
+            self.unpad_input
+            and encoder_hidden_states is None
+            and not self.output_attentions
+            and all(head_mask_ is None for head_mask_ in head_mask)
+        ):
+            indices = get_unpad_indices(attention_mask)
+            if indices is not None:
+                return self.unpadded_forward(hidden_states, indices, attention_mask)
+
         all_hidden_states = ()
         all_attentions = ()
         for i, layer_module in enumerate(self.layer):
@@ -21,6 +21,55 @@ import torch
 from torch.nn import Module
 
 
+# 位置编码表只与长度、维度、设备和数据类型有关，不同层和不同模块之间可以共享同一份，
+# 同一类型只保留最长的一张表，较短的序列直接截取前缀
+_position_table_cache = {}
+
+
+def get_cached_position_table(
+    name,
+    length,
+    dim,
+    device,
+    dtype,
+    build_fn
+):
+    """
+    从共享缓存中获取位置编码表，不存在或缓存的表长度不足时在目标设备上构建并替换原有的表，
+    返回的表长度可能大于length，需要调用方按实际长度截取
+
+    Args:
+        name (:obj:`string`): 位置编码的类型名，用于区分不同的位置编码
+        length (:obj:`int`): 序列长度
+        dim (:obj:`int`): 编码维度
+        device (:obj:`torch.device`): 设备
+        dtype (:obj:`torch.dtype`): 数据类型
+        build_fn (:obj:`callable`): 构建函数，输入(length, dim, device)，返回float32的位置编码表
+    """  # noqa: ignore flake8"
+
+    key = (name, dim, torch.device(device), dtype)
+
+    cached = _position_table_cache.get(key)
+    if cached is None or cached[0] < length:
+        with torch.no_grad():
+            table = build_fn(length, dim, device).to(dtype)
+        _position_table_cache[key] = (length, table)
+    else:
+        table = cached[1]
+
+    return table
+
+
+def build_sinusoidal_table(length, dim, device=None):
+    position_ids = torch.arange(length, dtype=torch.float32, device=device)[None]
+    indices = torch.arange(dim // 2, dtype=torch.float32, device=device)
+    indices = torch.pow(10000.0, -2 * indices / dim)
+    embeddings = torch.einsum('bn,d->bnd', position_ids, indices)
+    embeddings = torch.stack([torch.sin(embeddings), torch.cos(embeddings)], dim=-1)
+
+    return torch.flatten(embeddings, -2)
+
+
 class SinusoidalPositionEmbedding(Module):
     """定义Sin-Cos位置Embedding
     """
@@ -28,26 +77,46 @@ class SinusoidalPositionEmbedding(Module):
         self,
         output_dim,
         merge_mode='add',
-        custom_position_ids=False
+        custom_position_ids=False,
+        max_length=512
     ):
         super(SinusoidalPositionEmbedding, self).__init__()
         self.output_dim = output_dim
         self.merge_mode = merge_mode
         self.custom_position_ids = custom_position_ids
+        self.max_length = max_length
+
+        # 位置编码表作为非持久化的buffer，随模块移动设备且不写入state_dict
+        self.register_buffer('position_table', None, persistent=False)
+
+    def get_position_table(self, seq_len, device, dtype):
+        table = self.position_table
+        if table is None or table.size(1) < seq_len or table.device != device or table.dtype != dtype:
+            # 超过max_length时按2的幂向上取整，避免动态padding下每个新长度都构建一张表
+            length = self.max_length
+            if seq_len > length:
+                length = 1 << (seq_len - 1).bit_length()
+
+            table = get_cached_position_table(
+                'sinusoidal',
+                length,
+                self.output_dim,
+                device,
+                dtype,
+                build_sinusoidal_table
+            )
+            self.position_table = table
+
+        return table[:, :seq_len]
 
     def forward(self, inputs):
-        input_shape = inputs.shape
-        _, seq_len = input_shape[0], input_shape[1]
-        position_ids = torch.arange(seq_len).type(torch.float)[None]
-        indices = torch.arange(self.output_dim // 2).type(torch.float)
-        indices = torch.pow(10000.0, -2 * indices / self.output_dim)
-        embeddings = torch.einsum('bn,d->bnd', position_ids, indices)
-        embeddings = torch.stack([torch.sin(embeddings), torch.cos(embeddings)], dim=-1)
-        embeddings = torch.reshape(embeddings, (-1, seq_len, self.output_dim))
+        seq_len = inputs.shape[1]
+        dtype = inputs.dtype if inputs.is_floating_point() else torch.float32
+        embeddings = self.get_position_table(seq_len, inputs.device, dtype)
 
         if self.merge_mode == 'add':
-            return inputs + embeddings.to(inputs.device)
+            return inputs + embeddings
         elif self.merge_mode == 'mul':
-            return inputs * (embeddings + 1.0).to(inputs.device)
+            return inputs * (embeddings + 1.0)
         elif self.merge_mode == 'zero':
-            return embeddings.to(inputs.device)
+            return embeddings
@@ -24,6 +24,9 @@ import torch
 from torch import nn
 
 from ark_nlp.nn.configuration.configuration_roformer import RoFormerConfig
+from ark_nlp.nn.layer.fused_qkv_block import fused_qkv_projection
+from ark_nlp.nn.layer.position_embedding_block import SinusoidalPositionEmbedding
+from ark_nlp.nn.layer.unpad_block import get_unpad_indices, unpad_input, pad_input
 from transformers.modeling_utils import PreTrainedModel, prune_linear_layer
 try:
     from transformers.modeling_bert import (
@@ -59,23 +62,9 @@ ROFORMER_PRETRAINED_MODEL_ARCHIVE_LIST = []
 ROFORMER_PRETRAINED_MODEL_ARCHIVE_MAP = {}
 
 
-class SinusoidalEmbedding(nn.Module):
-    def __init__(self, output_dim):
-        super().__init__()
-        self.output_dim = output_dim
-
-    def forward(self, inputs):
-        seq_len = inputs.shape[1]
-        position_ids = torch.arange(0, seq_len, dtype=torch.float32)[None]
-
-        indices = torch.arange(0, self.output_dim // 2, dtype=torch.float32)
-        indices = torch.pow(10000.0, -2 * indices / self.output_dim)
-        embeddings = torch.einsum('bn,d->bnd', position_ids, indices)
-        embeddings = torch.stack([embeddings.sin(), embeddings.cos()], dim=-1)
-        embeddings = torch.reshape(
-            embeddings, (-1, seq_len, self.output_dim)).to(inputs.device)
-
-        return embeddings
+class SinusoidalEmbedding(SinusoidalPositionEmbedding):
+    def __init__(self, output_dim, max_length=512):
+        super().__init__(output_dim, merge_mode='zero', max_length=max_length)
 
 
 def load_tf_weights_in_roformer(model, config, tf_checkpoint_path):
@@ -212,7 +201,11 @@ class RoFormerSelfAttention(nn.Module):
         self.dropout = nn.Dropout(config.attention_probs_dropout_prob)
 
         self.rotary_positions_encoding = SinusoidalEmbedding(
-            self.attention_head_size)
+            self.attention_head_size,
+            max_length=config.max_position_embeddings)
+
+        # "eager"为原始实现，"sdpa"使用融合的QKV投影和scaled_dot_product_attention
+        self.attention_backend = getattr(config, 'attention_backend', 'eager')
 
     def transpose_for_scores(self, x):
         new_x_shape = x.size()[:-1] + (self.num_attention_heads,
@@ -220,6 +213,103 @@ class RoFormerSelfAttention(nn.Module):
         x = x.view(*new_x_shape)
         return x.permute(0, 2, 1, 3)
 
+    def train(self, mode=True):
+        # 切换模式时释放推理时缓存的拼接参数
+        self._fused_qkv_cache = None
+        return super().train(mode)
+
+    def qkv_projection(self, hidden_states):
+        return fused_qkv_projection(self, hidden_states)
+
+    def split_qkv(self, mixed_layer):
+        batch_size, seq_length = mixed_layer.size()[:2]
+        mixed_layer = mixed_layer.view(batch_size, seq_length, 3,
+                                       self.num_attention_heads,
+                                       self.attention_head_size)
+
+        return mixed_layer.permute(2, 0, 3, 1, 4).unbind(0)
+
+    def fused_qkv(self, hidden_states):
+        return self.split_qkv(self.qkv_projection(hidden_states))
+
+    def apply_rotary(self, hidden_states, query_layer, key_layer):
+        relations_keys_values = self.rotary_positions_encoding(
+            hidden_states)[:, None]
+
+        cos_pos = torch.repeat_interleave(relations_keys_values[..., 1::2],
+                                          2,
+                                          dim=-1)
+
+        sin_pos = torch.repeat_interleave(relations_keys_values[..., ::2],
+                                          2,
+                                          dim=-1)
+        # query_layer b h l d
+        qw2 = torch.stack([-query_layer[..., 1::2], query_layer[..., ::2]],
+                          dim=-1).reshape_as(query_layer)
+
+        query_layer = query_layer * cos_pos + qw2 * sin_pos
+        kw2 = torch.stack([-key_layer[..., 1::2], key_layer[..., ::2]],
+                          dim=-1).reshape_as(key_layer)
+        key_layer = key_layer * cos_pos + kw2 * sin_pos
+
+        return query_layer, key_layer
+
+    def sdpa_forward(self, hidden_states, attention_mask=None):
+        query_layer, key_layer, value_layer = self.fused_qkv(hidden_states)
+
+        return (self.attention_context(query_layer, key_layer, value_layer,
+                                       attention_mask), )
+
+    def unpadded_forward(self,
+                         hidden_states,
+                         indices,
+                         batch_size,
+                         seq_length,
+                         attention_mask=None):
+        """
+        去除填充后的self-attention，QKV投影只计算非填充token，仅在注意力计算时还原成带填充的形状
+
+        Args:
+            hidden_states (:obj:`torch.Tensor`): (total_tokens, hidden_size)
+            indices (:obj:`torch.LongTensor`): 非填充token在展平的(batch_size * seq_len)中的位置
+            batch_size (:obj:`int`): batch大小
+            seq_length (:obj:`int`): 序列长度
+            attention_mask (:obj:`torch.Tensor`, optional, defaults to None): 扩展后的attention mask
+        """  # noqa: ignore flake8"
+
+        mixed_layer = pad_input(self.qkv_projection(hidden_states), indices,
+                                batch_size, seq_length)
+        query_layer, key_layer, value_layer = self.split_qkv(mixed_layer)
+
+        context_layer = self.attention_context(query_layer, key_layer,
+                                               value_layer, attention_mask)
+
+        return (unpad_input(context_layer, indices), )
+
+    def attention_context(self,
+                          query_layer,
+                          key_layer,
+                          value_layer,
+                          attention_mask=None):
+        batch_size, _, seq_length, _ = query_layer.size()
+
+        # 旋转位置编码只需要(batch_size, seq_len, ...)形状的输入确定长度和数据类型
+        query_layer, key_layer = self.apply_rotary(query_layer.transpose(1, 2),
+                                                   query_layer, key_layer)
+
+        if attention_mask is not None:
+            attention_mask = attention_mask.to(query_layer.dtype)
+
+        context_layer = nn.functional.scaled_dot_product_attention(
+            query_layer,
+            key_layer,
+            value_layer,
+            attn_mask=attention_mask,
+            dropout_p=self.dropout.p if self.training else 0.0)
+
+        return context_layer.transpose(1, 2).reshape(batch_size, seq_length,
+                                                     self.all_head_size)
+
     def forward(
         self,
         hidden_states,
@@ -228,6 +318,11 @@ class RoFormerSelfAttention(nn.Module):
         encoder_hidden_states=None,
         encoder_attention_mask=None,
     ):
+        if (self.attention_backend == 'sdpa' and head_mask is None
+                and encoder_hidden_states is None
+                and not self.output_attentions):
+            return self.sdpa_forward(hidden_states, attention_mask)
+
         mixed_query_layer = self.query(hidden_states)
 
         # If this is instantiated as a cross-attention module, the keys
@@ -246,26 +341,8 @@ class RoFormerSelfAttention(nn.Module):
         value_layer = self.transpose_for_scores(mixed_value_layer)
 
         # rotary_positions_encoding
-        #########################
-        relations_keys_values = self.rotary_positions_encoding(
-            hidden_states)[:, None]
-
-        cos_pos = torch.repeat_interleave(relations_keys_values[..., 1::2],
-                                          2,
-                                          dim=-1)
-
-        sin_pos = torch.repeat_interleave(relations_keys_values[..., ::2],
-                                          2,
-                                          dim=-1)
-        # query_layer b h l d
-        qw2 = torch.stack([-query_layer[..., 1::2], query_layer[..., ::2]],
-                          dim=-1).reshape_as(query_layer)
-
-        query_layer = query_layer * cos_pos + qw2 * sin_pos
-        kw2 = torch.stack([-key_layer[..., 1::2], key_layer[..., ::2]],
-                          dim=-1).reshape_as(key_layer)
-        key_layer = key_layer * cos_pos + kw2 * sin_pos
-        #########################
+        query_layer, key_layer = self.apply_rotary(hidden_states, query_layer,
+                                                   key_layer)
 
         # Take the dot product between "query" and "key" to get the raw attention scores.
         attention_scores = torch.matmul(query_layer,
@@ -349,6 +426,18 @@ class RoFormerAttention(nn.Module):
                    ) + self_outputs[1:]  # add attentions if we output them
         return outputs
 
+    def unpadded_forward(self,
+                         hidden_states,
+                         indices,
+                         batch_size,
+                         seq_length,
+                         attention_mask=None):
+        self_outputs = self.self.unpadded_forward(hidden_states, indices,
+                                                  batch_size, seq_length,
+                                                  attention_mask)
+        attention_output = self.output(self_outputs[0], hidden_states)
+        return (attention_output, )
+
 
 class RoFormerLayer(nn.Module):
     def __init__(self, config):
@@ -387,15 +476,51 @@ class RoFormerLayer(nn.Module):
         outputs = (layer_output, ) + outputs
         return outputs
 
+    def unpadded_forward(self,
+                         hidden_states,
+                         indices,
+                         batch_size,
+                         seq_length,
+                         attention_mask=None):
+        # 除注意力计算外，投影、FFN和LayerNorm均只作用于(total_tokens, hidden_size)的非填充token
+        attention_output = self.attention.unpadded_forward(
+            hidden_states, indices, batch_size, seq_length, attention_mask)[0]
+        intermediate_output = self.intermediate(attention_output)
+        layer_output = self.output(intermediate_output, attention_output)
+        return (layer_output, )
+
 
 class RoFormerEncoder(nn.Module):
     def __init__(self, config):
         super().__init__()
         self.output_attentions = config.output_attentions
         self.output_hidden_states = config.output_hidden_states
+        self.unpad_input = getattr(config, 'unpad_input', False)
         self.layer = nn.ModuleList(
             [RoFormerLayer(config) for _ in range(config.num_hidden_layers)])
 
+    def unpadded_forward(self, hidden_states, indices, attention_mask=None):
+        batch_size, seq_length = hidden_states.size()[:2]
+        hidden_states = unpad_input(hidden_states, indices)
+
+        all_hidden_states = ()
+        for layer_module in self.layer:
+            if self.output_hidden_states:
+                all_hidden_states = all_hidden_states + (pad_input(
+                    hidden_states, indices, batch_size, seq_length), )
+            hidden_states = layer_module.unpadded_forward(
+                hidden_states, indices, batch_size, seq_length,
+                attention_mask)[0]
+
+        # 填充位置的输出为0
+        hidden_states = pad_input(hidden_states, indices, batch_size,
+                                  seq_length)
+
+        outputs = (hidden_states, )
+        if self.output_hidden_states:
+            outputs = outputs + (all_hidden_states + (hidden_states, ), )
+        return outputs
+
     def forward(
         self,
         hidden_states,
@@ -404,6 +529,14 @@ class RoFormerEncoder(nn.Module):
         encoder_hidden_states=None,
         encoder_attention_mask=None,
     ):
+        if (self.unpad_input and encoder_hidden_states is None
+                and not self.output_attentions
+                and all(head_mask_ is None for head_mask_ in head_mask)):
+            indices = get_unpad_indices(attention_mask)
+            if indices is not None:
+                return self.unpadded_forward(hidden_states, indices,
+                                             attention_mask)
+
         all_hidden_states = ()
         all_attentions = ()
         for i, layer_module in enumerate(self.layer):
@@ -0,0 +1,66 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import torch
+
+
+def get_unpad_indices(attention_mask):
+    """
+    从扩展后的attention_mask中获取非填充token在展平的(batch_size * seq_len)中的位置
+
+    Args:
+        attention_mask (:obj:`torch.Tensor`): (batch_size, 1, 1, seq_len)的加性attention mask，非填充位置为0
+
+    Returns:
+        torch.LongTensor or None: 非填充token的位置，attention_mask无法转换时返回None
+    """  # noqa: ignore flake8"
+
+    # 只有由二维padding mask扩展得到的mask才能按token去除填充
+    if attention_mask is None or attention_mask.dim() != 4 or attention_mask.size(1) != 1 or attention_mask.size(2) != 1:
+        return None
+
+    return torch.nonzero(attention_mask[:, 0, 0, :].flatten() == 0, as_tuple=False).flatten()
+
+
+def unpad_input(hidden_states, indices):
+    """
+    将(batch_size, seq_len, ...)的张量展平并只保留非填充token，得到(total_tokens, ...)
+
+    Args:
+        hidden_states (:obj:`torch.Tensor`): 带填充的张量
+        indices (:obj:`torch.LongTensor`): 非填充token的位置
+    """  # noqa: ignore flake8"
+
+    return hidden_states.flatten(0, 1).index_select(0, indices)
+
+
+def pad_input(hidden_states, indices, batch_size, seq_length):
+    """
+    将(total_tokens, ...)的张量还原成(batch_size, seq_len, ...)，填充位置为0
+
+    Args:
+        hidden_states (:obj:`torch.Tensor`): 去除填充后的张量
+        indices (:obj:`torch.LongTensor`): 非填充token的位置
+        batch_size (:obj:`int`): batch大小
+        seq_length (:obj:`int`): 序列长度
+    """  # noqa: ignore flake8"
+
+    output = hidden_states.new_zeros((batch_size * seq_length,) + hidden_states.size()[1:])
+    output = output.index_copy(0, indices, hidden_states)
+
+    return output.view((batch_size, seq_length) + hidden_states.size()[1:])
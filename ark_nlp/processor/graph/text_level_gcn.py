@@ -41,6 +41,18 @@ class TextLevelGCNGraph(object):
         else:
             raise ValueError('没有该模式的构图')
 
+    @staticmethod
+    def get_dataset_ids(vocab, dataset):
+        texts = [data_['text'] for data_ in dataset.dataset]
+
+        # 词典支持批量分词时一次性分词，利用其去重、缓存和多进程分词
+        if hasattr(vocab, 'batch_tokenize'):
+            tokens_list = vocab.batch_tokenize(texts)
+        else:
+            tokens_list = [vocab.tokenize(text_) for text_ in texts]
+
+        return [vocab.convert_to_ids(tokens_) for tokens_ in tokens_list]
+
     @staticmethod
     def build_pmi_ngram_graph(
         vocab,
@@ -50,8 +62,7 @@ class TextLevelGCNGraph(object):
         pair_count_matrix = np.zeros((vocab.vocab_size, vocab.vocab_size), dtype=int)
         word_count = np.zeros(vocab.vocab_size, dtype=int)
 
-        for data_ in dataset.dataset:
-            ids_ = vocab.convert_to_ids(vocab.tokenize(data_['text']))
+        for ids_ in TextLevelGCNGraph.get_dataset_ids(vocab, dataset):
             for index_, token_ in enumerate(ids_):
                 word_count[token_] += 1
                 start_index_ = max(0, index_ - window_size)
@@ -104,8 +115,7 @@ class TextLevelGCNGraph(object):
         count = 1
         adj_matrix = np.zeros(shape=(vocab.vocab_size, vocab.vocab_size), dtype=np.int32)
 
-        for data_ in dataset.dataset:
-            ids_ = vocab.convert_to_ids(vocab.tokenize(data_['text']))
+        for ids_ in TextLevelGCNGraph.get_dataset_ids(vocab, dataset):
             for src_index_, src_ in enumerate(ids_):
                 for dst_index_ in range(max(0, src_index_-ngram), min(len(ids_), src_index_+ngram+1)):
                     dst_ = ids_[dst_index_]
@@ -150,6 +150,38 @@ class TransfomerTokenizer(BaseTokenizer):
 
         return (sequence, sequence_mask, segment_ids)
 
+    def chunk_to_ids(self, sequence, stride=None, max_chunk_num=None):
+        """
+        将长文本按token切分成多个片段并分别ID化，每个片段的长度不超过max_seq_len
+
+        Args:
+            sequence (:obj:`string` or :obj:`list`): 输入文本或分词后的tokens
+            stride (:obj:`int` or :obj:`None`, optional, defaults to None):
+                相邻片段起始位置的间隔，默认为None，即max_seq_len-2，片段之间没有重叠
+            max_chunk_num (:obj:`int` or :obj:`None`, optional, defaults to None): 最多保留的片段数，默认为None，即不限制
+
+        Returns:
+            tuple: 形状均为(片段数, max_seq_len)的input_ids、attention_mask和token_type_ids
+        """  # noqa: ignore flake8"
+        if type(sequence) == str:
+            sequence = self.tokenize(sequence)
+
+        chunk_len = self.max_seq_len - 2
+        if stride is None:
+            stride = chunk_len
+
+        starts = list(range(0, max(len(sequence) - chunk_len, 0) + 1, stride))
+        # 保证最后一个片段覆盖到文本末尾
+        if starts[-1] + chunk_len < len(sequence):
+            starts.append(len(sequence) - chunk_len)
+
+        if max_chunk_num is not None:
+            starts = starts[:max_chunk_num]
+
+        chunks = [self.sentence_to_ids(sequence[start_:start_ + chunk_len]) for start_ in starts]
+
+        return tuple(np.stack(ids_) for ids_ in zip(*chunks))
+
     def pair_to_ids(self, sequence_a, sequence_b, return_sequence_length=False):
         if type(sequence_a) == str:
             sequence_a = self.tokenize(sequence_a)
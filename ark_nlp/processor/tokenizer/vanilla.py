@@ -36,6 +36,19 @@ class VanillaTokenizer(BaseTokenizer):
         super(VanillaTokenizer, self).__init__(vocab, max_seq_len)
         self.tokenizer_type = 'vanilla'
 
+    def batch_tokenize(self, texts):
+        """
+        批量分词，词典支持batch_tokenize时使用其批量分词(去重、缓存和多进程)
+
+        Args:
+            texts (:obj:`list`): 文本列表
+        """  # noqa: ignore flake8"
+
+        if hasattr(self.vocab, 'batch_tokenize'):
+            return self.vocab.batch_tokenize(texts)
+
+        return [self.tokenize(text_) for text_ in texts]
+
     def sequence_to_ids(
         self,
         sequence,
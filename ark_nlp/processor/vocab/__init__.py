@@ -1,4 +1,8 @@
 from ark_nlp.processor.vocab._vocab import Vocab
+from ark_nlp.processor.vocab.array_vocab import ArrayVocab
+from ark_nlp.processor.vocab.streaming_counter import StreamingTokenCounter
+from ark_nlp.processor.vocab.streaming_counter import count_tokens_from_files
+from ark_nlp.processor.vocab.segmentation_cache import SegmentationCache
 from ark_nlp.processor.vocab.word_vocab import WordVocab
 from ark_nlp.processor.vocab.char_vocab import CharVocab
 from ark_nlp.processor.vocab.label_vocab import LabelVocab
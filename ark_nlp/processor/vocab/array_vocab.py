@@ -0,0 +1,353 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import json
+import numpy as np
+
+from collections.abc import Mapping
+
+
+_MAGIC = b'ARKVOCAB'
+_ALIGNMENT = 64
+_MAX_SEED = 64
+
+
+def _encode_tokens(tokens):
+    """
+    将tokens编码成utf-8字节拼接的buffer和每个token的起止位置
+    """  # noqa: ignore flake8"
+
+    tokens = list(tokens)
+
+    # 以\x00为分隔符一次性编码所有token，避免逐个token调用encode
+    buffer = np.frombuffer('\x00'.join(tokens).encode('utf-8'), dtype=np.uint8)
+    separators = np.flatnonzero(buffer == 0)
+
+    if len(tokens) > 0 and len(separators) == len(tokens) - 1:
+        lengths = np.diff(np.concatenate([[-1], separators, [len(buffer)]])) - 1
+        buffer = np.delete(buffer, separators)
+    else:
+        # token中本身含有\x00时逐个编码
+        encoded = [token_.encode('utf-8') for token_ in tokens]
+        lengths = np.fromiter((len(token_) for token_ in encoded), dtype=np.int64, count=len(encoded))
+        buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+    offsets = np.zeros(len(tokens) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    return buffer, offsets
+
+
+def _iter_positions(lengths):
+    """
+    按字节位置j迭代，返回长度大于j的token下标，总计算量与字节总数成正比
+    """  # noqa: ignore flake8"
+
+    order = np.argsort(lengths, kind='stable')
+    sorted_lengths = lengths[order]
+    max_length = int(sorted_lengths[-1]) if len(sorted_lengths) else 0
+
+    for position_ in range(max_length):
+        yield position_, order[np.searchsorted(sorted_lengths, position_, side='right'):]
+
+
+def _hash_tokens(buffer, offsets, seed):
+    """
+    向量化计算每个token字节串的64位哈希值
+
+    Args:
+        buffer (:obj:`np.ndarray`): uint8的token字节buffer
+        offsets (:obj:`np.ndarray`): (token数 + 1,)的token起止位置
+        seed (:obj:`int`): 哈希种子，不同的种子对应不同的哈希函数
+    """  # noqa: ignore flake8"
+
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+
+    multiplier = np.uint64(0x100000001b3 + 2 * seed)
+    hashes = np.full(len(lengths), 0xcbf29ce484222325 ^ seed, dtype=np.uint64)
+
+    for position_, rows_ in _iter_positions(lengths):
+        hashes[rows_] = hashes[rows_] * multiplier + buffer[starts[rows_] + position_].astype(np.uint64)
+
+    # 混入长度并打散高低位
+    hashes ^= lengths.astype(np.uint64)
+    hashes ^= hashes >> np.uint64(33)
+    hashes *= np.uint64(0xff51afd7ed558ccd)
+    hashes ^= hashes >> np.uint64(33)
+
+    return hashes
+
+
+class ArrayVocab(object):
+    """
+    基于数组的紧凑词典，所有token按utf-8编码后拼接在同一个buffer中并由offsets划分，
+    token到ID的查找使用无冲突的64位哈希加np.searchsorted，支持将大量token序列一次性转换成ID矩阵，
+    并可保存为可内存映射的单个文件，百万级词典也能在毫秒级加载
+
+    Args:
+        buffer (:obj:`np.ndarray`): uint8的token字节buffer，按ID顺序排列
+        offsets (:obj:`np.ndarray`): (词典大小 + 1,)的token起止位置
+        hashes (:obj:`np.ndarray`): 排序后的token哈希值
+        hash_ids (:obj:`np.ndarray`): 与hashes对应的token ID
+        seed (:obj:`int`): 哈希种子
+        meta (:obj:`dict` or :obj:`None`, optional, defaults to None): 随词典一起保存的其他信息
+
+    Example::
+
+        >>> array_vocab = ArrayVocab.from_tokens(['<pad>', '<unk>', '北京', '天安门'])
+        >>> array_vocab.convert_batch_to_ids([['北京', '上海'], ['天安门']], unk_id=1)
+        array([[2, 1],
+               [3, 0]], dtype=int32)
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        buffer,
+        offsets,
+        hashes,
+        hash_ids,
+        seed,
+        meta=None
+    ):
+        self.buffer = buffer
+        self.offsets = offsets
+        self.hashes = hashes
+        self.hash_ids = hash_ids
+        self.seed = seed
+        self.meta = {} if meta is None else meta
+
+    @classmethod
+    def from_tokens(cls, tokens, meta=None):
+        """
+        由按ID顺序排列的tokens构建词典
+
+        Args:
+            tokens (:obj:`list`): token列表，token的ID为其下标
+            meta (:obj:`dict` or :obj:`None`, optional, defaults to None): 随词典一起保存的其他信息
+        """  # noqa: ignore flake8"
+
+        tokens = list(tokens)
+        if len(set(tokens)) != len(tokens):
+            raise ValueError("The tokens must be unique")
+
+        buffer, offsets = _encode_tokens(tokens)
+
+        # 依次尝试不同的哈希种子，直到词典内所有token的哈希值互不相同
+        for seed_ in range(_MAX_SEED):
+            hashes = _hash_tokens(buffer, offsets, seed_)
+            order = np.argsort(hashes, kind='stable')
+            hashes = hashes[order]
+            if len(hashes) < 2 or (hashes[1:] != hashes[:-1]).all():
+                return cls(buffer, offsets, hashes, order.astype(np.int32), seed_, meta)
+
+        raise ValueError("Can not find a collision free hash seed")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get_token(self, idx):
+        if idx < 0 or idx >= len(self):
+            raise KeyError(idx)
+        return self.buffer[self.offsets[idx]:self.offsets[idx + 1]].tobytes().decode('utf-8')
+
+    def lookup(self, tokens):
+        """
+        批量查找token的ID
+
+        Args:
+            tokens (:obj:`list`): token列表
+
+        Returns:
+            np.ndarray: (token数,)的int32 ID，不在词典中的token为-1
+        """  # noqa: ignore flake8"
+
+        if len(self.hashes) == 0:
+            return np.full(len(tokens), -1, dtype=np.int32)
+
+        query_buffer, query_offsets = _encode_tokens(tokens)
+        query_hashes = _hash_tokens(query_buffer, query_offsets, self.seed)
+
+        # 查询值有序时searchsorted的访存更连续
+        order = np.argsort(query_hashes)
+        positions = np.empty(len(query_hashes), dtype=np.int64)
+        positions[order] = np.searchsorted(self.hashes, query_hashes[order])
+        positions = np.minimum(positions, len(self.hashes) - 1)
+
+        ids = self.hash_ids[positions]
+        is_found = self.hashes[positions] == query_hashes
+
+        # 哈希命中后再逐字节核对，排除词典外token的哈希碰撞
+        query_lengths = np.diff(query_offsets)
+        is_found &= np.diff(self.offsets)[ids] == query_lengths
+
+        query_starts = query_offsets[:-1]
+        vocab_starts = self.offsets[:-1][ids]
+        for position_, rows_ in _iter_positions(np.where(is_found, query_lengths, 0)):
+            is_found[rows_] &= (
+                query_buffer[query_starts[rows_] + position_] == self.buffer[vocab_starts[rows_] + position_]
+            )
+
+        return np.where(is_found, ids, -1).astype(np.int32)
+
+    def convert_to_ids(self, tokens, unk_id):
+        ids = self.lookup(tokens)
+        ids[ids < 0] = unk_id
+        return ids
+
+    def convert_batch_to_ids(
+        self,
+        token_lists,
+        unk_id,
+        max_seq_len=None,
+        pad_id=0
+    ):
+        """
+        将多个token序列一次性转换成填充后的ID矩阵
+
+        Args:
+            token_lists (:obj:`list`): token序列的列表
+            unk_id (:obj:`int`): 未登录词的ID
+            max_seq_len (:obj:`int` or :obj:`None`, optional, defaults to None): 最大长度，超出部分截断，默认为None，即最长序列的长度
+            pad_id (:obj:`int`, optional, defaults to 0): 填充的ID
+
+        Returns:
+            np.ndarray: (序列数, max_seq_len)的int32 ID矩阵
+        """  # noqa: ignore flake8"
+
+        token_lists = [
+            list(tokens_) if max_seq_len is None else list(tokens_)[:max_seq_len] for tokens_ in token_lists
+        ]
+
+        lengths = np.fromiter((len(tokens_) for tokens_ in token_lists), dtype=np.int64, count=len(token_lists))
+        if max_seq_len is None:
+            max_seq_len = int(lengths.max()) if len(lengths) else 0
+
+        ids = self.convert_to_ids([token_ for tokens_ in token_lists for token_ in tokens_], unk_id)
+
+        matrix = np.full((len(token_lists), max_seq_len), pad_id, dtype=np.int32)
+        matrix[np.arange(max_seq_len) < lengths[:, None]] = ids
+
+        return matrix
+
+    def save(self, output_path='./vocab.bin'):
+        """
+        保存为可内存映射的单个文件，文件由json头信息和按64字节对齐的各个数组组成
+
+        Args:
+            output_path (:obj:`string`, optional, defaults to "./vocab.bin"): 保存地址
+        """  # noqa: ignore flake8"
+
+        arrays = {
+            'buffer': np.ascontiguousarray(self.buffer),
+            'offsets': np.ascontiguousarray(self.offsets),
+            'hashes': np.ascontiguousarray(self.hashes),
+            'hash_ids': np.ascontiguousarray(self.hash_ids)
+        }
+
+        # 头信息的长度会影响数组的起始位置，因此先按最大可能的长度预留
+        header = {'seed': self.seed, 'meta': self.meta, 'arrays': {}}
+        header_size = len(json.dumps(header, ensure_ascii=False).encode('utf-8')) + 128 * len(arrays)
+        start = -(-(len(_MAGIC) + 8 + header_size) // _ALIGNMENT) * _ALIGNMENT
+
+        for name_, array_ in arrays.items():
+            header['arrays'][name_] = [array_.dtype.str, list(array_.shape), start]
+            start += -(-array_.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+
+        with open(output_path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(np.uint64(len(header_bytes)).tobytes())
+            f.write(header_bytes)
+            for name_, array_ in arrays.items():
+                f.seek(header['arrays'][name_][2])
+                f.write(array_.tobytes())
+            f.truncate(start)
+
+    @classmethod
+    def load(cls, save_path='./vocab.bin'):
+        """
+        以内存映射的方式加载词典，数组在使用时才从磁盘读取
+
+        Args:
+            save_path (:obj:`string`, optional, defaults to "./vocab.bin"): 词典文件地址
+        """  # noqa: ignore flake8"
+
+        with open(save_path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError("The file is not an ArrayVocab file")
+            header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_len).decode('utf-8'))
+
+        data = np.memmap(save_path, dtype=np.uint8, mode='r')
+
+        arrays = {}
+        for name_, (dtype_, shape_, start_) in header['arrays'].items():
+            dtype_ = np.dtype(dtype_)
+            nbytes = int(np.prod(shape_)) * dtype_.itemsize
+            arrays[name_] = data[start_:start_ + nbytes].view(dtype_).reshape(shape_)
+
+        return cls(seed=header['seed'], meta=header['meta'], **arrays)
+
+    @property
+    def token2id(self):
+        return ArrayVocabToken2Id(self)
+
+    @property
+    def id2token(self):
+        return ArrayVocabId2Token(self)
+
+
+class ArrayVocabToken2Id(Mapping):
+    """
+    ArrayVocab的token到ID的只读映射视图，用法与dict一致
+    """  # noqa: ignore flake8"
+
+    def __init__(self, array_vocab):
+        self.array_vocab = array_vocab
+
+    def __getitem__(self, token):
+        idx = int(self.array_vocab.lookup([token])[0])
+        if idx < 0:
+            raise KeyError(token)
+        return idx
+
+    def __iter__(self):
+        return (self.array_vocab.get_token(idx_) for idx_ in range(len(self.array_vocab)))
+
+    def __len__(self):
+        return len(self.array_vocab)
+
+
+class ArrayVocabId2Token(Mapping):
+    """
+    ArrayVocab的ID到token的只读映射视图，用法与dict一致
+    """  # noqa: ignore flake8"
+
+    def __init__(self, array_vocab):
+        self.array_vocab = array_vocab
+
+    def __getitem__(self, idx):
+        return self.array_vocab.get_token(idx)
+
+    def __iter__(self):
+        return iter(range(len(self.array_vocab)))
+
+    def __len__(self):
+        return len(self.array_vocab)
@@ -22,6 +22,11 @@ import pickle
 from zhon.hanzi import punctuation
 from collections import Counter
 from ark_nlp.processor.vocab._vocab import Vocab
+from ark_nlp.processor.vocab.array_vocab import ArrayVocab
+from ark_nlp.processor.vocab.streaming_counter import StreamingTokenCounter
+
+
+_punctuation_pattern = re.compile(r'[%s]+' % punctuation)
 
 
 class CharVocab(Vocab):
@@ -46,6 +51,7 @@ class CharVocab(Vocab):
 
         self.id2token = {}
         self.token2id = {}
+        self.array_vocab = None
 
         self.pad_token = '<pad>'
         self.unk_token = '<unk>'
@@ -62,7 +68,11 @@ class CharVocab(Vocab):
             self.add(token)
 
     def initial_vocab(self, initial_tokens):
-        counter = Counter(initial_tokens)
+        # 超大语料可先用StreamingTokenCounter在有界内存下统计词频
+        if isinstance(initial_tokens, StreamingTokenCounter):
+            counter = initial_tokens
+        else:
+            counter = Counter(initial_tokens)
         if self.vocab_size:
             vocab_size = self.vocab_size - 2
         else:
@@ -73,6 +83,11 @@ class CharVocab(Vocab):
         return list(tokens)
 
     def add(self, token, cnt=1):
+        # 从数组文件加载的词典是只读的，新增token前先转换回dict
+        if not isinstance(self.token2id, dict):
+            self.id2token = dict(self.id2token.items())
+            self.token2id = {token_: idx_ for idx_, token_ in self.id2token.items()}
+
         if token in self.token2id:
             idx = self.token2id[token]
         else:
@@ -80,13 +95,48 @@ class CharVocab(Vocab):
             self.id2token[idx] = token
             self.token2id[token] = idx
             self.vocab_size += 1
+            # 新增token后数组词典不再与dict一致
+            self.array_vocab = None
 
         return idx
 
     def convert_to_ids(self, tokens):
-        ids = [self.get_id(term) for term in tokens]
+        if self.array_vocab is not None:
+            return self.array_vocab.convert_to_ids(list(tokens), self.get_id(self.unk_token)).tolist()
+
+        unk_id = self.token2id[self.unk_token]
+        ids = [self.token2id.get(term, unk_id) for term in tokens]
         return ids
 
+    def get_array_vocab(self):
+        """
+        获取与当前词典一致的ArrayVocab，词典有新增token时重新构建
+        """  # noqa: ignore flake8"
+
+        if self.array_vocab is None or len(self.array_vocab) != len(self.id2token):
+            self.array_vocab = ArrayVocab.from_tokens([self.id2token[idx_] for idx_ in range(len(self.id2token))])
+
+        return self.array_vocab
+
+    def convert_batch_to_ids(self, token_lists, max_seq_len=None):
+        """
+        将多个token序列一次性转换成填充后的ID矩阵
+
+        Args:
+            token_lists (:obj:`list`): token序列的列表
+            max_seq_len (:obj:`int` or :obj:`None`, optional, defaults to None): 最大长度，超出部分截断，默认为None，即最长序列的长度
+
+        Returns:
+            np.ndarray: (序列数, max_seq_len)的int32 ID矩阵
+        """  # noqa: ignore flake8"
+
+        return self.get_array_vocab().convert_batch_to_ids(
+            token_lists,
+            unk_id=self.get_id(self.unk_token),
+            max_seq_len=max_seq_len,
+            pad_id=self.get_id(self.pad_token)
+        )
+
     def recover_from_ids(self, ids, stop_id=None):
         tokens = []
         for i in ids:
@@ -121,9 +171,21 @@ class CharVocab(Vocab):
         else:
             raise ValueError('没有该分词模式')
 
+    def batch_tokenize(self, texts, stop_words=None, lower=True, **kwargs):
+        """
+        批量分词，与WordVocab.batch_tokenize的接口一致，字符级分词开销很小，不使用多进程和缓存
+
+        Args:
+            texts (:obj:`list`): 文本列表
+            stop_words (:obj:`list` or :obj:`None`, optional, defaults to None): 停用词
+            lower (:obj:`bool`, optional, defaults to True): 是否转换为小写
+        """  # noqa: ignore flake8"
+
+        return [self.tokenize(text_, stop_words, lower) for text_ in texts]
+
     @classmethod
     def zh_tokenize(cls, text, stop_words=None, lower=True):
-        text = re.sub(r'[%s]+' % punctuation, '', text)
+        text = _punctuation_pattern.sub('', text)
         if lower:
             text = text.lower()
         tokens = [token_ for token_ in text]
@@ -147,9 +209,27 @@ class CharVocab(Vocab):
 
     def save(self, output_path='./token2id.pkl'):
         with open(output_path, 'wb') as f:
-            pickle.dump(self.token2id, f)
+            pickle.dump(dict(self.token2id.items()), f)
 
     def load(self, save_path='./token2id.pkl'):
         with open(save_path, 'rb') as f:
-            self.token2id = pickle.load(f)
+            self.token2id = dict(pickle.load(f).items())
         self.id2token = self.recover_id2token()
+        self.array_vocab = None
+
+    def save_array(self, output_path='./vocab.bin'):
+        """
+        保存为可内存映射的ArrayVocab文件
+        """  # noqa: ignore flake8"
+
+        self.get_array_vocab().save(output_path)
+
+    def load_array(self, save_path='./vocab.bin'):
+        """
+        以内存映射的方式加载ArrayVocab文件，token2id和id2token为只读的映射视图，无需在Python中重建dict
+        """  # noqa: ignore flake8"
+
+        self.array_vocab = ArrayVocab.load(save_path)
+        self.token2id = self.array_vocab.token2id
+        self.id2token = self.array_vocab.id2token
+        self.vocab_size = len(self.array_vocab)
@@ -0,0 +1,131 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import json
+import sqlite3
+
+from collections import OrderedDict
+
+
+class SegmentationCache(object):
+    """
+    分词结果的缓存，以文本为键，内存中使用LRU缓存最近使用的结果，
+    设置cache_path时同时持久化到sqlite文件中，可以在多次运行之间复用
+
+    Args:
+        max_size (:obj:`int`, optional, defaults to 100000): 内存中最多缓存的文本数
+        cache_path (:obj:`string` or :obj:`None`, optional, defaults to None): 磁盘缓存的文件地址，默认为None，即只使用内存缓存
+
+    Example::
+
+        >>> WordVocab.configure_segmentation(num_workers=8, cache=SegmentationCache(cache_path='./segmentation.db'))
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        max_size=100000,
+        cache_path=None
+    ):
+        self.max_size = max_size
+        self.cache_path = cache_path
+
+        self.memory = OrderedDict()
+
+        self.connection = None
+        if self.cache_path is not None:
+            self.connection = sqlite3.connect(self.cache_path)
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS segmentation (key TEXT PRIMARY KEY, tokens TEXT)'
+            )
+            self.connection.commit()
+
+    def _remember(self, key, tokens):
+        self.memory[key] = tokens
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """
+        批量查询缓存，返回命中的键及其分词结果
+
+        Args:
+            keys (:obj:`list`): 缓存的键列表
+        """  # noqa: ignore flake8"
+
+        results = {}
+        missing = []
+        for key_ in keys:
+            if key_ in self.memory:
+                self.memory.move_to_end(key_)
+                results[key_] = self.memory[key_]
+            else:
+                missing.append(key_)
+
+        if self.connection is not None and missing:
+            # sqlite单条语句的参数数量有限，分批查询
+            for start_ in range(0, len(missing), 500):
+                batch = missing[start_:start_ + 500]
+                rows = self.connection.execute(
+                    'SELECT key, tokens FROM segmentation WHERE key IN ({})'.format(','.join('?' * len(batch))),
+                    batch
+                ).fetchall()
+                for key_, tokens_ in rows:
+                    tokens_ = json.loads(tokens_)
+                    results[key_] = tokens_
+                    self._remember(key_, tokens_)
+
+        return results
+
+    def set_many(self, items):
+        """
+        批量写入缓存
+
+        Args:
+            items (:obj:`dict`): 键到分词结果的映射
+        """  # noqa: ignore flake8"
+
+        for key_, tokens_ in items.items():
+            self._remember(key_, tokens_)
+
+        if self.connection is not None and items:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO segmentation (key, tokens) VALUES (?, ?)',
+                [(key_, json.dumps(tokens_, ensure_ascii=False)) for key_, tokens_ in items.items()]
+            )
+            self.connection.commit()
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
+
+    def set(self, key, tokens):
+        self.set_many({key: tokens})
+
+    def clear(self):
+        self.memory.clear()
+        if self.connection is not None:
+            self.connection.execute('DELETE FROM segmentation')
+            self.connection.commit()
+
+    def __getstate__(self):
+        # sqlite连接无法在进程间传递，子进程中只保留内存缓存的配置
+        state = dict(self.__dict__)
+        state['connection'] = None
+        state['cache_path'] = None
+        state['memory'] = OrderedDict()
+        return state
@@ -0,0 +1,366 @@
+# Copyright (c) 2021 DataArk Authors. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Author: Xiang Wang, xiangking1995@163.com
+# Status: Active
+
+
+import itertools
+import numpy as np
+
+from collections import Counter
+from multiprocessing import Pool
+from ark_nlp.processor.vocab.array_vocab import _encode_tokens
+from ark_nlp.processor.vocab.array_vocab import _hash_tokens
+
+
+# 每一行sketch使用不同的奇数乘子从同一个64位哈希值中取出列号
+_SKETCH_MULTIPLIERS = (
+    0x9e3779b97f4a7c15,
+    0xc2b2ae3d27d4eb4f,
+    0x165667b19e3779f9,
+    0xd6e8feb86659fd93,
+    0xff51afd7ed558ccd,
+    0xc4ceb9fe1a85ec53,
+    0x85ebca6b0b1d4b3f,
+    0x27d4eb2f165667c5
+)
+
+
+def _iter_file_tokens(path, tokenize=None, encoding='utf-8'):
+    with open(path, 'r', encoding=encoding) as f:
+        for line_ in f:
+            tokens = tokenize(line_) if tokenize is not None else line_.split()
+            yield from tokens
+
+
+class StreamingTokenCounter(object):
+    """
+    内存有界的流式词频统计，适用于无法一次性读入内存的语料。
+    所有token的词频累加到Count-Min Sketch中，同时用容量有限的高频词表保留候选token及其词频上界，
+    再通过recount对候选token进行一次精确计数，得到保留token的准确词频。
+    多个计数器(例如不同进程分别统计的语料分片)可以通过merge合并
+
+    Args:
+        table_size (:obj:`int`, optional, defaults to 100000):
+            高频词表保留的候选token数，应大于最终的词典大小，越大结果越可靠
+        sketch_width (:obj:`int`, optional, defaults to 1048576): sketch每行的计数器数，需为2的幂
+        sketch_depth (:obj:`int`, optional, defaults to 4): sketch的行数，最大为8
+        chunk_size (:obj:`int`, optional, defaults to 65536): 每次处理的token数
+
+    Example::
+
+        >>> counter = StreamingTokenCounter(table_size=200000)
+        >>> counter.update_from_files(['./corpus_1.txt', './corpus_2.txt'], tokenize=vocab.tokenize)
+        >>> counter.recount_from_files(['./corpus_1.txt', './corpus_2.txt'], tokenize=vocab.tokenize)
+        >>> vocab = WordVocab(counter, vocab_size=50000)
+    """  # noqa: ignore flake8"
+
+    def __init__(
+        self,
+        table_size=100000,
+        sketch_width=2 ** 20,
+        sketch_depth=4,
+        chunk_size=2 ** 16
+    ):
+        if sketch_width & (sketch_width - 1) != 0:
+            raise ValueError("The sketch width must be a power of 2")
+
+        if sketch_depth > len(_SKETCH_MULTIPLIERS):
+            raise ValueError("The sketch depth must not be greater than {}".format(len(_SKETCH_MULTIPLIERS)))
+
+        self.table_size = table_size
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.chunk_size = chunk_size
+
+        self.sketch = np.zeros((sketch_depth, sketch_width), dtype=np.int64)
+        self.table = {}
+        # 未进入高频词表的token的词频上界都不超过threshold
+        self.threshold = 0
+        self.total = 0
+        self.is_exact = False
+
+    def __len__(self):
+        return len(self.table)
+
+    def _sketch_index(self, tokens):
+        buffer, offsets = _encode_tokens(tokens)
+        hashes = _hash_tokens(buffer, offsets, 0)
+
+        shift = np.uint64(64 - int(self.sketch_width).bit_length() + 1)
+        return np.stack([
+            (hashes * np.uint64(multiplier_)) >> shift
+            for multiplier_ in _SKETCH_MULTIPLIERS[:self.sketch_depth]
+        ]).astype(np.int64)
+
+    def query(self, tokens):
+        """
+        查询tokens的词频上界
+
+        Args:
+            tokens (:obj:`list`): token列表
+        """  # noqa: ignore flake8"
+
+        if len(tokens) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        index = self._sketch_index(tokens)
+        return self.sketch[np.arange(self.sketch_depth)[:, None], index].min(axis=0)
+
+    def _prune(self):
+        if len(self.table) <= self.table_size:
+            return
+
+        counts = np.fromiter(self.table.values(), dtype=np.int64, count=len(self.table))
+        kth = len(counts) - self.table_size
+        self.threshold = max(self.threshold, int(np.partition(counts, kth)[kth]))
+
+        # 与阈值相同的token按加入顺序保留，保证表大小不超过table_size
+        table = {}
+        for token_, count_ in self.table.items():
+            if count_ > self.threshold:
+                table[token_] = count_
+        for token_, count_ in self.table.items():
+            if len(table) >= self.table_size:
+                break
+            if count_ == self.threshold:
+                table[token_] = count_
+        self.table = table
+
+    def _update_chunk(self, chunk):
+        chunk_counter = Counter(chunk)
+        tokens = list(chunk_counter)
+        counts = np.fromiter(chunk_counter.values(), dtype=np.int64, count=len(tokens))
+
+        index = self._sketch_index(tokens)
+        for row_ in range(self.sketch_depth):
+            np.add.at(self.sketch[row_], index[row_], counts)
+        estimates = self.sketch[np.arange(self.sketch_depth)[:, None], index].min(axis=0)
+
+        for token_, count_, estimate_ in zip(tokens, counts.tolist(), estimates.tolist()):
+            if token_ in self.table:
+                self.table[token_] += count_
+            elif estimate_ > self.threshold or len(self.table) < self.table_size:
+                # 新进入的token以sketch的估计值作为词频上界
+                self.table[token_] = estimate_
+
+        self.total += len(chunk)
+
+        # 高频词表允许暂时超出一倍后再批量裁剪，降低裁剪频率
+        if len(self.table) > 2 * self.table_size:
+            self._prune()
+
+    def update(self, tokens):
+        """
+        分块统计token的词频
+
+        Args:
+            tokens (:obj:`iterable`): token的可迭代对象，例如生成器
+        """  # noqa: ignore flake8"
+
+        tokens = iter(tokens)
+        self.is_exact = False
+
+        while True:
+            chunk = list(itertools.islice(tokens, self.chunk_size))
+            if len(chunk) == 0:
+                break
+            self._update_chunk(chunk)
+
+        return self
+
+    def update_from_files(self, paths, tokenize=None, encoding='utf-8'):
+        """
+        逐行读取文件并统计词频
+
+        Args:
+            paths (:obj:`list` or :obj:`string`): 文件地址或文件地址列表
+            tokenize (:obj:`callable` or :obj:`None`, optional, defaults to None): 分词函数，默认为None，即按空白字符切分
+            encoding (:obj:`string`, optional, defaults to "utf-8"): 文件编码
+        """  # noqa: ignore flake8"
+
+        if isinstance(paths, str):
+            paths = [paths]
+
+        for path_ in paths:
+            self.update(_iter_file_tokens(path_, tokenize, encoding))
+
+        return self
+
+    def merge(self, other):
+        """
+        合并另一个计数器的统计结果，两个计数器的sketch形状需一致
+
+        Args:
+            other (:obj:`StreamingTokenCounter`): 另一个计数器
+        """  # noqa: ignore flake8"
+
+        if self.sketch.shape != other.sketch.shape:
+            raise ValueError("The sketch shapes of the counters are different")
+
+        # 只在一方高频词表中的token，另一方的词频用其sketch估计值作为上界
+        other_tokens = [token_ for token_ in other.table if token_ not in self.table]
+        self_tokens = [token_ for token_ in self.table if token_ not in other.table]
+
+        table = {}
+        for token_, count_ in self.table.items():
+            if token_ in other.table:
+                table[token_] = count_ + other.table[token_]
+        for token_, estimate_ in zip(self_tokens, other.query(self_tokens).tolist()):
+            table[token_] = self.table[token_] + estimate_
+        for token_, estimate_ in zip(other_tokens, self.query(other_tokens).tolist()):
+            table[token_] = other.table[token_] + estimate_
+
+        self.sketch += other.sketch
+        self.table = table
+        self.threshold = self.threshold + other.threshold
+        self.total += other.total
+        self.is_exact = False
+
+        self._prune()
+
+        return self
+
+    def recount(self, tokens):
+        """
+        对高频词表中的候选token进行一次精确计数，tokens需与统计时的语料一致
+
+        Args:
+            tokens (:obj:`iterable`): token的可迭代对象
+        """  # noqa: ignore flake8"
+
+        self._prune()
+
+        exact_counter = dict.fromkeys(self.table, 0)
+
+        tokens = iter(tokens)
+        while True:
+            chunk = list(itertools.islice(tokens, self.chunk_size))
+            if len(chunk) == 0:
+                break
+            for token_, count_ in Counter(chunk).items():
+                if token_ in exact_counter:
+                    exact_counter[token_] += count_
+
+        self.table = exact_counter
+        self.is_exact = True
+
+        return self
+
+    def recount_from_files(self, paths, tokenize=None, encoding='utf-8'):
+        """
+        逐行读取文件，对高频词表中的候选token进行一次精确计数
+
+        Args:
+            paths (:obj:`list` or :obj:`string`): 文件地址或文件地址列表
+            tokenize (:obj:`callable` or :obj:`None`, optional, defaults to None): 分词函数，默认为None，即按空白字符切分
+            encoding (:obj:`string`, optional, defaults to "utf-8"): 文件编码
+        """  # noqa: ignore flake8"
+
+        if isinstance(paths, str):
+            paths = [paths]
+
+        return self.recount(itertools.chain.from_iterable(
+            _iter_file_tokens(path_, tokenize, encoding) for path_ in paths
+        ))
+
+    def most_common(self, n=None):
+        """
+        返回词频最高的n个token及其词频，未调用recount时词频为上界
+
+        Args:
+            n (:obj:`int` or :obj:`None`, optional, defaults to None): 返回的token数，默认为None，即全部候选token
+        """  # noqa: ignore flake8"
+
+        count_pairs = sorted(self.table.items(), key=lambda x: x[1], reverse=True)
+        if n is not None:
+            count_pairs = count_pairs[:n]
+
+        return count_pairs
+
+
+def _count_file(args):
+    path, tokenize, encoding, counter_kwargs = args
+    return StreamingTokenCounter(**counter_kwargs).update_from_files(path, tokenize, encoding)
+
+
+def _recount_file(args):
+    path, tokenize, encoding, candidates = args
+    exact_counter = dict.fromkeys(candidates, 0)
+    for token_ in _iter_file_tokens(path, tokenize, encoding):
+        if token_ in exact_counter:
+            exact_counter[token_] += 1
+    return exact_counter
+
+
+def count_tokens_from_files(
+    paths,
+    tokenize=None,
+    encoding='utf-8',
+    num_workers=1,
+    is_exact=True,
+    **counter_kwargs
+):
+    """
+    多进程统计多个文件的词频，每个文件由一个进程分别统计后合并，
+    is_exact为True时再并行地对候选token精确计数
+
+    Args:
+        paths (:obj:`list`): 文件地址列表，大文件可以预先切分成多个文件以提高并行度
+        tokenize (:obj:`callable` or :obj:`None`, optional, defaults to None):
+            分词函数，需可被pickle，默认为None，即按空白字符切分
+        encoding (:obj:`string`, optional, defaults to "utf-8"): 文件编码
+        num_workers (:obj:`int`, optional, defaults to 1): 进程数
+        is_exact (:obj:`bool`, optional, defaults to True): 是否对候选token进行精确计数
+        **counter_kwargs: StreamingTokenCounter的初始化参数
+
+    Returns:
+        StreamingTokenCounter: 合并后的计数器
+    """  # noqa: ignore flake8"
+
+    if isinstance(paths, str):
+        paths = [paths]
+
+    tasks = [(path_, tokenize, encoding, counter_kwargs) for path_ in paths]
+
+    if num_workers > 1:
+        with Pool(num_workers) as pool:
+            counters = pool.map(_count_file, tasks)
+    else:
+        counters = [_count_file(task_) for task_ in tasks]
+
+    counter = counters[0]
+    for counter_ in counters[1:]:
+        counter.merge(counter_)
+    counter._prune()
+
+    if is_exact:
+        tasks = [(path_, tokenize, encoding, list(counter.table)) for path_ in paths]
+
+        if num_workers > 1:
+            with Pool(num_workers) as pool:
+                exact_counters = pool.map(_recount_file, tasks)
+        else:
+            exact_counters = [_recount_file(task_) for task_ in tasks]
+
+        table = dict.fromkeys(counter.table, 0)
+        for exact_counter_ in exact_counters:
+            for token_, count_ in exact_counter_.items():
+                table[token_] += count_
+
+        counter.table = table
+        counter.is_exact = True
+
+    return counter
@@ -20,16 +20,35 @@ import re
 import pickle
 import jieba
 
+from functools import partial
 from zhon.hanzi import punctuation
 from collections import Counter
+from multiprocessing import Pool
 from ark_nlp.processor.vocab._vocab import Vocab
+from ark_nlp.processor.vocab.array_vocab import ArrayVocab
+from ark_nlp.processor.vocab.streaming_counter import StreamingTokenCounter
+
+try:
+    import pkuseg
+except ImportError:
+    pkuseg = None
+
+
+_punctuation_pattern = re.compile(r'[%s]+' % punctuation)
 
 
 class WordVocab(Vocab):
 
+    # 分词使用的默认进程数和缓存，通过configure_segmentation设置
+    segmentation_num_workers = 1
+    segmentation_cache = None
+
+    _segmenters = {}
+
     def __init__(self, initial_tokens=None, vocab_size=None):
         self.id2token = {}
         self.token2id = {}
+        self.array_vocab = None
 
         self.pad_token = '<pad>'
         self.unk_token = '<unk>'
@@ -45,6 +64,11 @@ class WordVocab(Vocab):
             self.add(token)
 
     def add(self, token, cnt=1):
+        # 从数组文件加载的词典是只读的，新增token前先转换回dict
+        if not isinstance(self.token2id, dict):
+            self.id2token = dict(self.id2token.items())
+            self.token2id = {token_: idx_ for idx_, token_ in self.id2token.items()}
+
         if token in self.token2id:
             idx = self.token2id[token]
         else:
@@ -52,11 +76,17 @@ class WordVocab(Vocab):
             self.id2token[idx] = token
             self.token2id[token] = idx
             self.vocab_size += 1
+            # 新增token后数组词典不再与dict一致
+            self.array_vocab = None
 
         return idx
 
     def initial_vocab(self, initial_tokens):
-        counter = Counter(initial_tokens)
+        # 超大语料可先用StreamingTokenCounter在有界内存下统计词频
+        if isinstance(initial_tokens, StreamingTokenCounter):
+            counter = initial_tokens
+        else:
+            counter = Counter(initial_tokens)
         if self.vocab_size:
             vocab_size = self.vocab_size - 2
         else:
@@ -67,9 +97,42 @@ class WordVocab(Vocab):
         return list(tokens)
 
     def convert_to_ids(self, tokens):
-        ids = [self.get_id(term) for term in tokens]
+        if self.array_vocab is not None:
+            return self.array_vocab.convert_to_ids(list(tokens), self.get_id(self.unk_token)).tolist()
+
+        unk_id = self.token2id[self.unk_token]
+        ids = [self.token2id.get(term, unk_id) for term in tokens]
         return ids
 
+    def get_array_vocab(self):
+        """
+        获取与当前词典一致的ArrayVocab，词典有新增token时重新构建
+        """  # noqa: ignore flake8"
+
+        if self.array_vocab is None or len(self.array_vocab) != len(self.id2token):
+            self.array_vocab = ArrayVocab.from_tokens([self.id2token[idx_] for idx_ in range(len(self.id2token))])
+
+        return self.array_vocab
+
+    def convert_batch_to_ids(self, token_lists, max_seq_len=None):
+        """
+        将多个token序列一次性转换成填充后的ID矩阵
+
+        Args:
+            token_lists (:obj:`list`): token序列的列表
+            max_seq_len (:obj:`int` or :obj:`None`, optional, defaults to None): 最大长度，超出部分截断，默认为None，即最长序列的长度
+
+        Returns:
+            np.ndarray: (序列数, max_seq_len)的int32 ID矩阵
+        """  # noqa: ignore flake8"
+
+        return self.get_array_vocab().convert_batch_to_ids(
+            token_lists,
+            unk_id=self.get_id(self.unk_token),
+            max_seq_len=max_seq_len,
+            pad_id=self.get_id(self.pad_token)
+        )
+
     def recover_from_ids(self, ids, stop_id=None):
         tokens = []
         for i in ids:
@@ -97,33 +160,131 @@ class WordVocab(Vocab):
             return self.unk_token
 
     @classmethod
-    def tokenize(cls, text, stop_words=None, mode='jieba', lower=True):
-        text = re.sub(r'[%s]+' % punctuation, ' ', text)
+    def configure_segmentation(cls, num_workers=1, cache=None):
+        """
+        设置分词的默认进程数和缓存，tokenize、batch_tokenize以及使用该词典的数据集和构图均会使用该设置
+
+        Args:
+            num_workers (:obj:`int`, optional, defaults to 1): batch_tokenize分词使用的进程数
+            cache (:obj:`SegmentationCache` or :obj:`None`, optional, defaults to None): 分词结果的缓存，默认为None，即不缓存
+        """  # noqa: ignore flake8"
+
+        cls.segmentation_num_workers = num_workers
+        cls.segmentation_cache = cache
+
+    @classmethod
+    def get_segmenter(cls, mode='jieba'):
+        if mode not in cls._segmenters:
+            if mode == 'jieba':
+                cls._segmenters[mode] = jieba.lcut
+            elif mode == 'pkuseg':
+                if pkuseg is None:
+                    raise ImportError("The pkuseg mode requires pkuseg, please install it with `pip install pkuseg`")
+                cls._segmenters[mode] = pkuseg.pkuseg(model_name='medicine').cut
+            else:
+                raise ValueError('没有该分词模式')
+
+        return cls._segmenters[mode]
+
+    @classmethod
+    def segment(cls, text, mode='jieba', lower=True):
+        text = _punctuation_pattern.sub(' ', text)
         if lower:
             text = text.lower()
 
-        if mode == 'jieba':
-            if not hasattr(cls, 'word_tokenize'):
-                cls.word_tokenize = lambda x: jieba.lcut(x)
-            tokens = cls.word_tokenize(text)
-        elif mode == 'pkuseg':
-            if not hasattr(cls, 'word_tokenize'):
-                cls.word_tokenizer = pkuseg.pkuseg(model_name='medicine')
-                cls.word_tokenize = lambda x: cls.word_tokenizer.cut(x)
-            tokens = cls.word_tokenize(text)
+        return list(cls.get_segmenter(mode)(text))
+
+    @classmethod
+    def tokenize(cls, text, stop_words=None, mode='jieba', lower=True):
+        if cls.segmentation_cache is None:
+            tokens = cls.segment(text, mode, lower)
         else:
-            # To Do: add eorr message
-            pass
+            tokens = cls.batch_tokenize([text], mode=mode, lower=lower, num_workers=1)[0]
 
         if stop_words:
             tokens = filter(lambda w: w not in stop_words, tokens)
         return list(tokens)
 
+    @classmethod
+    def batch_tokenize(
+        cls,
+        texts,
+        stop_words=None,
+        mode='jieba',
+        lower=True,
+        num_workers=None,
+        chunksize=256
+    ):
+        """
+        批量分词，重复的文本只分词一次，已缓存的文本直接读取缓存，其余文本可使用多进程分词
+
+        Args:
+            texts (:obj:`list`): 文本列表
+            stop_words (:obj:`list` or :obj:`None`, optional, defaults to None): 停用词
+            mode (:obj:`string`, optional, defaults to "jieba"): 分词工具，可选有["jieba", "pkuseg"]
+            lower (:obj:`bool`, optional, defaults to True): 是否转换为小写
+            num_workers (:obj:`int` or :obj:`None`, optional, defaults to None):
+                分词进程数，默认为None，即使用configure_segmentation设置的进程数
+            chunksize (:obj:`int`, optional, defaults to 256): 每次分配给子进程的文本数
+
+        Returns:
+            list: 每个文本的token列表
+        """  # noqa: ignore flake8"
+
+        if num_workers is None:
+            num_workers = cls.segmentation_num_workers
+
+        cache = cls.segmentation_cache
+
+        keys = {text_: '{}\t{}\t{}'.format(mode, int(lower), text_) for text_ in texts}
+
+        segmented = {}
+        if cache is not None:
+            hits = cache.get_many(list(keys.values()))
+            segmented = {text_: hits[key_] for text_, key_ in keys.items() if key_ in hits}
+
+        missing = [text_ for text_ in keys if text_ not in segmented]
+
+        segment_fn = partial(cls.segment, mode=mode, lower=lower)
+        if num_workers > 1 and len(missing) > chunksize:
+            with Pool(num_workers) as pool:
+                results = pool.map(segment_fn, missing, chunksize=chunksize)
+        else:
+            results = [segment_fn(text_) for text_ in missing]
+
+        segmented.update(zip(missing, results))
+
+        if cache is not None and missing:
+            cache.set_many({keys[text_]: tokens_ for text_, tokens_ in zip(missing, results)})
+
+        if stop_words:
+            return [[token_ for token_ in segmented[text_] if token_ not in stop_words] for text_ in texts]
+
+        return [list(segmented[text_]) for text_ in texts]
+
     def save(self, output_path='./token2id.pkl'):
         with open(output_path, 'wb') as f:
-            pickle.dump(self.token2id, f)
+            pickle.dump(dict(self.token2id.items()), f)
 
     def load(self, save_path='./token2id.pkl'):
         with open(save_path, 'rb') as f:
-            self.token2id = pickle.load(f)
+            self.token2id = dict(pickle.load(f).items())
         self.id2token = self.recover_id2token()
+        self.array_vocab = None
+
+    def save_array(self, output_path='./vocab.bin'):
+        """
+        保存为可内存映射的ArrayVocab文件
+        """  # noqa: ignore flake8"
+
+        self.get_array_vocab().save(output_path)
+
+    def load_array(self, save_path='./vocab.bin'):
+        """
+        以内存映射的方式加载ArrayVocab文件，token2id和id2token为只读的映射视图，无需在Python中重建dict
+        """  # noqa: ignore flake8"
+
+        self.array_vocab = ArrayVocab.load(save_path)
+        self.token2id = self.array_vocab.token2id
+        self.id2token = self.array_vocab.id2token
+        self.vocab_size = len(self.array_vocab)